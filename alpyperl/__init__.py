@@ -1,2 +1,17 @@
-from alpyperl.gym.envs.anylogic_env import create_custom_env, BaseAnyLogicEnv
-from alpyperl.gym.envs.anylogic_env import BaseAnyLogicEnv as AnyLogicEnv
\ No newline at end of file
+from alpyperl._lazy import lazy_module
+
+# Public objects and the module defining them. They are imported on first
+# access (PEP 562), so importing 'alpyperl' does not pull in gymnasium, py4j
+# nor the AnyLogic connector until an environment is actually used.
+_LAZY_IMPORTS = {
+    'create_custom_env': ('alpyperl.gym.envs.anylogic_env', 'create_custom_env'),
+    'BaseAnyLogicEnv': ('alpyperl.gym.envs.anylogic_env', 'BaseAnyLogicEnv'),
+    'AnyLogicEnv': ('alpyperl.gym.envs.anylogic_env', 'BaseAnyLogicEnv'),
+    'BaseAnyLogicExternalEnv': ('alpyperl.gym.envs.anylogic_external_env', 'BaseAnyLogicExternalEnv'),
+    'BaseAnyLogicMultiAgentEnv': ('alpyperl.gym.envs.anylogic_multi_agent_env', 'BaseAnyLogicMultiAgentEnv'),
+    'TrajectoryReader': ('alpyperl.gym.envs.recorder', 'TrajectoryReader')
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
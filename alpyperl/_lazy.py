@@ -0,0 +1,33 @@
+import importlib
+import sys
+
+
+def lazy_module(module_name, lazy_imports):
+    """`[INTERNAL]` Create the module level ``__getattr__`` and ``__dir__``
+    functions (PEP 562) of a package whose public objects are imported on
+    first access, so importing the package does not pull in the dependencies
+    of every object it exposes.
+
+    :param module_name: The name of the package (i.e. its ``__name__``)
+    :type module_name: str
+    :param lazy_imports: Public objects and where they are defined: name ->
+        ``(module name, attribute)``
+    :type lazy_imports: dict
+    :return: The ``__getattr__`` and ``__dir__`` functions of the package
+    :rtype: tuple
+    """
+    module_globals = sys.modules[module_name].__dict__
+
+    def __getattr__(name):
+        if name in lazy_imports:
+            lazy_module_name, attribute = lazy_imports[name]
+            value = getattr(importlib.import_module(lazy_module_name), attribute)
+            # Cache it, so next accesses do not go through this function.
+            module_globals[name] = value
+            return value
+        raise AttributeError(f"module '{module_name}' has no attribute '{name}'")
+
+    def __dir__():
+        return sorted(set(module_globals) | set(lazy_imports))
+
+    return __getattr__, __dir__
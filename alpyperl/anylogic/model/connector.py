@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 from py4j.clientserver import ClientServer, JavaParameters, PythonParameters
 from threading import Event, Thread
 import socket
@@ -25,6 +26,13 @@ class AnyLogicModelCallback:
     # -----------------------------------------------------------------
     def __init__(self):
         self.thread_handler = None
+        # External environment that handles the requests when the AnyLogic model
+        # drives the simulation loop (see 'BaseAnyLogicExternalEnv').
+        self.external_env = None
+        # Policy that computes the actions requested by the AnyLogic model when
+        # evaluating over the gateway (see 'launch_policy_gateway').
+        self.policy_pool = None
+        self.evaluation_finished = Event()
 
     def finishedModelSetup(self):
         """This function is called from the Java side to unblock python script
@@ -34,6 +42,55 @@ class AnyLogicModelCallback:
         self.thread_handler.clear()
         return True
 
+    def startEpisode(self):
+        """This function is called from the Java side when running in external
+        mode to notify that a new episode has started. It returns the episode
+        id the model must use in subsequent calls
+        """
+        return self.external_env.start_episode()
+
+    def getAction(self, episodeId, observation):
+        """This function is called from the Java side when running in external
+        mode to request the action for the given (flattened) observation. It
+        can be called concurrently for as many decision points as needed
+        """
+        return self.external_env.get_anylogic_action(episodeId, observation)
+
+    def logReturns(self, episodeId, reward):
+        """This function is called from the Java side when running in external
+        mode to record the reward obtained since the last action
+        """
+        self.external_env.log_returns(episodeId, reward)
+        return True
+
+    def endEpisode(self, episodeId, observation):
+        """This function is called from the Java side when running in external
+        mode to notify that the episode has finished with the given (flattened)
+        observation
+        """
+        self.external_env.end_anylogic_episode(episodeId, observation)
+        return True
+
+    def predict(self, observation):
+        """This function is called from the Java side when evaluating a
+        trained policy over the gateway. It receives the flattened
+        observation(s) as raw bytes (big-endian ``float64``, one observation
+        after the other) and returns the flattened action(s) in the same format
+        """
+        observations = np.frombuffer(observation, dtype='>f8').reshape(
+            (-1, self.policy_pool.observation_dim)
+        )
+        actions = self.policy_pool.compute_flattened_actions(observations)
+        return np.asarray(actions, dtype='>f8').tobytes()
+
+    def finishedEvaluation(self):
+        """This function is called from the Java side when the evaluation over
+        the gateway has finished, so the python script can stop serving the
+        policy
+        """
+        self.evaluation_finished.set()
+        return True
+
     def toString(self):
         """Need 'toString()' implementation because AnyLogic calls this
         to visualise the value of variables
@@ -56,14 +113,19 @@ class AnyLogicModelConnector:
         self,
         run_exported_model,
         exported_model_loc,
-        show_terminals
+        show_terminals,
+        anylogic_model_callback=None
     ):
         self.logger = logging.getLogger(__name__)
         # Initialise model launcher
         self.al_model_launcher = None
         # Create an instance of the python implementation to be accessed by the
-        # AnyLogic model
-        self.anylogic_model_callback = AnyLogicModelCallback()
+        # AnyLogic model (unless an already configured one is given)
+        self.anylogic_model_callback = (
+            anylogic_model_callback
+            if anylogic_model_callback is not None
+            else AnyLogicModelCallback()
+        )
 
         # Create single thread gateway between python and AnyLogic (only possible with
         # ClientServer)
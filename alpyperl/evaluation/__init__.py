@@ -0,0 +1,12 @@
+from alpyperl._lazy import lazy_module
+
+# Imported on first access (PEP 562), same as the other packages.
+_LAZY_IMPORTS = {
+    'ParallelEvaluator': ('alpyperl.evaluation.runner', 'ParallelEvaluator'),
+    'scenario_grid': ('alpyperl.evaluation.runner', 'scenario_grid'),
+    'sample_scenarios': ('alpyperl.evaluation.runner', 'sample_scenarios')
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
@@ -0,0 +1,257 @@
+import copy
+import itertools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from alpyperl.gym.envs import utils
+from alpyperl.serve.rllib.inference import PolicyPool
+from alpyperl.serve.rllib.registry import load_policy
+
+
+def scenario_grid(param_grid):
+    """Create a scenario for every combination of parameter values
+
+    :param param_grid: The values of every parameter, e.g.
+        ``{'cartpole_mass': [0.5, 1.0], 'pole_length': [0.5, 1.0]}``
+    :type param_grid: dict
+    :return: The ``env_params`` of every scenario
+    :rtype: list
+    """
+    names = list(param_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*[param_grid[name] for name in names])
+    ]
+
+def sample_scenarios(param_ranges, num_scenarios, seed=None):
+    """Sample random scenarios. Parameters given as a ``(low, high)`` tuple are
+    sampled uniformly, and parameters given as a list are chosen from it
+
+    :param param_ranges: The range or values of every parameter, e.g.
+        ``{'cartpole_mass': (0.5, 1.5), 'gravity': [9.8, 3.7]}``
+    :type param_ranges: dict
+    :param num_scenarios: Number of scenarios
+    :type num_scenarios: int
+    :param seed: Seed of the random number generator
+    :type seed: int
+    :return: The ``env_params`` of every scenario
+    :rtype: list
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = []
+    for _ in range(num_scenarios):
+        scenario = {}
+        for name, values in param_ranges.items():
+            if isinstance(values, tuple):
+                scenario[name] = float(rng.uniform(values[0], values[1]))
+            elif isinstance(values, list):
+                # Keep python types, so parameters can be sent to the model.
+                scenario[name] = values[rng.integers(len(values))]
+            else:
+                raise Exception(
+                    f"Unsupported range for parameter '{name}': expected a "
+                    "(low, high) tuple or a list of values"
+                )
+        scenarios.append(scenario)
+    return scenarios
+
+
+class ParallelEvaluator:
+    """Evaluate a trained policy over many scenarios (i.e. ``env_params``
+    values) using a pool of environment instances (i.e. AnyLogic models)
+    running in parallel.
+
+    Every instance is driven from its own thread, while actions are computed
+    locally: the observations of all the instances waiting for an action are
+    sent to the policy in a single forward pass. The scenario of an episode is
+    set through the environment ``env_params`` before it is reset, so
+    instances are reused across scenarios.
+
+    :param env: The environment the policy was trained against
+    :type env: alpyperl.BaseAnyLogicEnv
+    :param env_config: Any option that will be consumed by every environment
+        instance (e.g. ``exported_model_loc``)
+    :type env_config: dict
+    :param trained_policy_loc: The location of the **rllib** trained policy
+    :type trained_policy_loc: str
+    :param exported_policy_loc: The location of a policy exported with
+        ``alpyperl.serve.rllib.export_policy`` (used instead of
+        ``trained_policy_loc``)
+    :type exported_policy_loc: str
+    :param num_envs: Number of environment instances. Defaults to ``4``
+    :type num_envs: int
+    :param max_episode_steps: Truncate episodes after this number of steps
+        (optional)
+    :type max_episode_steps: int
+    """
+
+    def __init__(
+        self,
+        env,
+        env_config=None,
+        trained_policy_loc=None,
+        exported_policy_loc=None,
+        num_envs=4,
+        max_episode_steps=None
+    ):
+        if exported_policy_loc is None and trained_policy_loc is None:
+            raise Exception("Either 'trained_policy_loc' or 'exported_policy_loc' must be provided.")
+        self.logger = logging.getLogger(__name__)
+        self.max_episode_steps = max_episode_steps
+        policy, observation_space, action_space = load_policy(
+            exported_policy_loc if exported_policy_loc is not None else trained_policy_loc
+        )
+        self.policy_pool = PolicyPool(
+            policies=[policy],
+            observation_space=observation_space,
+            action_space=action_space
+        )
+        # One thread per instance, since model steps block on the model.
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_envs,
+            thread_name_prefix='alpyperl-evaluation'
+        )
+        # Models are launched in parallel too.
+        env_config = env_config if env_config is not None else {}
+        self.envs = list(self.executor.map(
+            lambda _: env(copy.deepcopy(env_config)), range(num_envs)
+        ))
+        self.logger.info(f"{num_envs} environment instances are ready for evaluation")
+
+    def run(self, scenarios, episodes_per_scenario=1, results_file=None):
+        """Evaluate the policy on every scenario. Results are returned as soon
+        as all the episodes of a scenario have finished (i.e. not necessarily
+        in the same order as ``scenarios``)
+
+        :param scenarios: The ``env_params`` of every scenario (check
+            ``scenario_grid`` and ``sample_scenarios``)
+        :type scenarios: list
+        :param episodes_per_scenario: Number of episodes per scenario.
+            Defaults to ``1``
+        :type episodes_per_scenario: int
+        :param results_file: File where every result is appended as a JSON
+            line (optional)
+        :type results_file: str
+        :return: The aggregated metrics of every scenario: ``scenario_id``,
+            ``env_params``, ``episodes``, ``return_mean``, ``return_std``,
+            ``return_min``, ``return_max``, ``length_mean`` and ``duration_s``
+        :rtype: Iterator[dict]
+        """
+        # Episodes pending to be started (scenario id, env_params).
+        pending_episodes = [
+            (scenario_id, scenario)
+            for scenario_id, scenario in enumerate(scenarios)
+            for _ in range(episodes_per_scenario)
+        ][::-1]
+        # Finished episodes (return, length) of every scenario.
+        episodes = {scenario_id: [] for scenario_id in range(len(scenarios))}
+        start_times = {}
+        # Running episode of every busy instance: [scenario id, return, length].
+        running = {}
+        # Futures of the instances being reset or stepped.
+        futures = {}
+        # Instances waiting for an action: env index -> observation.
+        waiting = {}
+        idle = list(range(len(self.envs)))[::-1]
+        results = open(results_file, 'a') if results_file is not None else None
+        try:
+            while pending_episodes or running:
+                # Start new episodes on the idle instances.
+                while idle and pending_episodes:
+                    i = idle.pop()
+                    scenario_id, scenario = pending_episodes.pop()
+                    start_times.setdefault(scenario_id, time.perf_counter())
+                    running[i] = [scenario_id, 0.0, 0]
+                    futures[self.executor.submit(self.__reset, i, scenario)] = i
+                # Wait for at least one instance to be ready.
+                done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = futures.pop(future)
+                    observation, reward, terminated, truncated = future.result()
+                    episode = running[i]
+                    # Resets do not return any reward.
+                    if reward is not None:
+                        episode[1] += reward
+                        episode[2] += 1
+                        if self.max_episode_steps is not None and episode[2] >= self.max_episode_steps:
+                            truncated = True
+                    if terminated or truncated:
+                        del running[i]
+                        idle.append(i)
+                        scenario_id = episode[0]
+                        episodes[scenario_id].append((episode[1], episode[2]))
+                        if len(episodes[scenario_id]) == episodes_per_scenario:
+                            result = self.__aggregate(
+                                scenario_id, scenarios[scenario_id],
+                                episodes.pop(scenario_id), start_times.pop(scenario_id)
+                            )
+                            if results is not None:
+                                results.write(json.dumps(result) + '\n')
+                                results.flush()
+                            yield result
+                    else:
+                        waiting[i] = observation
+                # Compute the actions of all waiting instances at once.
+                if waiting:
+                    env_indices = list(waiting)
+                    actions = utils.unflatten_batch(
+                        self.policy_pool.action_space,
+                        self.policy_pool.compute_flattened_actions(
+                            utils.flatten_batch(
+                                self.policy_pool.observation_space,
+                                [waiting[i] for i in env_indices]
+                            )
+                        )
+                    )
+                    waiting.clear()
+                    for i, action in zip(env_indices, actions):
+                        futures[self.executor.submit(self.__step, i, action)] = i
+        finally:
+            if results is not None:
+                results.close()
+            # Do not leave instances stepping in the background (e.g. if the
+            # caller stopped iterating).
+            wait(list(futures))
+
+    def close(self):
+        """Close every environment instance"""
+        for env in self.envs:
+            env.close()
+        self.executor.shutdown()
+        self.policy_pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __reset(self, i, env_params):
+        """`[INTERNAL]` Reset an instance with the given scenario"""
+        env = self.envs[i]
+        env.env_params = env_params
+        observation, _ = env.reset()
+        return observation, None, False, False
+
+    def __step(self, i, action):
+        """`[INTERNAL]` Apply an action to an instance"""
+        observation, reward, terminated, truncated, _ = self.envs[i].step(action)
+        return observation, float(reward), terminated, truncated
+
+    def __aggregate(self, scenario_id, env_params, episodes, start_time):
+        """`[INTERNAL]` Aggregate the episodes of a scenario"""
+        returns = np.array([r for r, _ in episodes])
+        lengths = np.array([l for _, l in episodes])
+        return {
+            'scenario_id': scenario_id,
+            'env_params': env_params,
+            'episodes': len(episodes),
+            'return_mean': float(returns.mean()),
+            'return_std': float(returns.std()),
+            'return_min': float(returns.min()),
+            'return_max': float(returns.max()),
+            'length_mean': float(lengths.mean()),
+            'duration_s': time.perf_counter() - start_time
+        }
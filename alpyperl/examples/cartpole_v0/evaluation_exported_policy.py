@@ -0,0 +1,8 @@
+from alpyperl.serve.rllib import launch_policy_server
+
+
+# Launch server using the exported policy (see 'export_policy.py')
+launch_policy_server(
+    exported_policy_loc='./resources/trained_policies/cartpole_v0_policy.npz',
+    port=3000
+)
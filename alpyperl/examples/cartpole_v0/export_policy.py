@@ -0,0 +1,8 @@
+from alpyperl.serve.rllib import export_policy
+
+
+# Export trained policy so it can be served without the rllib stack
+export_policy(
+    trained_policy_loc='./resources/trained_policies/cartpole_v0',
+    export_loc='./resources/trained_policies/cartpole_v0_policy.npz'
+)
@@ -5,8 +5,39 @@ from gymnasium.spaces.utils import unflatten, flatten
 from alpyperl.anylogic.model.connector import AnyLogicModelConnector
 import numpy as np
 from alpyperl.gym.envs import utils
+from alpyperl.gym.envs.recorder import TrajectoryRecorder
 import os
 import time
+import copy
+import uuid
+import json
+from threading import Thread
+
+
+# Options that only apply when python steps the simulation through
+# `BaseAnyLogicEnv.step` and `reset`, and the value that disables them.
+STEP_LOOP_OPTIONS = {
+    'reset_from_snapshot': False,
+    'model_checkpoint_freq': 0,
+    'action_repeat': 1,
+    'trajectory_dir': None,
+    'prefetch_reset': False
+}
+
+
+def check_step_loop_options(env_config, env_name):
+    """`[INTERNAL]` Raise if any option that only applies to the
+    ``BaseAnyLogicEnv`` step loop is enabled for an environment that drives
+    the AnyLogic model differently"""
+    unsupported = [
+        option for option, default in STEP_LOOP_OPTIONS.items()
+        if env_config is not None and env_config.get(option) not in (None, default)
+    ]
+    if unsupported:
+        raise Exception(
+            f"Options {unsupported} are not supported by '{env_name}', since "
+            "the AnyLogic model is not stepped through 'BaseAnyLogicEnv'."
+        )
 
 
 def create_custom_env(action_space, observation_space, env_config: dict=None):
@@ -31,6 +62,24 @@ def create_custom_env(action_space, observation_space, env_config: dict=None):
           store the action and observation spaces in case they are defined
           in the AnyLogic model. This is required mainly during policy
           evaluation.
+        * ``'reset_from_snapshot'``: Capture a model snapshot at the first
+          action request and restore it on every subsequent reset, so the
+          model warm-up is only simulated once.
+        * ``'snapshot_loc'``: The folder where the snapshot file is written
+          (e.g. a ``tmpfs`` mount such as ``/dev/shm``). If not provided, the
+          snapshot is kept in memory by the AnyLogic model.
+        * ``'model_checkpoint_freq'``: Checkpoint the model state every N
+          steps so an episode can be resumed after the model crashes.
+        * ``'model_checkpoint_dir'``: The location of the model checkpoints.
+        * ``'action_repeat'``: Number of consecutive decisions the same action
+          is applied for (inside the AnyLogic model) on every step.
+        * ``'trajectory_dir'``: Record every transition to this folder (one
+          sub-folder per environment instance). Check
+          ``alpyperl.TrajectoryReader`` to read them.
+        * ``'trajectory_chunk_size'``: Number of transitions per recorded
+          file. Defaults to ``4096``.
+        * ``'prefetch_reset'``: Reset the model in the background as soon as
+          an episode finishes, so the next ``reset()`` does not wait for it.
 
             
     :type env_config: dict
@@ -69,7 +118,15 @@ class BaseAnyLogicEnv(gym.Env):
             'server_mode_on': False,
             'verbose': False,
             'checkpoint_dir': './trained_policies',
-            'env_params': {}
+            'env_params': {},
+            'reset_from_snapshot': False,
+            'snapshot_loc': None,
+            'model_checkpoint_freq': None,
+            'model_checkpoint_dir': './model_checkpoints',
+            'action_repeat': 1,
+            'trajectory_dir': None,
+            'trajectory_chunk_size': 4096,
+            'prefetch_reset': False
         },
         disable_env_checking: bool = True
     ):
@@ -96,6 +153,54 @@ class BaseAnyLogicEnv(gym.Env):
               evaluation.
             * ``'env_params'``: The environment custom parameter values (e.g., 
               ``cartpole_mass``) as a dictionary
+            * ``'reset_from_snapshot'``: Capture a model snapshot at the first
+              action request (i.e. once the model warm-up has been simulated)
+              and restore it on every subsequent reset instead of restarting
+              the model from scratch. The snapshot is discarded and captured
+              again whenever ``env_params`` change. It requires the
+              ``ALPypeRLConnector`` to implement ``saveSnapshot`` and
+              ``restoreSnapshot(observationSpace, snapshotFile, seed)``.
+              Restoring a snapshot also restores the random number generator
+              state, so the connector must re-seed it with the given seed
+              (the one returned by ``getSeed`` for the new episode). Otherwise
+              every episode would replay the same trajectory.
+            * ``'snapshot_loc'``: The folder where the snapshot file will be
+              written (a ``tmpfs`` mount such as ``/dev/shm`` is recommended).
+              If not provided, the snapshot is kept in memory by the AnyLogic
+              model.
+            * ``'model_checkpoint_freq'``: Checkpoint the model state every N
+              steps. If the model (JVM) dies mid-episode and the environment
+              is re-created (e.g. ``recreate_failed_env_runners`` in rllib),
+              the first reset resumes the episode from the latest checkpoint
+              instead of restarting it. The sampling time saved is logged and
+              returned in the reset ``info``. It has the same
+              ``ALPypeRLConnector`` requirements as ``'reset_from_snapshot'``.
+            * ``'model_checkpoint_dir'``: The location of the model checkpoints.
+              Each environment instance uses its own sub-folder, identified by
+              the rllib ``worker_index`` and ``vector_index``.
+            * ``'action_repeat'``: Number of consecutive decisions the same
+              action is applied for on every step (also known as *frame
+              skip*). The repetition is executed inside the AnyLogic model,
+              which sums the rewards, stops early if the simulation finishes
+              and returns the final observation in a single exchange. It
+              requires the ``ALPypeRLConnector`` to implement ``repeatStep``.
+              Defaults to ``1`` (no repetition).
+            * ``'trajectory_dir'``: Record the observations, actions, rewards
+              and dones of every step to this folder, e.g. for offline RL.
+              Each environment instance writes its own sub-folder (a
+              *shard*) of chunked, memory-mapped ``.npy`` files from a
+              background thread, so every step only queues the values to be
+              written. Use ``alpyperl.TrajectoryReader`` to read them
+              lazily.
+            * ``'trajectory_chunk_size'``: Number of transitions per recorded
+              file (preallocated). Defaults to ``4096``.
+            * ``'prefetch_reset'``: Start resetting the model in a background
+              thread as soon as the episode finishes (i.e. when the last
+              ``step`` is returned), so the trainer processes the final
+              transition while the model re-initialises and the next
+              ``reset()`` returns the initial observation already computed.
+              If ``env_params`` change in between, the prefetched reset is
+              discarded and the model is reset again.
 
         :type env_config: dict
         
@@ -146,6 +251,85 @@ class BaseAnyLogicEnv(gym.Env):
             if 'env_params' in self.env_config
             else {}
         )
+        # Initialize reset from snapshot options. The model state at the first
+        # action request will be captured and restored on every reset.
+        self.reset_from_snapshot = (
+            'reset_from_snapshot' in self.env_config
+            and self.env_config['reset_from_snapshot']
+        )
+        self.snapshot_loc = (
+            self.env_config['snapshot_loc']
+            if 'snapshot_loc' in self.env_config
+            else None
+        )
+        # The snapshot file is unique per environment instance to avoid
+        # overwriting the snapshot of other models running in parallel. If no
+        # location is given, the AnyLogic model keeps the snapshot in memory.
+        self.snapshot_file = (
+            os.path.abspath(f"{self.snapshot_loc}/{uuid.uuid4().hex}.als")
+            if self.reset_from_snapshot and self.snapshot_loc is not None
+            else None
+        )
+        # Parameter values used when capturing the current snapshot. `None`
+        # means that no snapshot has been captured yet.
+        self.snapshot_env_params = None
+        # Initialize mid-episode model checkpoint options.
+        self.model_checkpoint_freq = (
+            self.env_config['model_checkpoint_freq']
+            if 'model_checkpoint_freq' in self.env_config
+            else None
+        )
+        # Checkpoint folder must be the same when the environment is re-created
+        # so it can be found again. Rllib keeps the worker and vector indices
+        # when re-creating environments.
+        self.model_checkpoint_dir = os.path.abspath(
+            (
+                self.env_config['model_checkpoint_dir']
+                if 'model_checkpoint_dir' in self.env_config
+                else './model_checkpoints'
+            )
+            + f"/worker_{getattr(self.env_config, 'worker_index', 0)}"
+            + f"_env_{getattr(self.env_config, 'vector_index', 0)}"
+        )
+        # Initialize number of times an action is repeated on every step.
+        self.action_repeat = (
+            self.env_config['action_repeat']
+            if 'action_repeat' in self.env_config
+            else 1
+        )
+        # Initialize trajectory recording options. The recorder is created
+        # once the spaces are known.
+        self.trajectory_dir = (
+            self.env_config['trajectory_dir']
+            if 'trajectory_dir' in self.env_config
+            else None
+        )
+        self.trajectory_chunk_size = (
+            self.env_config['trajectory_chunk_size']
+            if 'trajectory_chunk_size' in self.env_config
+            else 4096
+        )
+        self.trajectory_recorder = None
+        # Initialize background reset option. It holds the reset started once
+        # the last episode finished (if any).
+        self.prefetch_reset = (
+            'prefetch_reset' in self.env_config
+            and self.env_config['prefetch_reset']
+        )
+        self.reset_prefetch = None
+        # Only the first reset after (re-)creating the environment can resume
+        # an unfinished episode.
+        self.resume_from_model_checkpoint = True
+        # The latest snapshot saved (or resumed) by this instance, and whether
+        # its last episode finished.
+        self.model_checkpoint_file = None
+        self.episode_finished = False
+        # Keep track of the current episode progress, which is what a model
+        # checkpoint allows to recover.
+        self.episode_steps = 0
+        self.episode_sampling_time = 0.0
+        # Total sampling time saved by resuming from model checkpoints.
+        self.sampling_time_saved = 0.0
         # Launch or connect to AnyLogic model using the connector and launcher.
         if not self.server_mode_on:
             self.anylogic_connector = AnyLogicModelConnector(
@@ -171,6 +355,34 @@ class BaseAnyLogicEnv(gym.Env):
             # Initialise and prepare the model by calling `init()` method.
             self.anylogic_model.init()
 
+            # Check that the connector supports snapshots if requested.
+            if self.reset_from_snapshot or self.model_checkpoint_freq:
+                if not utils.has_java_methods(
+                    self.anylogic_model, ['saveSnapshot', 'restoreSnapshot']
+                ):
+                    raise Exception(
+                        "Options 'reset_from_snapshot' and 'model_checkpoint_freq' "
+                        "are not supported by the "
+                        "'ALPypeRLConnector' in your AnyLogic model! Please "
+                        "update it to a version that implements 'saveSnapshot' "
+                        "and 'restoreSnapshot'."
+                    )
+                if self.snapshot_file is not None:
+                    os.makedirs(self.snapshot_loc, exist_ok=True)
+                if self.model_checkpoint_freq:
+                    os.makedirs(self.model_checkpoint_dir, exist_ok=True)
+
+            # Check that the connector supports repeating actions if requested.
+            if (
+                self.action_repeat > 1
+                and not utils.has_java_methods(self.anylogic_model, ['repeatStep'])
+            ):
+                raise Exception(
+                    "Option 'action_repeat' is not supported by the "
+                    "'ALPypeRLConnector' in your AnyLogic model! Please update "
+                    "it to a version that implements 'repeatStep'."
+                )
+
             # Check if spaces have been defined from AnyLogic model.
             if self.anylogic_model.hasSpacesDefined():
 
@@ -206,6 +418,21 @@ class BaseAnyLogicEnv(gym.Env):
                     "AnyLogic model or in your custom environment in python."
                 )
 
+            # Every environment instance records to its own shard. A random
+            # suffix avoids overwriting the shard of a re-created environment.
+            if self.trajectory_dir is not None:
+                self.trajectory_recorder = TrajectoryRecorder(
+                    shard_dir=os.path.abspath(
+                        f"{self.trajectory_dir}"
+                        f"/worker_{getattr(self.env_config, 'worker_index', 0)}"
+                        f"_env_{getattr(self.env_config, 'vector_index', 0)}"
+                        f"_{uuid.uuid4().hex[:8]}"
+                    ),
+                    observation_space=self.observation_space,
+                    action_space=self.action_space,
+                    chunk_size=self.trajectory_chunk_size
+                )
+
             self.logger.info("AnyLogic model has been initialized correctly!")
 
         elif self.server_mode_on and not self.spaces_exist:
@@ -227,6 +454,7 @@ class BaseAnyLogicEnv(gym.Env):
         move on. It requires an `action` as an input. This action can be of
         different types (including an array of values).
         """
+        step_start_time = time.perf_counter()
         # Check if AnyLogic 'ObservationSpace' has been parsed. This is necessary
         # so observation can be flattened in the AnyLogic side.
         if (
@@ -242,6 +470,7 @@ class BaseAnyLogicEnv(gym.Env):
             )
         # Run fast simulation until next action is required (which will be
         # controlled and requested from the AnyLogic model).
+        step_result = None
         if not self.server_mode_on:
             # Flatten action
             action_parsed = flatten(self.action_space, action)
@@ -260,21 +489,44 @@ class BaseAnyLogicEnv(gym.Env):
                 anylogic_action_space=self.anylogic_action_space
             )
             # Pass action to AnyLogic model.
-            self.anylogic_model.step(action_space)
+            if self.action_repeat > 1:
+                # The AnyLogic model applies the action for the next
+                # `action_repeat` decisions and returns the result packed as
+                # [REWARD (summed), DONE, *OBSERVATION (flattened)].
+                step_result = np.asanyarray(
+                    self.anylogic_model.repeatStep(
+                        action_space,
+                        self.action_repeat,
+                        self.anylogic_observation_space
+                    ),
+                    dtype=np.float64
+                )
+            else:
+                self.anylogic_model.step(action_space)
             
         # Get observation state or sample if in server mode.
-        state = (
-            unflatten(
-                self.observation_space,
-                np.asanyarray(self.anylogic_model.getState(self.anylogic_observation_space))
+        flattened_state = (
+            (
+                step_result[2:]
+                if step_result is not None
+                else np.asanyarray(self.anylogic_model.getState(self.anylogic_observation_space))
             )
             if not self.server_mode_on
+            else None
+        )
+        state = (
+            unflatten(self.observation_space, flattened_state)
+            if not self.server_mode_on
             else self.observation_space.sample()
         )
         # Get 'current' reward (not cumulated) or dummy 0 if in server mode
         # It is assumed that reward will always be an scalar.
         reward = (
-            self.anylogic_model.getReward()
+            (
+                float(step_result[0])
+                if step_result is not None
+                else self.anylogic_model.getReward()
+            )
             if not self.server_mode_on
             else 0
         )
@@ -282,10 +534,34 @@ class BaseAnyLogicEnv(gym.Env):
         # Simulation length can be fixed or subject to other
         # conditions (e.g. system fails earlier and continuation is non-sense)
         done = (
-            self.anylogic_model.hasFinished()
+            (
+                bool(step_result[1])
+                if step_result is not None
+                else self.anylogic_model.hasFinished()
+            )
             if not self.server_mode_on
             else True
         )
+        # Checkpoint the model periodically, or discard the checkpoint once
+        # the episode is over since it will not be resumed.
+        if not self.server_mode_on:
+            self.episode_steps += 1
+            self.episode_sampling_time += time.perf_counter() - step_start_time
+            self.episode_finished = done
+            if self.model_checkpoint_freq and done:
+                self.__clear_model_checkpoint()
+            elif (
+                self.model_checkpoint_freq
+                and self.episode_steps % self.model_checkpoint_freq == 0
+            ):
+                self.__save_model_checkpoint()
+            if self.trajectory_recorder is not None:
+                self.trajectory_recorder.record_step(
+                    action_parsed, reward, done, False, flattened_state
+                )
+            # The model is not used again until the next reset.
+            if done and self.prefetch_reset:
+                self.__start_reset_prefetch()
         # Return tuple: STATE, REWARD, DONE, INFO
         return state, reward, done, False, {}
 
@@ -293,10 +569,18 @@ class BaseAnyLogicEnv(gym.Env):
     def reset(self, *, seed=None, options=None):
         """`[INTERNAL]` Reset function will restart the AnyLogic model to its initial status
         and return the new initial state"""
+        reset_start_time = time.perf_counter()
+        info = {}
+        # Wait for the reset started in the background (if any).
+        prefetch = self.__join_reset_prefetch()
         if not self.server_mode_on:
             # Initialize seed by retrieving it from AnyLogic model
             if seed is None:
-                seed = self.anylogic_model.getSeed()
+                seed = (
+                    prefetch['seed']
+                    if prefetch is not None
+                    else self.anylogic_model.getSeed()
+                )
             else:
                 raise Exception("Passing a custom seed is not supported!")
             # We need the following line to seed self.np_random
@@ -314,23 +598,214 @@ class BaseAnyLogicEnv(gym.Env):
                 anylogic_model=self.anylogic_model,
                 observation_space=self.observation_space
             )
-        # Reset simulation to restart from initial conditions.
+        # Resume the episode from the latest model checkpoint if the previous
+        # model did not finish it (e.g. the model crashed and the environment
+        # has been re-created). Otherwise, reset simulation to restart from
+        # initial conditions.
+        model_checkpoint = (
+            self.__load_model_checkpoint()
+            if (
+                not self.server_mode_on
+                and self.model_checkpoint_freq
+                and self.resume_from_model_checkpoint
+            )
+            else None
+        )
+        self.resume_from_model_checkpoint = False
+        self.episode_finished = False
+        if model_checkpoint is not None:
+            self.model_checkpoint_file = model_checkpoint['snapshot_file']
+            # No seed is given, so the interrupted episode carries on with
+            # the random number generator state it was checkpointed with.
+            flattened_state = self.anylogic_model.restoreSnapshot(
+                self.anylogic_observation_space,
+                model_checkpoint['snapshot_file'],
+                None
+            )
+            self.episode_steps = model_checkpoint['episode_steps']
+            self.episode_sampling_time = model_checkpoint['sampling_time']
+            # Compare the sampling time recovered against the time spent
+            # restoring the checkpoint.
+            time_saved = (
+                model_checkpoint['sampling_time']
+                - (time.perf_counter() - reset_start_time)
+            )
+            self.sampling_time_saved += time_saved
+            info = {
+                'resumed_from_checkpoint': True,
+                'episode_steps': self.episode_steps,
+                'sampling_time_saved': time_saved
+            }
+            self.logger.info(
+                f"Episode resumed from model checkpoint at step {self.episode_steps}. "
+                f"Sampling time saved versus a full restart: {time_saved:.2f}s "
+                f"(total: {self.sampling_time_saved:.2f}s)"
+            )
+        elif not self.server_mode_on:
+            # Discard checkpoints from episodes that have been truncated.
+            if self.model_checkpoint_freq:
+                self.__clear_model_checkpoint()
+            if prefetch is not None:
+                flattened_state = prefetch['flattened_state']
+                self.episode_sampling_time = prefetch['reset_time']
+            else:
+                flattened_state = self.__reset_model(seed)
+                self.episode_sampling_time = time.perf_counter() - reset_start_time
+            self.episode_steps = 0
         new_state = (
             unflatten(
                 self.observation_space,
-                np.asanyarray(self.anylogic_model.reset(
-                    self.anylogic_observation_space,
-                    utils.get_java_map(self.anylogic_model, self.env_params)
-                ))
+                np.asanyarray(flattened_state)
             )
             if not self.server_mode_on
             else self.observation_space.sample()
         )
+        # A resumed episode is recorded as a new one.
+        if self.trajectory_recorder is not None:
+            self.trajectory_recorder.start_episode(np.asanyarray(flattened_state))
         # Save alpyperl spaces to a file if they have not been saved yet.
-        self.__save_spaces_if_missing()
+        self._save_spaces_if_missing()
         # Return tuble: STATE, INFO.
-        return new_state, {}
+        return new_state, info
+
+
+    def __reset_model(self, seed):
+        """`[INTERNAL]` Reset the AnyLogic model and return the flattened initial
+        observation. If `reset_from_snapshot` is active, the model is restored
+        from the snapshot captured at the first action request instead, and
+        re-seeded with the given seed"""
+        # Restore from the snapshot only if it has been captured with the
+        # current parameter values. Otherwise, it is no longer valid.
+        if self.reset_from_snapshot and self.snapshot_env_params == self.env_params:
+            return self.anylogic_model.restoreSnapshot(
+                self.anylogic_observation_space,
+                self.snapshot_file,
+                seed
+            )
+        # Reset simulation by running the model (including warm-up) until the
+        # first action is requested.
+        observation = self.anylogic_model.reset(
+            self.anylogic_observation_space,
+            utils.get_java_map(self.anylogic_model, self.env_params)
+        )
+        # Capture the snapshot now that the model is waiting for the first
+        # action.
+        if self.reset_from_snapshot:
+            self.anylogic_model.saveSnapshot(self.snapshot_file)
+            self.snapshot_env_params = copy.deepcopy(self.env_params)
+            self.logger.debug("Model snapshot has been captured at the first action request")
+        return observation
+
+    def __start_reset_prefetch(self):
+        """`[INTERNAL]` Reset the model in a background thread, with the
+        current parameter values"""
+        prefetch = {'env_params': copy.deepcopy(self.env_params)}
+
+        def reset_model():
+            try:
+                start_time = time.perf_counter()
+                # Same order as in `reset`.
+                prefetch['seed'] = self.anylogic_model.getSeed()
+                prefetch['flattened_state'] = self.__reset_model(prefetch['seed'])
+                prefetch['reset_time'] = time.perf_counter() - start_time
+            except Exception as e:
+                prefetch['error'] = e
+
+        prefetch['thread'] = Thread(
+            target=reset_model,
+            name='alpyperl-reset-prefetch',
+            daemon=True
+        )
+        prefetch['thread'].start()
+        self.reset_prefetch = prefetch
+
+    def __join_reset_prefetch(self):
+        """`[INTERNAL]` Wait for the background reset to finish. Returns `None`
+        if there is no valid reset to use"""
+        if self.reset_prefetch is None:
+            return None
+        prefetch = self.reset_prefetch
+        self.reset_prefetch = None
+        prefetch['thread'].join()
+        if 'error' in prefetch:
+            raise Exception("The AnyLogic model could not be reset in the background") from prefetch['error']
+        # Parameters may have changed after the episode finished (e.g. from a
+        # curriculum callback), in which case the model must be reset again.
+        if prefetch['env_params'] != self.env_params:
+            self.logger.debug("Prefetched reset discarded since 'env_params' have changed")
+            return None
+        return prefetch
+
+    def __save_model_checkpoint(self):
+        """`[INTERNAL]` Save the current model state together with the episode
+        progress so it can be resumed after a crash"""
+        snapshot_file = f"{self.model_checkpoint_dir}/model_step_{self.episode_steps}.als"
+        self.anylogic_model.saveSnapshot(snapshot_file)
+        # Write the metadata file last (and atomically) so it always points to
+        # a complete snapshot.
+        metadata_file = f"{self.model_checkpoint_dir}/checkpoint.json"
+        with open(f"{metadata_file}.tmp", 'w') as f:
+            json.dump(
+                {
+                    'snapshot_file': snapshot_file,
+                    'episode_steps': self.episode_steps,
+                    'sampling_time': self.episode_sampling_time,
+                    'env_params': self.__get_env_params_key()
+                },
+                f
+            )
+        os.replace(f"{metadata_file}.tmp", metadata_file)
+        # Only the latest snapshot is kept (even if parameter values have
+        # changed since the previous one was saved).
+        if (
+            self.model_checkpoint_file is not None
+            and self.model_checkpoint_file != snapshot_file
+            and os.path.exists(self.model_checkpoint_file)
+        ):
+            os.remove(self.model_checkpoint_file)
+        self.model_checkpoint_file = snapshot_file
+        self.logger.debug(f"Model checkpoint saved at step {self.episode_steps}")
+
+    def __load_model_checkpoint(self):
+        """`[INTERNAL]` Load the latest model checkpoint metadata. Returns `None`
+        if there is no valid checkpoint to resume from"""
+        metadata_file = f"{self.model_checkpoint_dir}/checkpoint.json"
+        if not os.path.exists(metadata_file):
+            return None
+        with open(metadata_file, 'r') as f:
+            model_checkpoint = json.load(f)
+        # A checkpoint captured with other parameter values is not valid.
+        if (
+            model_checkpoint['env_params'] != self.__get_env_params_key()
+            or not os.path.exists(model_checkpoint['snapshot_file'])
+        ):
+            return None
+        return model_checkpoint
+
+    def __get_env_params_key(self):
+        """`[INTERNAL]` Canonical JSON form of the current parameter values,
+        so they can be compared with the ones stored in a model checkpoint
+        (e.g. tuples, numpy values and non-string keys do not survive a JSON
+        round-trip)"""
+        return json.dumps(
+            {str(k): v for k, v in self.env_params.items()},
+            sort_keys=True,
+            default=lambda v: v.tolist() if hasattr(v, 'tolist') else str(v)
+        )
 
+    def __clear_model_checkpoint(self):
+        """`[INTERNAL]` Remove the model checkpoint of this environment
+        instance, whatever parameter values it was captured with"""
+        snapshot_files = {self.model_checkpoint_file}
+        metadata_file = f"{self.model_checkpoint_dir}/checkpoint.json"
+        if os.path.exists(metadata_file):
+            with open(metadata_file, 'r') as f:
+                snapshot_files.add(json.load(f)['snapshot_file'])
+            os.remove(metadata_file)
+        for snapshot_file in snapshot_files:
+            if snapshot_file is not None and os.path.exists(snapshot_file):
+                os.remove(snapshot_file)
+        self.model_checkpoint_file = None
 
     def render(self):
         """`[INTERNAL]` Whether any visualisation will be displayed or not, depends on the
@@ -339,10 +814,23 @@ class BaseAnyLogicEnv(gym.Env):
 
     def close(self):
         """`[INTERNAL]` Close executables if any was created"""
-        self.__save_spaces_if_missing()
+        # Do not close the connection while the model is being reset.
+        if self.reset_prefetch is not None:
+            self.reset_prefetch['thread'].join()
+            self.reset_prefetch = None
+        self._save_spaces_if_missing()
+        # Write the transitions that have not been recorded yet.
+        if self.trajectory_recorder is not None:
+            self.trajectory_recorder.close()
+        # Remove snapshot file if it was written to disk.
+        if self.snapshot_file is not None and os.path.exists(self.snapshot_file):
+            os.remove(self.snapshot_file)
+        # The model checkpoint is only kept to resume an unfinished episode.
+        if self.model_checkpoint_freq and self.episode_finished:
+            self.__clear_model_checkpoint()
         self.anylogic_connector.close_connection()
 
-    def __save_spaces_if_missing(self):
+    def _save_spaces_if_missing(self):
         """`[INTERNAL]` Save ALPypeRL spaces to a file"""
         # Save observation and action space if it has been defined in the
         # AnyLogic model.
@@ -0,0 +1,117 @@
+import numpy as np
+from gymnasium.spaces.utils import unflatten, flatten
+from ray.rllib.env.external_env import ExternalEnv
+from alpyperl.gym.envs.anylogic_env import create_custom_env, check_step_loop_options
+from alpyperl.gym.envs import utils
+
+
+class BaseAnyLogicExternalEnv(ExternalEnv):
+    """
+    The python class that lets the AnyLogic model drive the simulation loop
+    (inverted control). Instead of python calling `step` and polling the model
+    for its state, the AnyLogic model pushes observations and rewards and asks
+    for actions whenever it needs them through the python callback server
+    (``AnyLogicModelCallback``). This allows a single model to request actions
+    for many concurrent decision points (one episode each) and overlap policy
+    inference with simulation.
+
+    It follows the rllib ``ExternalEnv`` interface, so it can be passed to your
+    policy configuration the same way as ``BaseAnyLogicEnv``.
+    """
+
+    def __init__(self, env_config=None):
+        """
+        Internal AnyLogic external environment constructor
+
+        :param env_config: Environment configuration. It accepts the options
+            of ``BaseAnyLogicEnv`` that set up the model connection and spaces
+            (e.g. ``'run_exported_model'``, ``'exported_model_loc'``,
+            ``'env_params'`` or ``'checkpoint_dir'``). Options of the python
+            step loop (``'reset_from_snapshot'``, ``'model_checkpoint_freq'``,
+            ``'action_repeat'``, ``'trajectory_dir'`` and
+            ``'prefetch_reset'``) do not apply, since the model drives the
+            loop, and raise an exception
+        :type env_config: dict
+        """
+        check_step_loop_options(env_config, 'BaseAnyLogicExternalEnv')
+        # The connection to the AnyLogic model and the parsing of spaces is
+        # handled by `BaseAnyLogicEnv`. Spaces can still be defined by
+        # inheritance, in which case they are passed on.
+        self.anylogic_env = create_custom_env(
+            action_space=getattr(self, 'action_space', None),
+            observation_space=getattr(self, 'observation_space', None)
+        )(env_config)
+        self.anylogic_model = self.anylogic_env.anylogic_model
+        self.logger = self.anylogic_env.logger
+
+        # Check that the connector supports being driven externally.
+        if not utils.has_java_methods(self.anylogic_model, ['runExternal']):
+            raise Exception(
+                "External mode is not supported by the 'ALPypeRLConnector' in "
+                "your AnyLogic model! Please update it to a version that "
+                "implements 'runExternal'."
+            )
+
+        # Initialise rllib external environment.
+        super(BaseAnyLogicExternalEnv, self).__init__(
+            action_space=self.anylogic_env.action_space,
+            observation_space=self.anylogic_env.observation_space
+        )
+
+        # Make sure AnyLogic 'ActionSpace' and 'ObservationSpace' are parsed, so
+        # actions can be unflattened and observations flattened in the AnyLogic
+        # side.
+        if (
+            not hasattr(self.anylogic_env, 'anylogic_action_space')
+            or self.anylogic_env.anylogic_action_space is None
+        ):
+            self.anylogic_env.anylogic_action_space = utils.parse_gym_to_anylogic_rl_space(
+                anylogic_model=self.anylogic_model,
+                action_space=self.action_space
+            )
+        if (
+            not hasattr(self.anylogic_env, 'anylogic_observation_space')
+            or self.anylogic_env.anylogic_observation_space is None
+        ):
+            self.anylogic_env.anylogic_observation_space = utils.parse_gym_to_anylogic_rl_space(
+                anylogic_model=self.anylogic_model,
+                observation_space=self.observation_space
+            )
+        self.anylogic_action_space = self.anylogic_env.anylogic_action_space
+        self.anylogic_observation_space = self.anylogic_env.anylogic_observation_space
+
+        # Route the requests coming from the AnyLogic model to this environment.
+        self.anylogic_env.anylogic_connector.anylogic_model_callback.external_env = self
+
+    def run(self):
+        """`[INTERNAL]` Hand over the control to the AnyLogic model. Every call
+        to ``runExternal`` blocks until the model run finishes, while episodes
+        are started, stepped and ended from the Java side via callbacks"""
+        # Save alpyperl spaces to a file if they have not been saved yet.
+        self.anylogic_env._save_spaces_if_missing()
+        while True:
+            self.anylogic_model.runExternal(
+                self.anylogic_observation_space,
+                utils.get_java_map(self.anylogic_model, self.anylogic_env.env_params)
+            )
+            self.logger.debug("AnyLogic model run has finished. Starting a new one")
+
+    def get_anylogic_action(self, episode_id, observation):
+        """`[INTERNAL]` Compute the action for the given flattened observation
+        and return it as an AnyLogic 'RLAction'"""
+        action = self.get_action(
+            episode_id,
+            unflatten(self.observation_space, np.asanyarray(observation))
+        )
+        return utils.get_anylogic_rl_action(
+            anylogic_model=self.anylogic_model,
+            flattened_action=flatten(self.action_space, action),
+            anylogic_action_space=self.anylogic_action_space
+        )
+
+    def end_anylogic_episode(self, episode_id, observation):
+        """`[INTERNAL]` End the episode given the final flattened observation"""
+        self.end_episode(
+            episode_id,
+            unflatten(self.observation_space, np.asanyarray(observation))
+        )
@@ -0,0 +1,161 @@
+import numpy as np
+from gymnasium.spaces.utils import unflatten, flatten, flatdim
+from ray.rllib.env.multi_agent_env import MultiAgentEnv
+from alpyperl.gym.envs.anylogic_env import create_custom_env, check_step_loop_options
+from alpyperl.gym.envs import utils
+
+
+class BaseAnyLogicMultiAgentEnv(MultiAgentEnv):
+    """
+    The python class that connects a single AnyLogic model instance containing
+    many decision-making agents. All agents share the same action and
+    observation spaces, and their observations, actions and rewards are
+    exchanged with the model in a single call per step (instead of running one
+    model per agent).
+
+    It follows the rllib ``MultiAgentEnv`` interface. Agent ids are the ones
+    returned by the AnyLogic model (``getAgentIds``).
+
+    Agents data is exchanged as raw bytes (big-endian ``float64``) so the whole
+    batch is transferred at once:
+
+    * Actions are sent as a matrix with one row per agent (in agent ids order)
+      and the flattened action as columns. Agents that do not act on a given
+      step have their row filled with ``NaN``.
+    * Results are received as ``[DONE, TRUNCATED, *AGENT_BLOCKS]``, where
+      ``TRUNCATED`` flags that the simulation was cut (e.g. by the model stop
+      time) instead of finishing, and every agent block is ``[READY, REWARD,
+      TERMINATED, *OBSERVATION (flattened)]``. ``READY`` flags whether the
+      agent requires an action.
+    """
+
+    def __init__(self, env_config=None):
+        """
+        Internal AnyLogic multi-agent environment constructor
+
+        :param env_config: Environment configuration. It accepts the options
+            of ``BaseAnyLogicEnv`` that set up the model connection and spaces
+            (e.g. ``'run_exported_model'``, ``'exported_model_loc'``,
+            ``'env_params'`` or ``'checkpoint_dir'``). Options of the single
+            agent step loop (``'reset_from_snapshot'``,
+            ``'model_checkpoint_freq'``, ``'action_repeat'``,
+            ``'trajectory_dir'`` and ``'prefetch_reset'``) are not supported
+            and raise an exception. Spaces refer to a single agent.
+        :type env_config: dict
+        """
+        check_step_loop_options(env_config, 'BaseAnyLogicMultiAgentEnv')
+        super(BaseAnyLogicMultiAgentEnv, self).__init__()
+        # The connection to the AnyLogic model and the parsing of spaces is
+        # handled by `BaseAnyLogicEnv`. Spaces can still be defined by
+        # inheritance, in which case they are passed on.
+        self.anylogic_env = create_custom_env(
+            action_space=getattr(self, 'action_space', None),
+            observation_space=getattr(self, 'observation_space', None)
+        )(env_config)
+        self.anylogic_model = self.anylogic_env.anylogic_model
+        self.logger = self.anylogic_env.logger
+        self.action_space = self.anylogic_env.action_space
+        self.observation_space = self.anylogic_env.observation_space
+
+        # Check that the connector supports multiple agents.
+        if not utils.has_java_methods(
+            self.anylogic_model, ['getAgentIds', 'resetAgents', 'stepAgents']
+        ):
+            raise Exception(
+                "Multi-agent mode is not supported by the 'ALPypeRLConnector' "
+                "in your AnyLogic model! Please update it to a version that "
+                "implements 'getAgentIds', 'resetAgents' and 'stepAgents'."
+            )
+
+        # Make sure AnyLogic 'ActionSpace' and 'ObservationSpace' are parsed, so
+        # actions can be unflattened and observations flattened in the AnyLogic
+        # side.
+        if (
+            not hasattr(self.anylogic_env, 'anylogic_action_space')
+            or self.anylogic_env.anylogic_action_space is None
+        ):
+            self.anylogic_env.anylogic_action_space = utils.parse_gym_to_anylogic_rl_space(
+                anylogic_model=self.anylogic_model,
+                action_space=self.action_space
+            )
+        if (
+            not hasattr(self.anylogic_env, 'anylogic_observation_space')
+            or self.anylogic_env.anylogic_observation_space is None
+        ):
+            self.anylogic_env.anylogic_observation_space = utils.parse_gym_to_anylogic_rl_space(
+                anylogic_model=self.anylogic_model,
+                observation_space=self.observation_space
+            )
+        self.anylogic_action_space = self.anylogic_env.anylogic_action_space
+        self.anylogic_observation_space = self.anylogic_env.anylogic_observation_space
+
+        # Agents are fixed for the whole simulation.
+        self.agent_ids = [str(agent_id) for agent_id in self.anylogic_model.getAgentIds()]
+        self._agent_ids = set(self.agent_ids)
+        self.agent_index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+        self.action_dim = flatdim(self.action_space)
+        self.observation_dim = flatdim(self.observation_space)
+
+    def step(self, action_dict):
+        """`[INTERNAL]` Apply the actions of all agents that are waiting for one
+        and move the simulation on until the next agent requires an action"""
+        # Build the batch of flattened actions (one row per agent).
+        actions = np.full((len(self.agent_ids), self.action_dim), np.nan, dtype='>f8')
+        for agent_id, action in action_dict.items():
+            actions[self.agent_index[agent_id]] = flatten(self.action_space, action)
+        # Pass all actions to the AnyLogic model in a single call.
+        return self.__parse_agents_result(
+            self.anylogic_model.stepAgents(
+                actions.tobytes(),
+                self.anylogic_action_space,
+                self.anylogic_observation_space
+            )
+        )
+
+    def reset(self, *, seed=None, options=None):
+        """`[INTERNAL]` Reset function will restart the AnyLogic model to its
+        initial status and return the initial observations of the agents that
+        require an action"""
+        # Initialize seed by retrieving it from AnyLogic model
+        if seed is not None:
+            raise Exception("Passing a custom seed is not supported!")
+        super().reset(seed=self.anylogic_model.getSeed())
+        observations, _, _, _, infos = self.__parse_agents_result(
+            self.anylogic_model.resetAgents(
+                self.anylogic_observation_space,
+                utils.get_java_map(self.anylogic_model, self.anylogic_env.env_params)
+            )
+        )
+        # Save alpyperl spaces to a file if they have not been saved yet.
+        self.anylogic_env._save_spaces_if_missing()
+        return observations, infos
+
+    def close(self):
+        """`[INTERNAL]` Close executables if any was created"""
+        self.anylogic_env.close()
+
+    def __parse_agents_result(self, agents_result):
+        """`[INTERNAL]` Parse the raw bytes returned by the AnyLogic model into
+        rllib multi-agent dictionaries"""
+        result = np.frombuffer(agents_result, dtype='>f8')
+        # Split global flags from agents blocks (vectorized for all agents).
+        done = bool(result[0])
+        truncated = bool(result[1])
+        blocks = result[2:].reshape(len(self.agent_ids), 3 + self.observation_dim)
+        # Every agent gets its last observation when the simulation is cut.
+        active = (
+            np.arange(len(self.agent_ids))
+            if truncated
+            else np.flatnonzero((blocks[:, 0] != 0) | (blocks[:, 2] != 0))
+        )
+        observations, rewards, terminateds, truncateds, infos = {}, {}, {}, {}, {}
+        for i in active:
+            agent_id = self.agent_ids[i]
+            observations[agent_id] = unflatten(self.observation_space, blocks[i, 3:])
+            rewards[agent_id] = float(blocks[i, 1])
+            terminateds[agent_id] = bool(blocks[i, 2])
+            truncateds[agent_id] = truncated and not terminateds[agent_id]
+            infos[agent_id] = {}
+        terminateds['__all__'] = done and not truncated
+        truncateds['__all__'] = truncated
+        return observations, rewards, terminateds, truncateds, infos
@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import queue
+from threading import Thread
+import numpy as np
+from gymnasium.spaces.utils import flatdim
+from alpyperl.gym.envs import utils
+
+
+# Columns of every recorded transition: name -> (dtype, whether it has one
+# value per flattened observation/action dimension).
+COLUMNS = {
+    'episode_id': (np.int64, None),
+    'step': (np.int64, None),
+    'observation': (np.float32, 'observation'),
+    'action': (np.float32, 'action'),
+    'reward': (np.float64, None),
+    'terminated': (np.bool_, None),
+    'truncated': (np.bool_, None),
+    'next_observation': (np.float32, 'observation')
+}
+SHARD_INDEX_FILE = 'shard.json'
+
+
+class TrajectoryRecorder:
+    """`[INTERNAL]` Stream the transitions of an environment instance to disk.
+
+    Every column is written to a preallocated, memory-mapped ``.npy`` file of
+    ``chunk_size`` rows (``<shard_dir>/chunk_<N>/<column>.npy``). Copying the
+    values and writing the files is done by a background thread, so recording
+    a step only queues the (already flattened) values. Once a chunk is full,
+    it is flushed and added to the shard index (``shard.json``), which is
+    what ``TrajectoryReader`` reads.
+
+    :param shard_dir: The folder of this environment instance recordings
+    :type shard_dir: str
+    :param observation_space: The environment observation space
+    :type observation_space: gymnasium.spaces.Space
+    :param action_space: The environment action space
+    :type action_space: gymnasium.spaces.Space
+    :param chunk_size: Number of transitions per chunk. Defaults to ``4096``
+    :type chunk_size: int
+    """
+
+    def __init__(self, shard_dir, observation_space, action_space, chunk_size=4096):
+        self.shard_dir = shard_dir
+        self.chunk_size = chunk_size
+        self.dims = {
+            'observation': flatdim(observation_space),
+            'action': flatdim(action_space)
+        }
+        self.index = {
+            'observation_space': utils.space_to_dict(observation_space),
+            'action_space': utils.space_to_dict(action_space),
+            'chunk_size': chunk_size,
+            'chunks': []
+        }
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        # Bounded, so memory does not grow if the disk cannot keep up.
+        self.queue = queue.Queue(maxsize=chunk_size)
+        self.error = None
+        self.closed = False
+        self.thread = Thread(target=self.__write, daemon=True)
+        self.thread.start()
+
+    def start_episode(self, observation):
+        """Record the initial (flattened) observation of a new episode"""
+        self.__put(('reset', observation))
+
+    def record_step(self, action, reward, terminated, truncated, next_observation):
+        """Record a transition given the flattened action and observation"""
+        self.__put(('step', action, reward, terminated, truncated, next_observation))
+
+    def close(self):
+        """Write the pending transitions and close the current chunk"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise Exception(f"Trajectories could not be recorded at '{self.shard_dir}'") from self.error
+
+    def __put(self, item):
+        """`[INTERNAL]` Queue an item for the writer thread"""
+        if self.error is not None:
+            raise Exception(f"Trajectories could not be recorded at '{self.shard_dir}'") from self.error
+        self.queue.put(item)
+
+    def __write(self):
+        """`[INTERNAL]` Writer thread main loop"""
+        chunk = None
+        row = 0
+        episode_id = -1
+        step = 0
+        observation = None
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                if item[0] == 'reset':
+                    observation = item[1]
+                    episode_id += 1
+                    step = 0
+                    continue
+                _, action, reward, terminated, truncated, next_observation = item
+                if chunk is None:
+                    chunk = self.__open_chunk(len(self.index['chunks']))
+                    row = 0
+                chunk['episode_id'][row] = episode_id
+                chunk['step'][row] = step
+                chunk['observation'][row] = observation
+                chunk['action'][row] = action
+                chunk['reward'][row] = reward
+                chunk['terminated'][row] = terminated
+                chunk['truncated'][row] = truncated
+                chunk['next_observation'][row] = next_observation
+                observation = next_observation
+                step += 1
+                row += 1
+                if row == self.chunk_size:
+                    self.__close_chunk(chunk, row)
+                    chunk = None
+            if chunk is not None:
+                self.__close_chunk(chunk, row)
+        except Exception as e:
+            self.logger.error(f"Trajectory recorder failed: {e}")
+            self.error = e
+            # Keep consuming, so the environment is not blocked on a full
+            # queue before the error is raised.
+            while self.queue.get() is not None:
+                pass
+
+    def __open_chunk(self, chunk_id):
+        """`[INTERNAL]` Preallocate the column files of a new chunk"""
+        chunk_dir = f"{self.shard_dir}/chunk_{chunk_id:06d}"
+        os.makedirs(chunk_dir, exist_ok=True)
+        return {
+            name: np.lib.format.open_memmap(
+                f"{chunk_dir}/{name}.npy",
+                mode='w+',
+                dtype=dtype,
+                shape=(self.chunk_size,) if dim is None else (self.chunk_size, self.dims[dim])
+            )
+            for name, (dtype, dim) in COLUMNS.items()
+        }
+
+    def __close_chunk(self, chunk, num_rows):
+        """`[INTERNAL]` Flush a chunk and add it to the shard index"""
+        for column in chunk.values():
+            column.flush()
+        self.index['chunks'].append({
+            'name': f"chunk_{len(self.index['chunks']):06d}",
+            'num_rows': num_rows
+        })
+        # Written atomically, so readers never see a partial index.
+        index_file = f"{self.shard_dir}/{SHARD_INDEX_FILE}"
+        with open(f"{index_file}.tmp", 'w') as f:
+            json.dump(self.index, f)
+        os.replace(f"{index_file}.tmp", index_file)
+
+
+class TrajectoryReader:
+    """Lazy reader of the trajectories recorded with the ``'trajectory_dir'``
+    environment option. Columns are memory-mapped, so only the rows that are
+    actually used are read from disk. Available columns are ``episode_id``,
+    ``step``, ``observation``, ``action``, ``reward``, ``terminated``,
+    ``truncated`` and ``next_observation`` (observations and actions are
+    flattened, see ``observation_space`` and ``action_space`` to unflatten
+    them).
+
+    Only chunks that have been completed (or closed with the environment) are
+    visible.
+
+    :param trajectory_dir: The folder given as ``'trajectory_dir'``
+    :type trajectory_dir: str
+    """
+
+    def __init__(self, trajectory_dir):
+        self.trajectory_dir = trajectory_dir
+        self.shards = {}
+        for shard_name in sorted(os.listdir(trajectory_dir)):
+            index_file = f"{trajectory_dir}/{shard_name}/{SHARD_INDEX_FILE}"
+            if os.path.exists(index_file):
+                with open(index_file, 'r') as f:
+                    self.shards[shard_name] = json.load(f)
+        if len(self.shards) == 0:
+            raise Exception(f"No recorded trajectories found at '{trajectory_dir}'")
+        index = next(iter(self.shards.values()))
+        self.observation_space = utils.space_from_dict(index['observation_space'])
+        self.action_space = utils.space_from_dict(index['action_space'])
+
+    def __len__(self):
+        return sum(
+            chunk['num_rows'] for index in self.shards.values() for chunk in index['chunks']
+        )
+
+    def iter_chunks(self, columns=None, shard_names=None):
+        """Iterate over the recorded chunks
+
+        :param columns: The columns to be read. Defaults to all columns
+        :type columns: list
+        :param shard_names: The shards (i.e. environment instances) to be
+            read. Defaults to all shards
+        :type shard_names: list
+        :return: Dictionaries with the (memory-mapped) rows of every column
+        :rtype: Iterator[dict]
+        """
+        columns = columns if columns is not None else list(COLUMNS)
+        for shard_name in (shard_names if shard_names is not None else self.shards):
+            for chunk in self.shards[shard_name]['chunks']:
+                chunk_dir = f"{self.trajectory_dir}/{shard_name}/{chunk['name']}"
+                yield {
+                    column: np.load(f"{chunk_dir}/{column}.npy", mmap_mode='r')[:chunk['num_rows']]
+                    for column in columns
+                }
+
+    def iter_episodes(self, columns=None, shard_names=None):
+        """Iterate over the recorded episodes. Only one episode is kept in
+        memory at a time. Episodes that were interrupted (e.g. when the
+        environment was closed) are also returned
+
+        :param columns: The columns to be read. Defaults to all columns
+        :type columns: list
+        :param shard_names: The shards (i.e. environment instances) to be
+            read. Defaults to all shards
+        :type shard_names: list
+        :return: Dictionaries with the rows of every column
+        :rtype: Iterator[dict]
+        """
+        columns = columns if columns is not None else list(COLUMNS)
+        read_columns = columns if 'episode_id' in columns else columns + ['episode_id']
+        for shard_name in (shard_names if shard_names is not None else self.shards):
+            # Parts of the current episode (it can span several chunks).
+            parts = []
+            for chunk in self.iter_chunks(read_columns, [shard_name]):
+                episode_ids = chunk['episode_id']
+                # Rows where a new episode starts.
+                starts = np.flatnonzero(np.diff(episode_ids)) + 1
+                for start, end in zip(np.r_[0, starts], np.r_[starts, len(episode_ids)]):
+                    if parts and parts[-1]['episode_id'][-1] != episode_ids[start]:
+                        yield self.__concatenate(parts, columns)
+                        parts = []
+                    parts.append({column: chunk[column][start:end] for column in read_columns})
+            if parts:
+                yield self.__concatenate(parts, columns)
+
+    def read(self, columns=None, shard_names=None):
+        """Read the given columns of all transitions at once
+
+        :return: A dictionary with all the rows of every column
+        :rtype: dict
+        """
+        columns = columns if columns is not None else list(COLUMNS)
+        chunks = list(self.iter_chunks(columns, shard_names))
+        return {
+            column: np.concatenate([chunk[column] for chunk in chunks])
+            for column in columns
+        }
+
+    def __concatenate(self, parts, columns):
+        """`[INTERNAL]` Join the parts of an episode"""
+        return {column: np.concatenate([part[column] for part in parts]) for column in columns}
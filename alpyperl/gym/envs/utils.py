@@ -1,8 +1,6 @@
 from gymnasium import spaces
-from gymnasium.spaces.utils import flatdim
+from gymnasium.spaces.utils import flatdim, flatten, unflatten
 import numpy as np
-from py4j.java_gateway import is_instance_of, get_java_class, java_import
-from py4j.java_collections import JavaList
 import pickle
 import os
 from filelock import FileLock
@@ -91,6 +89,9 @@ def __convert_gym_space_to_anylogic(anylogic_model, space):
 
 def __convert_anylogic_space_to_gym(anylogic_model, anylogic_space):
     """[INTERNAL] Convert AnyLogic Java 'GymSpace' to gym.spaces equivalent"""
+    # Imported here, so serving and evaluation code using the space helpers
+    # below does not depend on 'py4j'.
+    from py4j.java_gateway import is_instance_of, get_java_class
     if is_instance_of(anylogic_model, anylogic_space, anylogic_model.jvm.com.alpype.GymSpaces.Discrete):
         return spaces.Discrete(n=anylogic_space.sampleSize())
     elif is_instance_of(anylogic_model, anylogic_space, anylogic_model.jvm.com.alpype.GymSpaces.Box):
@@ -175,6 +176,16 @@ def __get_java_array(anylogic_model, array, jtype='Number'):
         jarray[i] = int(v) if np.issubdtype(type(v), np.integer) else float(v)
     return jarray
 
+def has_java_methods(anylogic_model, method_names):
+    """[INTERNAL] Check whether the AnyLogic model controller implements all the
+    given methods. Used to validate optional features that require a recent
+    version of the 'ALPypeRLConnector'"""
+    # Retrieve the names of the public methods exposed by the Java entry point.
+    java_methods = {
+        m.getName() for m in anylogic_model.entry_point.getClass().getMethods()
+    }
+    return all(name in java_methods for name in method_names)
+
 def get_java_map(anylogic_model, python_dict):
     """[INTERNAL] Convert Python dictionary to Java map"""
     # Create java map using 'py4j' given data type
@@ -184,6 +195,113 @@ def get_java_map(anylogic_model, python_dict):
         jmap.put(k, v)
     return jmap
 
+def unflatten_batch(space, flattened_batch):
+    """Unflatten a batch of flattened samples (one per row) into a list of
+    samples of the given space. It is the vectorized equivalent of calling
+    `gymnasium.spaces.utils.unflatten` on every row"""
+    flattened_batch = np.asarray(flattened_batch)
+    batch_size = flattened_batch.shape[0]
+    if isinstance(space, (spaces.Box, spaces.MultiBinary)):
+        return list(
+            np.asarray(flattened_batch, dtype=space.dtype).reshape((batch_size,) + space.shape)
+        )
+    elif isinstance(space, spaces.Discrete):
+        return list(space.start + np.argmax(flattened_batch != 0, axis=1))
+    elif isinstance(space, spaces.MultiDiscrete) and len(space.nvec.shape) == 1:
+        # Every sub-space is one-hot encoded and concatenated.
+        offsets = np.zeros((space.nvec.size + 1,), dtype=np.int64)
+        offsets[1:] = np.cumsum(space.nvec)
+        indices = np.stack(
+            [
+                np.argmax(flattened_batch[:, offsets[i]:offsets[i + 1]] != 0, axis=1)
+                for i in range(space.nvec.size)
+            ],
+            axis=1
+        )
+        return list(
+            np.asarray(indices + getattr(space, 'start', 0), dtype=space.dtype)
+        )
+    elif isinstance(space, (spaces.Tuple, spaces.Dict)) and space.is_np_flattenable:
+        # Split columns by sub-space and unflatten each of them separately.
+        sub_spaces = (
+            space.spaces if isinstance(space, spaces.Tuple) else list(space.spaces.values())
+        )
+        offsets = np.cumsum([0] + [flatdim(s) for s in sub_spaces])
+        sub_batches = [
+            unflatten_batch(s, flattened_batch[:, offsets[i]:offsets[i + 1]])
+            for i, s in enumerate(sub_spaces)
+        ]
+        if isinstance(space, spaces.Tuple):
+            return [tuple(sample) for sample in zip(*sub_batches)]
+        return [dict(zip(space.spaces.keys(), sample)) for sample in zip(*sub_batches)]
+    # Fallback to unflatten samples one by one.
+    return [unflatten(space, row) for row in flattened_batch]
+
+def flatten_batch(space, batch):
+    """Flatten a list of samples of the given space into a 2D array with one
+    flattened sample per row"""
+    if isinstance(space, spaces.Box):
+        return np.asarray(batch, dtype=space.dtype).reshape((len(batch), -1))
+    return np.stack([flatten(space, sample) for sample in batch])
+
+def space_to_dict(space):
+    """Describe a space as a JSON serialisable dictionary (e.g. to share it
+    with a client without pickling it). Non finite bounds are stored as
+    strings"""
+    def bounds(array):
+        return [v if np.isfinite(v) else str(v) for v in np.asarray(array, dtype=np.float64).ravel().tolist()]
+
+    if isinstance(space, spaces.Box):
+        return {
+            'type': 'Box',
+            'low': bounds(space.low),
+            'high': bounds(space.high),
+            'shape': list(space.shape),
+            'dtype': str(space.dtype)
+        }
+    elif isinstance(space, spaces.Discrete):
+        return {'type': 'Discrete', 'n': int(space.n), 'start': int(space.start)}
+    elif isinstance(space, spaces.MultiDiscrete):
+        return {
+            'type': 'MultiDiscrete',
+            'nvec': space.nvec.tolist(),
+            'start': np.asarray(getattr(space, 'start', np.zeros_like(space.nvec))).tolist()
+        }
+    elif isinstance(space, spaces.MultiBinary):
+        return {'type': 'MultiBinary', 'n': np.asarray(space.n).tolist()}
+    elif isinstance(space, spaces.Tuple):
+        return {'type': 'Tuple', 'spaces': [space_to_dict(s) for s in space.spaces]}
+    elif isinstance(space, spaces.Dict):
+        return {'type': 'Dict', 'spaces': {k: space_to_dict(s) for k, s in space.spaces.items()}}
+    raise Exception(f"Unsupported space type: {type(space)}")
+
+def space_from_dict(space_dict):
+    """Re-create a space described with `space_to_dict`"""
+    space_type = space_dict['type']
+    if space_type == 'Box':
+        dtype = np.dtype(space_dict['dtype'])
+        shape = tuple(space_dict['shape'])
+        return spaces.Box(
+            low=np.array(space_dict['low'], dtype=np.float64).astype(dtype).reshape(shape),
+            high=np.array(space_dict['high'], dtype=np.float64).astype(dtype).reshape(shape),
+            shape=shape,
+            dtype=dtype
+        )
+    elif space_type == 'Discrete':
+        return spaces.Discrete(n=space_dict['n'], start=space_dict['start'])
+    elif space_type == 'MultiDiscrete':
+        # Only recent versions of gymnasium support a custom 'start'.
+        if any(np.asarray(space_dict['start']).ravel()):
+            return spaces.MultiDiscrete(nvec=space_dict['nvec'], start=space_dict['start'])
+        return spaces.MultiDiscrete(nvec=space_dict['nvec'])
+    elif space_type == 'MultiBinary':
+        return spaces.MultiBinary(n=space_dict['n'])
+    elif space_type == 'Tuple':
+        return spaces.Tuple([space_from_dict(s) for s in space_dict['spaces']])
+    elif space_type == 'Dict':
+        return spaces.Dict({k: space_from_dict(s) for k, s in space_dict['spaces'].items()})
+    raise Exception(f"Unsupported space type: {space_type}")
+
 def load_space(location_path):
     """[INTERNAL] Load space from given location"""
     # Load space from given location using pickle
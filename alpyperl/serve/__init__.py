@@ -0,0 +1,13 @@
+from alpyperl._lazy import lazy_module
+
+# Imported on first access (PEP 562), so every entry point only pays for the
+# dependencies it uses (e.g. 'httpx' is only needed by the clients).
+_LAZY_IMPORTS = {
+    'NumpyPolicy': ('alpyperl.serve.numpy_policy', 'NumpyPolicy'),
+    'PolicyClient': ('alpyperl.serve.client', 'PolicyClient'),
+    'AsyncPolicyClient': ('alpyperl.serve.client', 'AsyncPolicyClient')
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
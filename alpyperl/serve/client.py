@@ -0,0 +1,388 @@
+import asyncio
+import json
+import time
+import httpx
+import numpy as np
+from alpyperl.gym.envs import utils
+from alpyperl.serve import encoding
+from alpyperl.serve.rllib.batching import MicroBatcher
+
+
+class BasePolicyClient:
+    """`[INTERNAL]` Encoding and spaces handling shared by the sync and async
+    clients"""
+
+    def __init__(self, url, uds, binary, observation_space, action_space):
+        self.url = url
+        self.uds = uds
+        self.encoding = encoding.OCTET_STREAM if binary else encoding.JSON
+        self.headers = {'content-type': self.encoding, 'accept': self.encoding}
+        self.observation_space = observation_space
+        self.action_space = action_space
+
+    def _encode_observations(self, observations, single=False):
+        """Encode a matrix of flattened observations as a request body. Single
+        JSON observations are sent as a flat list"""
+        if self.encoding == encoding.JSON:
+            return json.dumps(observations[0].tolist() if single else observations.tolist()).encode()
+        return encoding.encode_array(observations, self.encoding)
+
+    def _decode_actions(self, response, num_observations, single=False):
+        """Decode the flattened actions of a response (one per row)"""
+        response.raise_for_status()
+        if self.encoding == encoding.JSON:
+            data = response.json()
+            return np.asarray([data['action']] if single else data['actions'])
+        return np.frombuffer(response.content, dtype=encoding.BINARY_DTYPE).reshape(
+            (num_observations, -1)
+        )
+
+    def _set_spaces(self, spaces_dict):
+        """Set the spaces described by the server (``/get_spaces``)"""
+        if self.observation_space is None:
+            self.observation_space = utils.space_from_dict(spaces_dict['observation_space'])
+        if self.action_space is None:
+            self.action_space = utils.space_from_dict(spaces_dict['action_space'])
+
+    def _flatten_observations(self, observations):
+        """Flatten a list of observations (one per row)"""
+        return utils.flatten_batch(self.observation_space, observations)
+
+    def _unflatten_actions(self, flattened_actions):
+        """Unflatten a matrix of flattened actions into a list of actions"""
+        return utils.unflatten_batch(self.action_space, flattened_actions)
+
+
+class PolicyClient(BasePolicyClient):
+    """Client of the policy server launched with
+    ``alpyperl.serve.rllib.launch_policy_server``. It keeps a pool of
+    keep-alive connections to the server, and exchanges observations and
+    actions as raw ``float32`` values (or JSON if ``binary=False``).
+
+    Observations and actions can be exchanged flattened (``predict`` and
+    ``predict_batch``) or as samples of the spaces the policy was trained with
+    (``compute_action`` and ``compute_actions``). In the latter case, spaces
+    are retrieved from the server unless they are given.
+
+    :param url: The server url. Defaults to ``http://localhost:3000``
+    :type url: str
+    :param uds: Path of the Unix domain socket the server listens on (e.g.
+        ``/tmp/alpyperl.sock``). If provided, ``url`` is only used to build the
+        request paths
+    :type uds: str
+    :param binary: Whether observations and actions are sent as raw ``float32``
+        values (``application/octet-stream``) or as JSON. Defaults to ``True``
+    :type binary: bool
+    :param timeout: Maximum time (in seconds) to wait for a response. Defaults
+        to ``10.0``
+    :type timeout: float
+    :param max_connections: Maximum number of connections kept open with the
+        server. Defaults to ``10``
+    :type max_connections: int
+    :param batch_size: Maximum number of observations sent per request by
+        ``compute_actions``. Defaults to ``256``
+    :type batch_size: int
+    :param observation_space: The observation space the policy was trained
+        with (optional)
+    :type observation_space: gymnasium.spaces
+    :param action_space: The action space the policy was trained with
+        (optional)
+    :type action_space: gymnasium.spaces
+    """
+
+    def __init__(
+        self,
+        url="http://localhost:3000",
+        uds=None,
+        binary=True,
+        timeout=10.0,
+        max_connections=10,
+        batch_size=256,
+        observation_space=None,
+        action_space=None
+    ):
+        super(PolicyClient, self).__init__(url, uds, binary, observation_space, action_space)
+        self.batch_size = batch_size
+        self.client = httpx.Client(
+            base_url=url,
+            transport=httpx.HTTPTransport(
+                uds=uds,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                )
+            ),
+            headers=self.headers,
+            timeout=timeout
+        )
+
+    def predict(self, observation):
+        """Compute the action of a single flattened observation
+
+        :param observation: The flattened observation
+        :type observation: numpy.ndarray
+        :return: The flattened action
+        :rtype: numpy.ndarray
+        """
+        observations = np.asarray(observation).reshape((1, -1))
+        response = self.client.post(
+            "/predict", content=self._encode_observations(observations, single=True)
+        )
+        return self._decode_actions(response, 1, single=True)[0]
+
+    def predict_batch(self, observations):
+        """Compute the actions of a batch of flattened observations in a
+        single request
+
+        :param observations: Matrix of flattened observations (one per row)
+        :type observations: numpy.ndarray
+        :return: Matrix of flattened actions (one per row)
+        :rtype: numpy.ndarray
+        """
+        observations = np.asarray(observations)
+        response = self.client.post("/predict_batch", content=self._encode_observations(observations))
+        return self._decode_actions(response, observations.shape[0])
+
+    def compute_action(self, observation):
+        """Compute the action of an observation of the policy observation space
+
+        :param observation: The observation
+        :return: The action (a sample of the action space)
+        """
+        return self.compute_actions([observation])[0]
+
+    def compute_actions(self, observations):
+        """Compute the actions of a list of observations of the policy
+        observation space. Observations are sent in batches of up to
+        ``batch_size``
+
+        :param observations: The observations
+        :type observations: list
+        :return: The actions (samples of the action space)
+        :rtype: list
+        """
+        self.get_spaces()
+        flattened_observations = self._flatten_observations(observations)
+        flattened_actions = np.concatenate([
+            self.predict_batch(flattened_observations[i:i + self.batch_size])
+            for i in range(0, len(observations), self.batch_size)
+        ])
+        return self._unflatten_actions(flattened_actions)
+
+    def get_spaces(self):
+        """Get the observation and action spaces of the policy, retrieving them
+        from the server if they were not given
+
+        :return: The observation space and the action space
+        :rtype: tuple
+        """
+        if self.observation_space is None or self.action_space is None:
+            response = self.client.get("/get_spaces")
+            response.raise_for_status()
+            self._set_spaces(response.json())
+        return self.observation_space, self.action_space
+
+    def close(self):
+        """Close the connections to the server"""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncPolicyClient(BasePolicyClient):
+    """Asynchronous version of ``PolicyClient`` (to be used with ``asyncio``).
+    Many requests can be sent concurrently over the pool of connections.
+
+    If ``auto_batch`` is enabled, concurrent ``predict`` and
+    ``compute_action`` calls are gathered on the client side and sent together
+    to ``/predict_batch`` when either ``max_batch_size`` or
+    ``max_batch_wait_ms`` is reached.
+
+    :param url: The server url. Defaults to ``http://localhost:3000``
+    :type url: str
+    :param uds: Path of the Unix domain socket the server listens on
+    :type uds: str
+    :param binary: Whether observations and actions are sent as raw ``float32``
+        values (``application/octet-stream``) or as JSON. Defaults to ``True``
+    :type binary: bool
+    :param timeout: Maximum time (in seconds) to wait for a response. Defaults
+        to ``10.0``
+    :type timeout: float
+    :param max_connections: Maximum number of connections kept open with the
+        server. Defaults to ``10``
+    :type max_connections: int
+    :param auto_batch: Whether concurrent single observation requests are
+        sent together. Defaults to ``False``
+    :type auto_batch: bool
+    :param max_batch_size: Maximum number of observations per request when
+        ``auto_batch`` is enabled (and per request of ``compute_actions``).
+        Defaults to ``32``
+    :type max_batch_size: int
+    :param max_batch_wait_ms: Maximum time (in milliseconds) an observation
+        waits for others to be sent with. Defaults to ``1.0``
+    :type max_batch_wait_ms: float
+    :param observation_space: The observation space the policy was trained
+        with (optional)
+    :type observation_space: gymnasium.spaces
+    :param action_space: The action space the policy was trained with
+        (optional)
+    :type action_space: gymnasium.spaces
+    """
+
+    def __init__(
+        self,
+        url="http://localhost:3000",
+        uds=None,
+        binary=True,
+        timeout=10.0,
+        max_connections=10,
+        auto_batch=False,
+        max_batch_size=32,
+        max_batch_wait_ms=1.0,
+        observation_space=None,
+        action_space=None
+    ):
+        super(AsyncPolicyClient, self).__init__(url, uds, binary, observation_space, action_space)
+        self.max_batch_size = max_batch_size
+        self.client = httpx.AsyncClient(
+            base_url=url,
+            transport=httpx.AsyncHTTPTransport(
+                uds=uds,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                )
+            ),
+            headers=self.headers,
+            timeout=timeout
+        )
+
+        async def predict_rows(observations):
+            return list(await self.predict_batch(np.stack(observations)))
+
+        self.batcher = MicroBatcher(
+            batch_fn=predict_rows,
+            max_batch_size=max_batch_size,
+            max_batch_wait_ms=max_batch_wait_ms,
+            max_concurrent_batches=max_connections
+        ) if auto_batch else None
+
+    async def predict(self, observation):
+        """Compute the action of a single flattened observation"""
+        observation = np.asarray(observation).reshape((-1,))
+        if self.batcher is not None:
+            return await self.batcher.submit(observation)
+        response = await self.client.post(
+            "/predict", content=self._encode_observations(observation[None], single=True)
+        )
+        return self._decode_actions(response, 1, single=True)[0]
+
+    async def predict_batch(self, observations):
+        """Compute the actions of a batch of flattened observations in a
+        single request"""
+        observations = np.asarray(observations)
+        response = await self.client.post(
+            "/predict_batch", content=self._encode_observations(observations)
+        )
+        return self._decode_actions(response, observations.shape[0])
+
+    async def compute_action(self, observation):
+        """Compute the action of an observation of the policy observation
+        space"""
+        await self.get_spaces()
+        flattened_action = await self.predict(self._flatten_observations([observation])[0])
+        return self._unflatten_actions(flattened_action[None])[0]
+
+    async def compute_actions(self, observations):
+        """Compute the actions of a list of observations of the policy
+        observation space. Batches of up to ``max_batch_size`` observations
+        are sent concurrently"""
+        await self.get_spaces()
+        flattened_observations = self._flatten_observations(observations)
+        flattened_actions = await asyncio.gather(*[
+            self.predict_batch(flattened_observations[i:i + self.max_batch_size])
+            for i in range(0, len(observations), self.max_batch_size)
+        ])
+        return self._unflatten_actions(np.concatenate(flattened_actions))
+
+    async def get_spaces(self):
+        """Get the observation and action spaces of the policy, retrieving them
+        from the server if they were not given"""
+        if self.observation_space is None or self.action_space is None:
+            response = await self.client.get("/get_spaces")
+            response.raise_for_status()
+            self._set_spaces(response.json())
+        return self.observation_space, self.action_space
+
+    async def close(self):
+        """Close the connections to the server"""
+        if self.batcher is not None:
+            self.batcher.close()
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+def measure_latency(client, observation, num_requests=1000, warmup=100):
+    """Measure the round-trip latency of ``/predict`` requests sent one after
+    the other
+
+    :param client: The client connected to the server
+    :type client: alpyperl.serve.PolicyClient
+    :param observation: The flattened observation to send
+    :type observation: numpy.ndarray
+    :param num_requests: Number of requests measured. Defaults to ``1000``
+    :type num_requests: int
+    :param warmup: Number of requests sent (and discarded) before measuring.
+        Defaults to ``100``
+    :type warmup: int
+    :return: Mean and percentiles of the latency (in milliseconds)
+    :rtype: dict
+    """
+    for _ in range(warmup):
+        client.predict(observation)
+    latencies = np.empty(num_requests)
+    for i in range(num_requests):
+        start = time.perf_counter()
+        client.predict(observation)
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1000.0
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99))
+    }
+
+def compare_transport_latency(observation, url="http://localhost:3000", uds=None, num_requests=1000, binary=True):
+    """Compare the ``/predict`` latency of a policy server reached over TCP
+    against one reached over a Unix domain socket (both serving the same
+    policy on the same host)
+
+    :param observation: The flattened observation to send
+    :type observation: numpy.ndarray
+    :param url: The url of the server listening on TCP
+    :type url: str
+    :param uds: Path of the Unix domain socket of the other server
+    :type uds: str
+    :param num_requests: Number of requests measured per transport
+    :type num_requests: int
+    :param binary: Whether raw ``float32`` bodies are used instead of JSON
+    :type binary: bool
+    :return: The latency statistics of every transport (``'tcp'`` and
+        ``'uds'``)
+    :rtype: dict
+    """
+    results = {}
+    for transport, kwargs in [('tcp', {'url': url}), ('uds', {'uds': uds})]:
+        with PolicyClient(binary=binary, **kwargs) as client:
+            results[transport] = measure_latency(client, observation, num_requests=num_requests)
+    return results
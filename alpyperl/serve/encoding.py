@@ -0,0 +1,80 @@
+import json
+import numpy as np
+
+
+# Supported request/response encodings (chosen by 'Content-Type').
+JSON = 'application/json'
+OCTET_STREAM = 'application/octet-stream'
+MSGPACK = 'application/msgpack'
+
+# Binary data is always exchanged as little-endian float32, row-major.
+BINARY_DTYPE = np.dtype('<f4')
+
+
+class EncodingError(Exception):
+    """Raised when a body cannot be encoded or decoded"""
+
+
+def parse_content_type(content_type):
+    """Return the supported encoding given a 'Content-Type' header value.
+    Defaults to JSON"""
+    media_type = (content_type or JSON).split(';')[0].strip().lower()
+    if media_type in ['application/x-msgpack', MSGPACK]:
+        return MSGPACK
+    elif media_type == OCTET_STREAM:
+        return OCTET_STREAM
+    elif media_type == JSON:
+        return JSON
+    raise EncodingError(f"Unsupported content type: '{content_type}'")
+
+def decode_array(body, encoding, num_cols, key='observations'):
+    """Decode a request/response body into a 2D array with ``num_cols``
+    columns (one row per observation or action).
+
+    * JSON: a flat list (single row) or a list of lists. If it is an object,
+      the list is read from ``key``.
+    * octet-stream: raw float32 values.
+    * msgpack: a map with the raw float32 values under ``key`` (as binary).
+    """
+    if encoding == JSON:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data[key]
+        array = np.asarray(data, dtype=np.float64)
+    elif encoding == OCTET_STREAM:
+        array = np.frombuffer(body, dtype=BINARY_DTYPE)
+    elif encoding == MSGPACK:
+        msgpack = __import_msgpack()
+        array = np.frombuffer(msgpack.unpackb(body)[key], dtype=BINARY_DTYPE)
+    else:
+        raise EncodingError(f"Unsupported encoding: '{encoding}'")
+    if array.size % num_cols != 0:
+        raise EncodingError(
+            f"Expected a multiple of {num_cols} values, but received {array.size}"
+        )
+    return array.reshape((-1, num_cols))
+
+def encode_array(array, encoding, key='actions'):
+    """Encode a 2D array (one row per observation or action) as a body. JSON
+    bodies are objects with the list of rows under ``key``"""
+    if encoding == JSON:
+        return json.dumps({key: np.asarray(array).tolist()}).encode()
+    elif encoding == OCTET_STREAM:
+        return np.ascontiguousarray(array, dtype=BINARY_DTYPE).tobytes()
+    elif encoding == MSGPACK:
+        msgpack = __import_msgpack()
+        return msgpack.packb({
+            key: np.ascontiguousarray(array, dtype=BINARY_DTYPE).tobytes()
+        })
+    raise EncodingError(f"Unsupported encoding: '{encoding}'")
+
+def __import_msgpack():
+    """[INTERNAL] Import optional msgpack dependency"""
+    try:
+        import msgpack
+    except ImportError:
+        raise EncodingError(
+            "Package 'msgpack' is required for 'application/msgpack' bodies. "
+            "Install it with 'pip install msgpack'"
+        )
+    return msgpack
@@ -0,0 +1,286 @@
+"""Load generator for the policy server. It sweeps over endpoints, concurrency
+levels and payload sizes (observations per request), and reports throughput,
+latency percentiles and error rates as JSON.
+
+By default it launches a local server hosting a small synthetic policy::
+
+    python -m alpyperl.serve.loadtest --concurrency 1 8 32 --batch-sizes 1 16
+
+Use ``--url`` to test a server that is already running instead. Requests are
+sent from a single process, so run several load generators at once if the
+client becomes the bottleneck (i.e. its CPU usage is close to 100%).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import os
+import httpx
+import numpy as np
+from gymnasium import spaces
+from gymnasium.spaces.utils import flatdim
+from alpyperl.gym.envs import utils
+from alpyperl.serve import encoding
+from alpyperl.serve.numpy_policy import NumpyPolicy
+
+
+def create_synthetic_policy(observation_dim=16, num_actions=4, hidden_layers=(64, 64), seed=0):
+    """Create a fully connected policy with random weights, a ``Box``
+    observation space and a ``Discrete`` action space
+
+    :param observation_dim: Number of observation values
+    :type observation_dim: int
+    :param num_actions: Number of discrete actions
+    :type num_actions: int
+    :param hidden_layers: Size of every hidden layer
+    :type hidden_layers: tuple
+    :param seed: Seed of the random weights
+    :type seed: int
+    :return: The policy
+    :rtype: alpyperl.serve.NumpyPolicy
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [observation_dim] + list(hidden_layers) + [num_actions]
+    return NumpyPolicy(
+        layers=[
+            (rng.normal(scale=1.0 / np.sqrt(n_in), size=(n_in, n_out)), np.zeros(n_out))
+            for n_in, n_out in zip(sizes[:-1], sizes[1:])
+        ],
+        activation='tanh',
+        action_dist='categorical',
+        action_config={'n': num_actions},
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(observation_dim,)),
+        action_space=spaces.Discrete(n=num_actions)
+    )
+
+@contextlib.contextmanager
+def launch_synthetic_server(policy=None, host="127.0.0.1", port=None, startup_timeout_s=30.0, **server_kwargs):
+    """Launch a policy server hosting the given (or a synthetic) policy in a
+    separate process, and stop it on exit
+
+    :param policy: The policy to host. Defaults to ``create_synthetic_policy()``
+    :type policy: alpyperl.serve.NumpyPolicy
+    :param host: The host ID to be used
+    :type host: str
+    :param port: The port the server will listen on. Defaults to a free port
+    :type port: int
+    :param startup_timeout_s: Maximum time (in seconds) to wait for the server
+    :type startup_timeout_s: float
+    :param server_kwargs: Any other option of ``launch_policy_server``
+    :return: The server url
+    :rtype: str
+    """
+    from alpyperl.anylogic.model.connector import get_open_port
+    policy = policy if policy is not None else create_synthetic_policy()
+    port = port if port is not None else get_open_port()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        policy_loc = os.path.join(tmp_dir, 'policy.npz')
+        policy.save(policy_loc)
+        server_script = textwrap.dedent(f"""
+            from alpyperl.serve.rllib import launch_policy_server
+
+            launch_policy_server(
+                exported_policy_loc={policy_loc!r}, host={host!r}, port={port!r}, **{server_kwargs!r}
+            )
+        """)
+        # Server logs are not mixed with the results.
+        process = subprocess.Popen([sys.executable, "-c", server_script], stdout=subprocess.DEVNULL)
+        url = f"http://{host}:{port}"
+        try:
+            deadline = time.perf_counter() + startup_timeout_s
+            while True:
+                try:
+                    httpx.get(f"{url}/")
+                    break
+                except httpx.TransportError:
+                    if process.poll() is not None or time.perf_counter() > deadline:
+                        raise Exception(f"Policy server at '{url}' could not be launched.")
+                    time.sleep(0.1)
+            yield url
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+async def run_load(
+    url,
+    endpoint='predict',
+    concurrency=1,
+    batch_size=1,
+    duration_s=5.0,
+    observation_dim=None,
+    binary=True
+):
+    """Send requests to an endpoint from ``concurrency`` concurrent clients
+    (one after the other each) during ``duration_s`` seconds
+
+    :param url: The server url
+    :type url: str
+    :param endpoint: Either ``'predict'`` or ``'predict_batch'``
+    :type endpoint: str
+    :param concurrency: Number of concurrent clients
+    :type concurrency: int
+    :param batch_size: Observations per request (``'predict_batch'`` only)
+    :type batch_size: int
+    :param duration_s: Duration of the test (in seconds)
+    :type duration_s: float
+    :param observation_dim: Number of flattened observation values. Retrieved
+        from the server if not provided
+    :type observation_dim: int
+    :param binary: Whether bodies are sent as raw ``float32`` values or JSON
+    :type binary: bool
+    :return: Throughput, latency percentiles (in milliseconds) and error rate.
+        Throughputs are ``0`` and latencies ``None`` if no request succeeded
+    :rtype: dict
+    """
+    if endpoint not in ['predict', 'predict_batch']:
+        raise Exception(f"Unsupported endpoint: '{endpoint}'")
+    batch_size = batch_size if endpoint == 'predict_batch' else 1
+    content_type = encoding.OCTET_STREAM if binary else encoding.JSON
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        if observation_dim is None:
+            response = await client.get("/get_spaces")
+            response.raise_for_status()
+            observation_dim = flatdim(utils.space_from_dict(response.json()['observation_space']))
+        # Same payload for every request, so only the server is measured.
+        observations = np.random.default_rng(0).uniform(-1.0, 1.0, size=(batch_size, observation_dim))
+        if binary:
+            body = encoding.encode_array(observations, content_type)
+        else:
+            body = json.dumps(
+                observations[0].tolist() if endpoint == 'predict' else observations.tolist()
+            ).encode()
+        headers = {'content-type': content_type}
+
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration_s
+
+        async def send_requests():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"/{endpoint}", content=body, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[send_requests() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    num_requests = len(latencies) + errors
+    result = {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'encoding': content_type,
+        'duration_s': elapsed,
+        'requests': num_requests,
+        'successes': len(latencies),
+        'errors': errors,
+        'error_rate': errors / num_requests if num_requests > 0 else 0.0
+    }
+    # No request succeeded (e.g. the server is unreachable or the duration is
+    # too short): there is no throughput nor latency to report.
+    if not latencies:
+        return {
+            **result,
+            'requests_per_s': 0.0,
+            'observations_per_s': 0.0,
+            'latency_ms': {name: None for name in ['mean', 'p50', 'p90', 'p99', 'max']}
+        }
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        **result,
+        'requests_per_s': len(latencies) / elapsed,
+        'observations_per_s': len(latencies) * batch_size / elapsed,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()),
+            **{f'p{p}': float(np.percentile(latencies_ms, p)) for p in [50, 90, 99]},
+            'max': float(latencies_ms.max())
+        }
+    }
+
+def run_sweep(
+    url,
+    endpoints=('predict', 'predict_batch'),
+    concurrencies=(1, 8, 32),
+    batch_sizes=(1, 16),
+    duration_s=5.0,
+    binary=True
+):
+    """Run ``run_load`` for every combination of endpoint, concurrency and
+    batch size (batch sizes only apply to ``'predict_batch'``)
+
+    :return: The results of every combination
+    :rtype: list
+    """
+    results = []
+    for endpoint in endpoints:
+        for concurrency in concurrencies:
+            for batch_size in (batch_sizes if endpoint == 'predict_batch' else [1]):
+                results.append(asyncio.run(run_load(
+                    url,
+                    endpoint=endpoint,
+                    concurrency=concurrency,
+                    batch_size=batch_size,
+                    duration_s=duration_s,
+                    binary=binary
+                )))
+    return results
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load test the ALPypeRL policy server.")
+    parser.add_argument('--url', help="Url of a running server. If not provided, a server hosting a synthetic policy is launched.")
+    parser.add_argument('--endpoints', nargs='+', default=['predict', 'predict_batch'], choices=['predict', 'predict_batch'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 16])
+    parser.add_argument('--duration', type=float, default=5.0, help="Duration (in seconds) of every combination.")
+    parser.add_argument('--json', action='store_true', help="Send JSON bodies instead of raw float32 values.")
+    parser.add_argument('--observation-dim', type=int, default=16, help="Observation size of the synthetic policy.")
+    parser.add_argument('--max-batch-size', type=int, default=32, help="Server micro-batch size (synthetic server only).")
+    parser.add_argument('--output', help="File to write the results to (JSON). Printed if not provided.")
+    args = parser.parse_args(argv)
+
+    def sweep(url):
+        return run_sweep(
+            url,
+            endpoints=args.endpoints,
+            concurrencies=args.concurrency,
+            batch_sizes=args.batch_sizes,
+            duration_s=args.duration,
+            binary=not args.json
+        )
+
+    if args.url is not None:
+        results = sweep(args.url)
+    else:
+        with launch_synthetic_server(
+            policy=create_synthetic_policy(observation_dim=args.observation_dim),
+            max_batch_size=args.max_batch_size
+        ) as url:
+            results = sweep(url)
+
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return results
+
+
+if __name__ == '__main__':
+    main()
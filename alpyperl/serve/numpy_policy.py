@@ -0,0 +1,184 @@
+import json
+import numpy as np
+
+
+# Activation functions supported by rllib fully connected networks.
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'elu': lambda x: np.where(x > 0.0, x, np.expm1(x)),
+    'swish': lambda x: x / (1.0 + np.exp(-x)),
+    'silu': lambda x: x / (1.0 + np.exp(-x))
+}
+
+
+class NumpyPolicy:
+    """Dependency-light inference engine for policies exported with
+    ``alpyperl.serve.rllib.export_policy``. It computes deterministic actions
+    (i.e. ``explore=False``) of a fully connected network using vectorized
+    NumPy operations only, so it loads in milliseconds and does not require
+    ray, torch nor tensorflow.
+
+    Observations and actions are exchanged flattened, as the policy server and
+    the ``ALPypeRLConnector`` do.
+
+    :param layers: List of ``(weights, biases)`` tuples, with ``weights`` of
+        shape ``(inputs, outputs)``. The last one computes the action logits
+    :type layers: list
+    :param activation: Activation applied after every hidden layer (e.g.
+        ``'tanh'``)
+    :type activation: str
+    :param action_dist: Action distribution type. Either ``'categorical'``,
+        ``'multi_categorical'`` or ``'diag_gaussian'``
+    :type action_dist: str
+    :param action_config: Action distribution settings: ``n`` (categorical),
+        ``nvec`` (multi-categorical) or ``low``, ``high``, ``unsquash`` and
+        ``clip`` (diagonal gaussian)
+    :type action_config: dict
+    :param observation_space: The observation space the policy was trained with
+        (optional)
+    :type observation_space: gymnasium.spaces
+    :param action_space: The action space the policy was trained with
+        (optional)
+    :type action_space: gymnasium.spaces
+    """
+
+    def __init__(
+        self,
+        layers,
+        activation,
+        action_dist,
+        action_config,
+        observation_space=None,
+        action_space=None
+    ):
+        if activation not in ACTIVATIONS:
+            raise Exception(f"Unsupported activation function: '{activation}'")
+        if action_dist not in ['categorical', 'multi_categorical', 'diag_gaussian']:
+            raise Exception(f"Unsupported action distribution: '{action_dist}'")
+        self.layers = [
+            (np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32))
+            for w, b in layers
+        ]
+        self.activation = activation
+        self.action_dist = action_dist
+        self.action_config = action_config
+        self.observation_space = observation_space
+        self.action_space = action_space
+        # Pre-compute values used on every forward pass.
+        self.activation_fn = ACTIVATIONS[activation]
+        if action_dist == 'categorical':
+            self.action_dim = int(action_config['n'])
+        elif action_dist == 'multi_categorical':
+            self.nvec = np.asarray(action_config['nvec'], dtype=np.int64)
+            self.offsets = np.concatenate([[0], np.cumsum(self.nvec)])
+            self.action_dim = int(self.offsets[-1])
+        else:
+            self.low = np.asarray(action_config['low'], dtype=np.float32)
+            self.high = np.asarray(action_config['high'], dtype=np.float32)
+            self.action_dim = self.low.size
+        self.observation_dim = self.layers[0][0].shape[0]
+
+    def compute_flattened_actions(self, flattened_observations):
+        """Compute the deterministic flattened actions of a batch of flattened
+        observations (one per row)
+
+        :param flattened_observations: Matrix of flattened observations
+        :type flattened_observations: numpy.ndarray
+        :return: Matrix of flattened actions (one per row)
+        :rtype: numpy.ndarray
+        """
+        x = np.asarray(flattened_observations, dtype=np.float32).reshape(
+            (-1, self.observation_dim)
+        )
+        # Forward pass.
+        for w, b in self.layers[:-1]:
+            x = self.activation_fn(x @ w + b)
+        w, b = self.layers[-1]
+        logits = x @ w + b
+        # Deterministic action given the action distribution.
+        if self.action_dist == 'categorical':
+            actions = np.zeros((logits.shape[0], self.action_dim), dtype=np.float32)
+            actions[np.arange(logits.shape[0]), np.argmax(logits, axis=1)] = 1.0
+            return actions
+        elif self.action_dist == 'multi_categorical':
+            actions = np.zeros((logits.shape[0], self.action_dim), dtype=np.float32)
+            rows = np.arange(logits.shape[0])
+            for i in range(self.nvec.size):
+                segment = logits[:, self.offsets[i]:self.offsets[i + 1]]
+                actions[rows, self.offsets[i] + np.argmax(segment, axis=1)] = 1.0
+            return actions
+        # Gaussian mean (first half of the logits). Actions are unsquashed
+        # from [-1, 1] (or clipped) to the action space bounds as rllib does.
+        actions = logits[:, :self.action_dim]
+        if self.action_config['unsquash']:
+            actions = self.low + (np.clip(actions, -1.0, 1.0) + 1.0) * (self.high - self.low) / 2.0
+        elif self.action_config['clip']:
+            actions = np.clip(actions, self.low, self.high)
+        return actions
+
+    def save(self, location_path):
+        """Save the policy to a single compact file
+
+        :param location_path: The file location (``.npz``)
+        :type location_path: str
+        """
+        arrays = {}
+        for i, (w, b) in enumerate(self.layers):
+            arrays[f'weights_{i}'] = w
+            arrays[f'biases_{i}'] = b
+        metadata = {
+            'num_layers': len(self.layers),
+            'activation': self.activation,
+            'action_dist': self.action_dist,
+            'action_config': {
+                k: np.asarray(v).tolist() for k, v in self.action_config.items()
+            }
+        }
+        # Spaces are optional, and described as JSON (no pickling), so the
+        # file can be loaded without executing arbitrary code.
+        spaces = {'observation_space': self.observation_space, 'action_space': self.action_space}
+        if any(space is not None for space in spaces.values()):
+            from alpyperl.gym.envs import utils
+            for name, space in spaces.items():
+                if space is not None:
+                    metadata[name] = utils.space_to_dict(space)
+        with open(location_path, 'wb') as f:
+            np.savez(f, metadata=np.array(json.dumps(metadata)), **arrays)
+
+    @classmethod
+    def load(cls, location_path):
+        """Load a policy previously saved or exported
+
+        :param location_path: The file location (``.npz``)
+        :type location_path: str
+        :return: The policy
+        :rtype: NumpyPolicy
+        """
+        with np.load(location_path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            layers = [
+                (data[f'weights_{i}'], data[f'biases_{i}'])
+                for i in range(metadata['num_layers'])
+            ]
+            if 'observation_space' in data or 'action_space' in data:
+                raise Exception(
+                    f"The policy at '{location_path}' stores its spaces pickled "
+                    "(older format). Please export it again."
+                )
+        # Loading spaces requires gymnasium to be installed.
+        spaces = {'observation_space': None, 'action_space': None}
+        if any(name in metadata for name in spaces):
+            from alpyperl.gym.envs import utils
+            spaces = {
+                name: utils.space_from_dict(metadata[name]) if name in metadata else None
+                for name in spaces
+            }
+        return cls(
+            layers=layers,
+            activation=metadata['activation'],
+            action_dist=metadata['action_dist'],
+            action_config=metadata['action_config'],
+            **spaces
+        )
@@ -1 +1,15 @@
-from alpyperl.serve.rllib.binder import launch_policy_server
\ No newline at end of file
+from alpyperl._lazy import lazy_module
+
+# Imported on first access (PEP 562), so the server stack (fastapi, uvicorn,
+# pydantic) is only loaded by the entry points that use it.
+_LAZY_IMPORTS = {
+    'launch_policy_server': ('alpyperl.serve.rllib.binder', 'launch_policy_server'),
+    'launch_multi_policy_server': ('alpyperl.serve.rllib.binder', 'launch_multi_policy_server'),
+    'export_policy': ('alpyperl.serve.rllib.export', 'export_policy'),
+    'launch_policy_gateway': ('alpyperl.serve.rllib.gateway', 'launch_policy_gateway'),
+    'launch_ray_serve_policy_server': ('alpyperl.serve.rllib.ray_serve', 'launch_ray_serve_policy_server')
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_IMPORTS)
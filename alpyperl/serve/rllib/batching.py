@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+
+class MicroBatcher:
+    """Gather concurrent single-item requests into batches so they share a
+    single call to ``batch_fn``. Items already queued always join the batch.
+    Besides, while other batches are being computed, a batch keeps waiting
+    for new items until it reaches ``max_batch_size`` items or
+    ``max_batch_wait_ms`` milliseconds have passed since its first item
+    arrived. Otherwise (e.g. a lone request on an idle server), it is flushed
+    right away, so batching never delays requests that have nothing to be
+    batched with.
+
+    :param batch_fn: Coroutine function that receives a list of items and
+        returns a list with one result per item (in the same order).
+    :type batch_fn: callable
+    :param max_batch_size: Maximum number of items per batch.
+    :type max_batch_size: int
+    :param max_batch_wait_ms: Maximum time (in milliseconds) the first item of a
+        batch waits for other items to arrive (only while other batches are
+        being computed).
+    :type max_batch_wait_ms: float
+    :param max_concurrent_batches: Maximum number of batches being computed at
+        the same time. While all of them are busy, the next batch keeps
+        gathering items (up to ``max_batch_size``).
+    :type max_concurrent_batches: int
+    """
+
+    def __init__(
+        self,
+        batch_fn,
+        max_batch_size=32,
+        max_batch_wait_ms=2.0,
+        max_concurrent_batches=1
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_s = max_batch_wait_ms / 1000.0
+        self.max_concurrent_batches = max_concurrent_batches
+        # Queue, worker task and semaphore are bound to the running event loop,
+        # so they are created on first use.
+        self.queue = None
+        self.worker = None
+        self.semaphore = None
+        self.loop = None
+        # Keep a reference to the batches being computed so their tasks are
+        # not garbage collected.
+        self.pending_batches = set()
+
+    async def submit(self, item):
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.queue = asyncio.Queue()
+            self.semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+            self.worker = loop.create_task(self.__process_batches())
+        future = loop.create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    def queue_depth(self):
+        """Number of items waiting to be processed"""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def close(self):
+        """Stop gathering items. Batches being computed are not interrupted"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+            self.loop = None
+
+    async def __process_batches(self):
+        """`[INTERNAL]` Collect items from the queue and flush them in batches"""
+        while True:
+            # Wait for a free slot first, so items arriving while all the
+            # slots are busy join this batch instead of being left behind.
+            await self.semaphore.acquire()
+            # Wait (indefinitely) for the first item of the batch.
+            batch = [await self.queue.get()]
+            deadline = time.perf_counter() + self.max_batch_wait_s
+            # Gather items until the batch is full or the deadline is reached.
+            while len(batch) < self.max_batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                # Nothing is being computed, so waiting would only add latency.
+                if not self.pending_batches:
+                    break
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Flush batch without waiting for it to finish (its slot is
+            # released once computed).
+            task = self.loop.create_task(self.__flush(batch))
+            self.pending_batches.add(task)
+            task.add_done_callback(self.pending_batches.discard)
+
+    async def __flush(self, batch):
+        """`[INTERNAL]` Compute a batch and return results to every waiting
+        request"""
+        items, futures = zip(*batch)
+        try:
+            results = await self.batch_fn(list(items))
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.semaphore.release()
@@ -1,29 +1,110 @@
+import asyncio
+import contextlib
+import logging
 import uvicorn
-from typing import List
-from fastapi import FastAPI, status
-from fastapi.responses import HTMLResponse, JSONResponse
+from typing import Optional
+from fastapi import FastAPI, Request, HTTPException, WebSocket, status
+from fastapi.responses import HTMLResponse, JSONResponse, Response, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 import numpy as np
 from alpyperl.gym.envs import utils
-from alpyperl import BaseAnyLogicEnv
-from gymnasium import spaces
-from gymnasium.spaces.utils import unflatten, flatten
+from alpyperl.serve.rllib.batching import MicroBatcher
+from alpyperl.serve.rllib.inference import (
+    PolicyPool, CheckpointPolicy, set_intra_op_threads, load_policy_replicas
+)
+from alpyperl.serve.rllib.prefork import serve_prefork
+from alpyperl.serve.rllib.cache import ActionCache
+from alpyperl.serve.rllib.metrics import ServerMetrics, MetricsMiddleware, server_timing
+from alpyperl.serve.rllib.registry import (
+    PolicyRegistry, find_policies, load_replicas, get_policy_signature
+)
+from alpyperl.serve.numpy_policy import NumpyPolicy
+from alpyperl.serve import encoding
+from gymnasium.spaces.utils import flatdim
 import os
+import time
+
+
+# Errors raised when decoding a body that does not hold valid observations
+# (e.g. a JSON list of objects, or a msgpack body that is not a map).
+MALFORMED_BODY_ERRORS = (encoding.EncodingError, ValueError, KeyError, TypeError, AttributeError)
+
+
+class IncompatiblePolicyError(Exception):
+    """Raised when a policy cannot replace the one being served because they
+    were trained with different spaces"""
+
+
+class ReloadRequest(BaseModel):
+    """`[INTERNAL]` Body of the ``/admin/reload`` requests"""
+    trained_policy_loc: Optional[str] = None
 
 
 def launch_policy_server(
-    policy_config,
-    env,
+    policy_config=None,
+    env=None,
     env_config=None,
     trained_policy_loc='./"trained_policy"',
     host="0.0.0.0",
-    port=3000
+    port=3000,
+    max_batch_size=32,
+    max_batch_wait_ms=2.0,
+    num_policy_replicas=1,
+    intra_op_threads=None,
+    num_workers=1,
+    exported_policy_loc=None,
+    uds=None,
+    enable_reload=False,
+    watch_policy_loc=False,
+    watch_interval_s=5.0,
+    action_cache_size=0,
+    action_cache_quantization=None
 ):
     """Launch server and host trained policy to allow requests. The server
     requires an observation in the form of an array and will return and action
     (type depends on action space)
 
+    The following endpoints are available:
+
+    * ``/predict``: Receives a single flattened observation and returns its
+      flattened action.
+    * ``/predict_batch``: Receives a matrix of flattened observations (one per
+      row) and returns the flattened actions (one per row), computed in a
+      single batched forward pass.
+    * ``/predict_stream``: WebSocket endpoint to stream observations and
+      actions over a single long-lived connection (e.g. one per episode).
+      Binary messages contain raw little-endian ``float32`` values, and text
+      messages JSON (same format as ``/predict_batch``).
+    * ``/metrics``: Request counts, latency histograms (overall and per stage:
+      ``decode``, ``unflatten``, ``inference``, ``flatten`` and ``encode``),
+      batch sizes and queue depth in the Prometheus text format. Prediction
+      responses also include a ``Server-Timing`` header.
+    * ``/get_spaces``: The observation and action spaces of the policy
+      (described as JSON), so clients such as ``alpyperl.serve.PolicyClient``
+      can flatten observations and unflatten actions.
+
+    Observations can be sent as JSON (default), as raw little-endian
+    ``float32`` values (``Content-Type: application/octet-stream``) or as a
+    msgpack map with the raw ``float32`` values under ``'observations'``
+    (``Content-Type: application/msgpack``). Responses use the same encoding as
+    the request.
+
+    Concurrent ``/predict`` requests are gathered in a queue and flushed
+    together in a single batched forward pass (micro-batching) when either
+    ``max_batch_size`` or ``max_batch_wait_ms`` is reached.
+
+    Forward passes run on a bounded pool of threads (one per policy replica),
+    so the server keeps answering requests (e.g. health checks) while the
+    policy is computing actions.
+
+    A new version of the policy can be rolled out without restarting the
+    server, either by calling ``/admin/reload`` (if ``enable_reload``) or by
+    overwriting the policy files (if ``watch_policy_loc``). The new policy is
+    loaded in the background (as a plain rllib policy or as a ``NumpyPolicy``),
+    its saved spaces are checked against the live ones and it is swapped in
+    once ready, while requests keep being served by the previous one.
+
     :param policy_config: It refers to the policy (also refered as *RL algorithm*) that 
         will be trained. It must be an instance of **rllib algorithms** (check here 
         for more `information <https://docs.ray.io/en/latest/rllib/rllib-algorithms.html>`_)
@@ -42,39 +123,346 @@ def launch_policy_server(
     :type host: str
     :param port: The port the service will connect to. Defaults to ``3000``
     :type port: int
+    :param max_batch_size: Maximum number of ``/predict`` requests that share a
+        forward pass. Set it to ``1`` to disable micro-batching. Defaults to
+        ``32``
+    :type max_batch_size: int
+    :param max_batch_wait_ms: Maximum time (in milliseconds) a ``/predict``
+        request waits for others to be batched with. Defaults to ``2.0``
+    :type max_batch_wait_ms: float
+    :param num_policy_replicas: Number of copies of the policy used to compute
+        forward passes concurrently. Every replica holds its own copy of the
+        weights. Only available with a single server process (i.e.
+        ``num_workers`` equal to ``1``). Defaults to ``1``
+    :type num_policy_replicas: int
+    :param intra_op_threads: Number of torch/tensorflow intra-op threads. It
+        is a process-wide setting shared by all replicas (of every server
+        process), applied once before they are loaded. As a rule of thumb, the
+        number of cores divided by ``num_policy_replicas`` (and
+        ``num_workers``). If not provided, the framework defaults are kept
+    :type intra_op_threads: int
+    :param num_workers: Number of server processes. If greater than ``1``, the
+        checkpoint is loaded once (as a plain rllib policy, without building
+        the algorithm nor the environment), its weights are placed in shared
+        memory and the worker processes are forked from the main one to serve
+        requests against them. Every worker serves a single replica (so
+        ``num_policy_replicas`` must be ``1``). Only available for ``torch``
+        policies on POSIX systems. Defaults to ``1``
+    :type num_workers: int
+    :param exported_policy_loc: The location of a policy exported with
+        ``alpyperl.serve.rllib.export_policy``. If provided, the policy is
+        served with the dependency-light ``NumpyPolicy`` inference engine
+        instead of the rllib stack (``policy_config``, ``env`` and
+        ``env_config`` are not required)
+    :type exported_policy_loc: str
+    :param uds: Path of a Unix domain socket to listen on instead of ``host``
+        and ``port`` (e.g. ``/tmp/alpyperl.sock``). Recommended when the
+        AnyLogic model and the server run on the same host, since it skips the
+        TCP/IP stack. Use ``alpyperl.serve.PolicyClient(uds=...)`` to connect
+        to it. Only available on POSIX systems
+    :type uds: str
+    :param enable_reload: Whether to expose the ``/admin/reload`` endpoint,
+        which loads the policy found at the given location (a JSON body with
+        ``trained_policy_loc``) or reloads the current one. Only enable it if
+        the server is not publicly reachable. Defaults to ``False``
+    :type enable_reload: bool
+    :param watch_policy_loc: Whether to reload the policy automatically when
+        its files change. With ``num_workers`` greater than ``1``, every
+        worker reloads the policy on its own. Defaults to ``False``
+    :type watch_policy_loc: bool
+    :param watch_interval_s: Time (in seconds) between checks of the policy
+        files. A change is only reloaded once the files stop changing between
+        two checks. Defaults to ``5.0``
+    :type watch_interval_s: float
+    :param action_cache_size: Maximum number of actions cached by observation.
+        Since actions are computed deterministically, repeated observations
+        are answered from the cache without a forward pass. The cache is
+        cleared whenever the policy is reloaded. Defaults to ``0`` (disabled)
+    :type action_cache_size: int
+    :param action_cache_quantization: Step used to round continuous
+        observations before looking them up in the cache, so close
+        observations share their action. If not provided, only identical
+        observations do
+    :type action_cache_quantization: float
     """
+    # Workers share a single copy of the weights, so they cannot hold replicas.
+    if num_workers > 1 and num_policy_replicas > 1:
+        raise Exception(
+            "Options 'num_workers' and 'num_policy_replicas' cannot be both "
+            "greater than 1. Every server process serves a single replica when "
+            "'num_workers' is greater than 1."
+        )
+
+    # Load exported policy, which already includes the spaces.
+    if exported_policy_loc is not None:
+        policy = NumpyPolicy.load(exported_policy_loc)
+        trained_policy_loc = exported_policy_loc
+        observation_space = policy.observation_space
+        action_space = policy.action_space
+    else:
+        # Load observation space, so observation received from server can be
+        # parsed to the correct format
+        observation_space = utils.load_space(
+            f"{trained_policy_loc}/alpyperl_spaces/observation_space.pkl"
+        )
+        action_space = utils.load_space(
+            f"{trained_policy_loc}/alpyperl_spaces/action_space.pkl"
+        )
+
+    if num_workers > 1:
+        if exported_policy_loc is None:
+            # Avoid initialising a multi-threaded pool in the main process,
+            # since it is not safe to use it from forked processes.
+            set_intra_op_threads(1)
+            # Load policy once and share its weights with all workers.
+            policy = CheckpointPolicy(f"{trained_policy_loc}/policies/default_policy")
+            policy.share_memory()
+        def create_worker_app():
+            # Applied once in every worker process.
+            if intra_op_threads is not None:
+                set_intra_op_threads(intra_op_threads)
+            return create_policy_app(
+                policy=policy,
+                observation_space=observation_space,
+                action_space=action_space,
+                trained_policy_loc=trained_policy_loc,
+                max_batch_size=max_batch_size,
+                max_batch_wait_ms=max_batch_wait_ms,
+                enable_reload=enable_reload,
+                watch_policy_loc=watch_policy_loc,
+                watch_interval_s=watch_interval_s,
+                action_cache_size=action_cache_size,
+                action_cache_quantization=action_cache_quantization
+            )
 
-    # Set server flag on to avoid loading the AnyLogic model
-    if env_config is None:
-        env_config = {}
-    env_config['server_mode_on'] = True
-    # Default checkpoint directory to 'trained_policy_loc' if not provided
-    if 'checkpoint_dir' not in env_config:
-        env_config['checkpoint_dir'] = trained_policy_loc
-
-    # Re-create policy configuration with no workers and avoid launching
-    # unnecessary models
-    policy = (
-        policy_config
-            .env_runners(num_env_runners=0)
-            .environment(env=env, env_config=env_config)
-            .build()
+        serve_prefork(
+            app_factory=create_worker_app,
+            host=host,
+            port=port,
+            num_workers=num_workers,
+            uds=uds
+        )
+        return
+
+    # Process-wide, so it is applied once for all the replicas.
+    if intra_op_threads is not None:
+        set_intra_op_threads(intra_op_threads)
+    if exported_policy_loc is not None:
+        # NumPy inference is read-only, so the same policy is shared by all
+        # inference threads.
+        policies = [policy] * num_policy_replicas
+    else:
+        policies = load_policy_replicas(
+            policy_config=policy_config,
+            env=env,
+            env_config=env_config,
+            trained_policy_loc=trained_policy_loc,
+            num_policy_replicas=num_policy_replicas
+        )
+
+    # Create server application
+    app = create_policy_app(
+        policy=policies,
+        observation_space=observation_space,
+        action_space=action_space,
+        trained_policy_loc=trained_policy_loc,
+        max_batch_size=max_batch_size,
+        max_batch_wait_ms=max_batch_wait_ms,
+        enable_reload=enable_reload,
+        watch_policy_loc=watch_policy_loc,
+        watch_interval_s=watch_interval_s,
+        action_cache_size=action_cache_size,
+        action_cache_quantization=action_cache_quantization
     )
 
-    # Restore policy state from given checkpoint
-    policy.restore(trained_policy_loc)
+    # Launch server (Unix domain socket takes precedence over host and port)
+    if uds is not None:
+        uvicorn.run(app, uds=uds)
+    else:
+        uvicorn.run(app, host=host, port=port)
+
 
-    # Load observation space, so observation received from server can be parsed
-    # to the correct format
-    observation_space = utils.load_space(
-        f"{trained_policy_loc}/alpyperl_spaces/observation_space.pkl"
+def create_policy_app(
+    policy,
+    observation_space,
+    action_space,
+    trained_policy_loc,
+    max_batch_size=32,
+    max_batch_wait_ms=2.0,
+    enable_reload=False,
+    watch_policy_loc=False,
+    watch_interval_s=5.0,
+    policy_loader=load_replicas,
+    action_cache_size=0,
+    action_cache_quantization=None
+):
+    """Create the server application that hosts a trained policy. Check
+    ``launch_policy_server`` for more details on the parameters
+
+    :param policy: The trained policy or a list of its replicas. It must
+        implement ``compute_actions`` (e.g. an rllib ``Algorithm``)
+    :param observation_space: The observation space the policy was trained with
+    :type observation_space: gymnasium.spaces
+    :param action_space: The action space the policy was trained with
+    :type action_space: gymnasium.spaces
+    :param policy_loader: Function used to reload the policy. It receives the
+        policy location and the number of replicas, and returns the replicas,
+        the observation space and the action space
+    :type policy_loader: callable
+    :return: The server application
+    :rtype: fastapi.FastAPI
+    """
+    logger = logging.getLogger(__name__)
+
+    # Run forward passes out of the event loop, using as many threads as
+    # policy replicas.
+    metrics = ServerMetrics(max_batch_size=max_batch_size)
+    policy_pool = PolicyPool(
+        policies=policy if isinstance(policy, list) else [policy],
+        observation_space=observation_space,
+        action_space=action_space,
+        metrics=metrics
     )
-    action_space = utils.load_space(
-        f"{trained_policy_loc}/alpyperl_spaces/action_space.pkl"
+
+    async def compute_batch(observations):
+        metrics.observe_batch_size(len(observations))
+        return list(await policy_pool.compute_flattened_actions_async(np.stack(observations)))
+
+    # Gather concurrent single observation requests so they share forward
+    # passes.
+    batcher = MicroBatcher(
+        batch_fn=compute_batch,
+        max_batch_size=max_batch_size,
+        max_batch_wait_ms=max_batch_wait_ms,
+        max_concurrent_batches=policy_pool.num_replicas
     )
+    metrics.add_gauge('alpyperl_queue_depth', batcher.queue_depth)
+
+    # Answer repeated observations without a forward pass.
+    action_cache = (
+        ActionCache(action_cache_size, quantization=action_cache_quantization)
+        if action_cache_size > 0
+        else None
+    )
+    if action_cache is not None:
+        metrics.add_gauge('alpyperl_action_cache_hits_total', lambda: action_cache.hits, 'counter')
+        metrics.add_gauge('alpyperl_action_cache_misses_total', lambda: action_cache.misses, 'counter')
+        metrics.add_gauge('alpyperl_action_cache_hit_rate', action_cache.hit_rate)
+        metrics.add_gauge('alpyperl_action_cache_size', action_cache.__len__)
+
+    async def predict_observation(observation):
+        # Single observations are batched with concurrent requests.
+        if action_cache is None:
+            return await batcher.submit(observation)
+        key = action_cache.key(observation)
+        action = action_cache.get(key)
+        if action is None:
+            generation = action_cache.generation
+            action = await batcher.submit(observation)
+            action_cache.put(key, action, generation)
+        return action
+
+    async def predict_observations(observations):
+        # Only observations that are not cached are computed.
+        if action_cache is None:
+            metrics.observe_batch_size(observations.shape[0])
+            return await policy_pool.compute_flattened_actions_async(observations)
+        keys = [action_cache.key(observation) for observation in observations]
+        actions = [action_cache.get(key) for key in keys]
+        missing = [i for i, action in enumerate(actions) if action is None]
+        if missing:
+            generation = action_cache.generation
+            metrics.observe_batch_size(len(missing))
+            computed = await policy_pool.compute_flattened_actions_async(observations[missing])
+            for i, action in zip(missing, computed):
+                actions[i] = action
+                action_cache.put(keys[i], action, generation)
+        return np.stack(actions)
+
+    observation_dim = flatdim(observation_space)
+
+    # Policy reloads are computed one at a time, and out of the inference
+    # threads so requests keep being served meanwhile.
+    reload_lock = asyncio.Lock()
+
+    # Signature of the policy files being served (only when they are watched).
+    policy_signature = None
+
+    async def reload_policy(policy_loc):
+        nonlocal trained_policy_loc, policy_signature
+        async with reload_lock:
+            loop = asyncio.get_running_loop()
+            # Taken before loading, so changes made meanwhile are reloaded too.
+            signature = (
+                await loop.run_in_executor(None, get_policy_signature, policy_loc)
+                if watch_policy_loc
+                else None
+            )
+            policies, new_observation_space, new_action_space = (
+                await loop.run_in_executor(
+                    None, policy_loader, policy_loc, policy_pool.num_replicas
+                )
+            )
+            if new_observation_space != observation_space or new_action_space != action_space:
+                raise IncompatiblePolicyError(
+                    f"Policy at '{policy_loc}' was trained with different spaces "
+                    f"(observation space: {new_observation_space}, action space: "
+                    f"{new_action_space}) than the one being served (observation "
+                    f"space: {observation_space}, action space: {action_space})."
+                )
+            policy_pool.swap_policies(policies)
+            if action_cache is not None:
+                action_cache.clear()
+            # The watcher follows the policy being served from now on.
+            trained_policy_loc = policy_loc
+            policy_signature = signature
+            logger.info(f"Policy reloaded from '{policy_loc}'")
+
+    async def watch_policy():
+        # Reload the policy once its files have changed and stopped changing.
+        nonlocal policy_signature
+        loop = asyncio.get_running_loop()
+        policy_signature = await loop.run_in_executor(None, get_policy_signature, trained_policy_loc)
+        candidate_signature = None
+        while True:
+            await asyncio.sleep(watch_interval_s)
+            policy_loc = trained_policy_loc
+            try:
+                signature = await loop.run_in_executor(None, get_policy_signature, policy_loc)
+            except OSError:
+                # Files may be (temporarily) missing while being written.
+                continue
+            if policy_loc != trained_policy_loc:
+                # The policy was reloaded from another location meanwhile.
+                candidate_signature = None
+                continue
+            if signature == policy_signature or signature != candidate_signature:
+                candidate_signature = signature if signature != policy_signature else None
+                continue
+            candidate_signature = None
+            try:
+                await reload_policy(policy_loc)
+            except Exception as e:
+                logger.error(f"Policy could not be reloaded: {e}")
+                # Do not retry until the files change again.
+                if policy_loc == trained_policy_loc:
+                    policy_signature = signature
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        watcher = asyncio.create_task(watch_policy()) if watch_policy_loc else None
+        yield
+        if watcher is not None:
+            watcher.cancel()
 
     # Initialise FastAPI application server
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
+    # Record the count and latency of the requests.
+    app.add_middleware(
+        MetricsMiddleware,
+        metrics=metrics,
+        endpoints=['/', '/predict', '/predict_batch', '/metrics', '/admin/reload', '/get_spaces', '/get_trained_policy_loc']
+    )
 
     @app.get("/")
     async def greetings():
@@ -89,19 +477,128 @@ def launch_policy_server(
         """
         return HTMLResponse(content=html_content, status_code=200)
 
-    @app.post("/predict")
-    async def predict_next_action(observation: List[float]):
-        # Check documentation at https://docs.ray.io/en/latest/serve/tutorials/rllib.html
-        action = policy.compute_single_action(
-            observation=unflatten(observation_space, np.asarray(observation)),
-            explore=False
-        )
+    @app.post("/predict", openapi_extra=request_body_schema(batch=False))
+    async def predict_next_action(request: Request):
+        # Decode observation given the request content type.
+        start = time.perf_counter()
+        body_encoding, observations = await decode_observations(request, observation_dim)
+        if observations.shape[0] != 1:
+            raise HTTPException(status_code=400, detail="Expected a single observation")
+        decoded = time.perf_counter()
+        # Wait for the observation to be processed together with other
+        # concurrent requests.
+        action = await predict_observation(observations[0])
+        predicted = time.perf_counter()
         # Format response
+        if body_encoding != encoding.JSON:
+            response = Response(
+                content=encoding.encode_array(action[None], body_encoding),
+                media_type=body_encoding
+            )
+        else:
+            response = JSONResponse(
+                content=jsonable_encoder({
+                    "observation": observations[0].tolist(),
+                    "action": action.tolist()
+                }),
+                status_code=200
+            )
+        add_timings(response, start, decoded, predicted)
+        return response
+
+    @app.post("/predict_batch", openapi_extra=request_body_schema(batch=True))
+    async def predict_next_actions(request: Request):
+        # Decode observations (one per row) given the request content type.
+        start = time.perf_counter()
+        body_encoding, observations = await decode_observations(request, observation_dim)
+        decoded = time.perf_counter()
+        # Compute all actions in a single batched forward pass.
+        actions = await predict_observations(observations)
+        predicted = time.perf_counter()
+        # Format response (one flattened action per row)
+        response = Response(
+            content=encoding.encode_array(actions, body_encoding),
+            media_type=body_encoding
+        )
+        add_timings(response, start, decoded, predicted)
+        return response
+
+    def add_timings(response, start, decoded, predicted):
+        # Record the stages handled by the event loop and report them to the
+        # client ('predict' includes the time waiting to be batched).
+        encoded = time.perf_counter()
+        metrics.observe_stage('decode', decoded - start)
+        metrics.observe_stage('encode', encoded - predicted)
+        response.headers['Server-Timing'] = server_timing([
+            ('decode', decoded - start),
+            ('predict', predicted - decoded),
+            ('encode', encoded - predicted)
+        ])
+
+    @app.get("/metrics")
+    async def get_metrics():
+        # Prometheus text exposition format
+        return PlainTextResponse(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.websocket("/predict_stream")
+    async def predict_stream(websocket: WebSocket):
+        # Long-lived connection to query the policy step by step (e.g. once per
+        # episode). Every binary message contains raw float32 observation(s)
+        # and is answered with raw float32 action(s). Text messages are
+        # handled as JSON (same as '/predict_batch').
+        await websocket.accept()
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            body_encoding = (
+                encoding.OCTET_STREAM if message.get('bytes') is not None else encoding.JSON
+            )
+            try:
+                observations = encoding.decode_array(
+                    message['bytes'] if body_encoding == encoding.OCTET_STREAM else message['text'],
+                    body_encoding,
+                    observation_dim
+                )
+            except MALFORMED_BODY_ERRORS as e:
+                await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA, reason=str(e))
+                break
+            # Streamed steps are sent straight to the policy pool: a client
+            # waits for every action before sending its next observation, so
+            # they must not wait for the batching window.
+            actions = await predict_observations(observations)
+            if body_encoding == encoding.OCTET_STREAM:
+                await websocket.send_bytes(encoding.encode_array(actions, body_encoding))
+            else:
+                await websocket.send_text(encoding.encode_array(actions, body_encoding).decode())
+
+    if enable_reload:
+        @app.post("/admin/reload")
+        async def reload(body: Optional[ReloadRequest] = None):
+            policy_loc = (
+                body.trained_policy_loc
+                if body is not None and body.trained_policy_loc is not None
+                else trained_policy_loc
+            )
+            try:
+                await reload_policy(policy_loc)
+            except IncompatiblePolicyError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Policy could not be reloaded: {e}")
+            response = {
+                "trained_policy_loc": os.path.abspath(trained_policy_loc)
+            }
+            return JSONResponse(content=jsonable_encoder(response), status_code=200)
+
+    @app.get("/get_spaces")
+    async def get_spaces():
+        # Spaces are described as JSON, so clients can flatten observations and
+        # unflatten actions without unpickling data.
         response = {
-            "observation": observation,
-            "action": flatten(action_space, action).tolist()
+            "observation_space": utils.space_to_dict(observation_space),
+            "action_space": utils.space_to_dict(action_space)
         }
-
         return JSONResponse(content=jsonable_encoder(response), status_code=200)
 
     @app.get("/get_trained_policy_loc")
@@ -113,5 +610,175 @@ def launch_policy_server(
 
         return JSONResponse(content=jsonable_encoder(response), status_code=200)
 
-    # Launch server
-    uvicorn.run(app, host=host, port=port)
\ No newline at end of file
+    return app
+
+
+def launch_multi_policy_server(
+    policies_loc,
+    host="0.0.0.0",
+    port=3000,
+    max_policies=None,
+    memory_budget_mb=None,
+    max_batch_size=32,
+    max_batch_wait_ms=2.0,
+    uds=None
+):
+    """Launch a server that hosts all the policies found in a folder (rllib
+    checkpoints and exported policies) under their own routes, so many
+    policies can be compared without launching one server per policy:
+
+    * ``/policies``: Lists the policies available and the ones loaded.
+    * ``/policies/{name}/predict``: Same as ``/predict`` in
+      ``launch_policy_server``.
+    * ``/policies/{name}/predict_batch``: Same as ``/predict_batch`` in
+      ``launch_policy_server``.
+
+    Policies are loaded the first time they are requested, and the least
+    recently used ones are unloaded when ``max_policies`` or
+    ``memory_budget_mb`` is exceeded. rllib checkpoints are restored as plain
+    rllib policies (without building the algorithm nor the environment).
+
+    :param policies_loc: The folder that contains the policies. Every rllib
+        checkpoint folder (saved with ALPypeRL) and every exported policy
+        (``.npz``) is served under its folder or file name
+    :type policies_loc: str
+    :param host: The host ID to be used. Defaults to ``0.0.0.0``
+    :type host: str
+    :param port: The port the service will connect to. Defaults to ``3000``
+    :type port: int
+    :param max_policies: Maximum number of policies loaded at the same time.
+        If not provided, there is no limit
+    :type max_policies: int
+    :param memory_budget_mb: Maximum memory (in MB) used by the loaded
+        policies, estimated from the size of their files. If not provided,
+        there is no limit
+    :type memory_budget_mb: float
+    :param max_batch_size: Maximum number of ``/predict`` requests that share
+        a forward pass. Defaults to ``32``
+    :type max_batch_size: int
+    :param max_batch_wait_ms: Maximum time (in milliseconds) a ``/predict``
+        request waits for others to be batched with. Defaults to ``2.0``
+    :type max_batch_wait_ms: float
+    :param uds: Path of a Unix domain socket to listen on instead of ``host``
+        and ``port``
+    :type uds: str
+    """
+    registry = PolicyRegistry(
+        policies=find_policies(policies_loc),
+        max_policies=max_policies,
+        memory_budget_mb=memory_budget_mb,
+        max_batch_size=max_batch_size,
+        max_batch_wait_ms=max_batch_wait_ms
+    )
+    app = create_multi_policy_app(registry)
+
+    # Launch server (Unix domain socket takes precedence over host and port)
+    if uds is not None:
+        uvicorn.run(app, uds=uds)
+    else:
+        uvicorn.run(app, host=host, port=port)
+
+
+def create_multi_policy_app(registry):
+    """Create the server application that hosts many policies. Check
+    ``launch_multi_policy_server`` for more details
+
+    :param registry: The registry of the policies to host
+    :type registry: alpyperl.serve.rllib.registry.PolicyRegistry
+    :return: The server application
+    :rtype: fastapi.FastAPI
+    """
+    app = FastAPI()
+
+    async def acquire_policy(name):
+        try:
+            return await registry.acquire(name)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Policy '{name}' not found")
+
+    @app.get("/policies")
+    async def list_policies():
+        response = {
+            "policies": registry.names(),
+            "loaded": registry.loaded_names()
+        }
+        return JSONResponse(content=jsonable_encoder(response), status_code=200)
+
+    @app.post("/policies/{name}/predict", openapi_extra=request_body_schema(batch=False))
+    async def predict_next_action(name: str, request: Request):
+        served_policy = await acquire_policy(name)
+        try:
+            body_encoding, observations = await decode_observations(
+                request, served_policy.observation_dim
+            )
+            if observations.shape[0] != 1:
+                raise HTTPException(status_code=400, detail="Expected a single observation")
+            action = await served_policy.batcher.submit(observations[0])
+        finally:
+            registry.release(served_policy)
+        # Format response
+        if body_encoding != encoding.JSON:
+            return Response(
+                content=encoding.encode_array(action[None], body_encoding),
+                media_type=body_encoding
+            )
+        response = {
+            "observation": observations[0].tolist(),
+            "action": action.tolist()
+        }
+        return JSONResponse(content=jsonable_encoder(response), status_code=200)
+
+    @app.post("/policies/{name}/predict_batch", openapi_extra=request_body_schema(batch=True))
+    async def predict_next_actions(name: str, request: Request):
+        served_policy = await acquire_policy(name)
+        try:
+            body_encoding, observations = await decode_observations(
+                request, served_policy.observation_dim
+            )
+            actions = await served_policy.policy_pool.compute_flattened_actions_async(observations)
+        finally:
+            registry.release(served_policy)
+        return Response(
+            content=encoding.encode_array(actions, body_encoding),
+            media_type=body_encoding
+        )
+
+    return app
+
+
+async def decode_observations(request, observation_dim):
+    """`[INTERNAL]` Decode the observations of a request given its content
+    type. Requests can be sent as JSON (default), raw float32 bytes
+    ('application/octet-stream') or msgpack ('application/msgpack')"""
+    try:
+        body_encoding = encoding.parse_content_type(request.headers.get('content-type'))
+    except encoding.EncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    try:
+        observations = encoding.decode_array(
+            await request.body(), body_encoding, observation_dim
+        )
+    except MALFORMED_BODY_ERRORS as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return body_encoding, observations
+
+def request_body_schema(batch):
+    """`[INTERNAL]` OpenAPI description of the prediction request bodies, since
+    they are decoded manually given their content type"""
+    observation_schema = {"type": "array", "items": {"type": "number"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                encoding.JSON: {
+                    "schema": (
+                        {"type": "array", "items": observation_schema}
+                        if batch
+                        else observation_schema
+                    )
+                },
+                encoding.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+                encoding.MSGPACK: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class ActionCache:
+    """Bounded LRU cache of the actions computed for every observation. Since
+    served policies are deterministic (``explore=False``), the action is a
+    function of the observation only, so repeated observations (e.g. discrete
+    states) do not need a forward pass.
+
+    Observations are keyed by their bytes. For continuous observations,
+    ``quantization`` rounds every value to the nearest multiple of the given
+    step first, so close observations share their action.
+
+    :param max_size: Maximum number of actions cached
+    :type max_size: int
+    :param quantization: Step used to round observations before looking them
+        up (optional). Be mindful that observations rounded to the same values
+        will receive the same action
+    :type quantization: float
+    """
+
+    def __init__(self, max_size, quantization=None):
+        self.max_size = max_size
+        self.quantization = quantization
+        self.actions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Increased every time the cache is cleared, so actions computed by a
+        # previous policy are not cached afterwards.
+        self.generation = 0
+
+    def key(self, observation):
+        """Key of a flattened observation"""
+        if self.quantization is not None:
+            return np.round(np.asarray(observation, dtype=np.float64) / self.quantization).astype(np.int64).tobytes()
+        return np.ascontiguousarray(observation, dtype=np.float64).tobytes()
+
+    def get(self, key):
+        """Get the action cached for the given key, or ``None`` if missing"""
+        action = self.actions.get(key)
+        if action is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.actions.move_to_end(key)
+        return action
+
+    def put(self, key, action, generation=None):
+        """Cache the action of the given key, evicting the least recently used
+        one if full. If ``generation`` is given (i.e. the ``generation`` when the
+        action started being computed) and the cache has been cleared since,
+        the action is not cached"""
+        if generation is not None and generation != self.generation:
+            return
+        self.actions[key] = action
+        self.actions.move_to_end(key)
+        if len(self.actions) > self.max_size:
+            self.actions.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached actions (e.g. once the policy has changed)"""
+        self.actions.clear()
+        self.generation += 1
+
+    def hit_rate(self):
+        """Ratio of lookups that found a cached action"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self):
+        return len(self.actions)
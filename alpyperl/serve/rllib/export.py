@@ -0,0 +1,134 @@
+import re
+from gymnasium import spaces
+from gymnasium.spaces.utils import flatdim, flatten
+import numpy as np
+from alpyperl.gym.envs import utils
+from alpyperl.serve.numpy_policy import NumpyPolicy
+from alpyperl.serve.rllib.inference import CheckpointPolicy
+
+
+def export_policy(trained_policy_loc, export_loc, policy_id='default_policy'):
+    """Export a trained policy to a compact file that can be loaded by the
+    dependency-light ``alpyperl.serve.NumpyPolicy`` inference engine (i.e.
+    without ray, torch nor tensorflow). It includes the network weights and
+    the observation and action spaces.
+
+    Only ``torch`` policies using the default rllib fully connected network
+    (no custom models, LSTM, attention, ``free_log_std`` nor
+    ``no_final_linear``) with a ``Discrete``, ``MultiDiscrete`` or ``Box``
+    action space are supported. Observation filters (e.g.
+    ``'MeanStdFilter'``) are not exported, so policies trained with one are
+    rejected too.
+
+    :param trained_policy_loc: The location of the **rllib** trained policy
+        (same as in ``launch_policy_server``)
+    :type trained_policy_loc: str
+    :param export_loc: The location of the exported file (``.npz``)
+    :type export_loc: str
+    :param policy_id: The id of the policy to export. Defaults to
+        ``'default_policy'``
+    :type policy_id: str
+    :return: The exported policy
+    :rtype: alpyperl.serve.NumpyPolicy
+    """
+    checkpoint_policy = CheckpointPolicy(f"{trained_policy_loc}/policies/{policy_id}")
+    policy = checkpoint_policy.policy
+    model_config = policy.config['model']
+    if policy.framework != 'torch':
+        raise Exception(
+            f"Only 'torch' policies can be exported (found '{policy.framework}')."
+        )
+    if (
+        model_config.get('custom_model')
+        or model_config.get('use_lstm')
+        or model_config.get('use_attention')
+    ):
+        raise Exception(
+            "Only policies using the default rllib fully connected network can "
+            "be exported."
+        )
+    for option in ['free_log_std', 'no_final_linear']:
+        if model_config.get(option):
+            raise Exception(
+                f"Policies trained with the model option '{option}' cannot be exported."
+            )
+    # The filter state is not part of the policy weights, so observations
+    # would not be normalized as during training.
+    observation_filter = policy.config.get('observation_filter', 'NoFilter')
+    if observation_filter != 'NoFilter':
+        raise Exception(
+            f"Policies trained with an observation filter ('{observation_filter}') "
+            "cannot be exported."
+        )
+
+    # Collect hidden layers and logits layer weights. Torch weights are stored
+    # as (outputs, inputs), so they are transposed.
+    weights = policy.get_weights()
+    hidden_layers = sorted(
+        int(m.group(1))
+        for m in (re.match(r'_hidden_layers\.(\d+)\._model\.0\.weight$', k) for k in weights)
+        if m
+    )
+    if '_logits._model.0.weight' not in weights:
+        raise Exception("Could not find the logits layer of the policy network.")
+    layers = [
+        (
+            weights[f'_hidden_layers.{i}._model.0.weight'].T,
+            weights[f'_hidden_layers.{i}._model.0.bias']
+        )
+        for i in hidden_layers
+    ] + [(weights['_logits._model.0.weight'].T, weights['_logits._model.0.bias'])]
+
+    # Spaces saved by ALPypeRL during training.
+    observation_space = utils.load_space(
+        f"{trained_policy_loc}/alpyperl_spaces/observation_space.pkl"
+    )
+    action_space = utils.load_space(
+        f"{trained_policy_loc}/alpyperl_spaces/action_space.pkl"
+    )
+    # `NumpyPolicy` receives gymnasium flattened observations, so they must be
+    # the same as the ones rllib preprocessor feeds to the network.
+    if layers[0][0].shape[0] != flatdim(observation_space):
+        raise Exception(
+            f"The policy network expects {layers[0][0].shape[0]} inputs, but the "
+            f"flattened observation space has {flatdim(observation_space)} values."
+        )
+    for _ in range(8):
+        observation = observation_space.sample()
+        preprocessed = np.ravel(checkpoint_policy.preprocessor.transform(observation))
+        flattened = flatten(observation_space, observation)
+        if preprocessed.shape != flattened.shape or not np.allclose(preprocessed, flattened):
+            raise Exception(
+                "The observation space is preprocessed by rllib differently "
+                "than it is flattened, so the policy cannot be exported."
+            )
+
+    # Action distribution used to compute deterministic actions.
+    if isinstance(action_space, spaces.Discrete):
+        action_dist, action_config = 'categorical', {'n': int(action_space.n)}
+    elif isinstance(action_space, spaces.MultiDiscrete):
+        action_dist, action_config = 'multi_categorical', {'nvec': action_space.nvec.flatten()}
+    elif isinstance(action_space, spaces.Box):
+        action_dist, action_config = 'diag_gaussian', {
+            'low': action_space.low.flatten(),
+            'high': action_space.high.flatten(),
+            'unsquash': bool(
+                policy.config.get('normalize_actions')
+                and np.all(np.isfinite(action_space.low))
+                and np.all(np.isfinite(action_space.high))
+            ),
+            'clip': bool(policy.config.get('clip_actions'))
+        }
+    else:
+        raise Exception(f"Unsupported action space type: {type(action_space)}")
+
+    numpy_policy = NumpyPolicy(
+        layers=layers,
+        activation=model_config.get('fcnet_activation', 'tanh'),
+        action_dist=action_dist,
+        action_config=action_config,
+        observation_space=observation_space,
+        action_space=action_space
+    )
+    numpy_policy.save(export_loc)
+    return numpy_policy
@@ -0,0 +1,104 @@
+import logging
+from alpyperl.gym.envs import utils
+from alpyperl.anylogic.model.connector import AnyLogicModelConnector, AnyLogicModelCallback
+from alpyperl.serve.rllib.inference import PolicyPool, set_intra_op_threads, load_policy_replicas
+from alpyperl.serve.numpy_policy import NumpyPolicy
+
+
+def launch_policy_gateway(
+    policy_config=None,
+    env=None,
+    env_config=None,
+    trained_policy_loc='./trained_policy',
+    exported_policy_loc=None,
+    run_exported_model=True,
+    exported_model_loc='./exported_model',
+    show_terminals=False,
+    intra_op_threads=None
+):
+    """Evaluate a trained policy by serving it over the same py4j connection
+    used during training, instead of launching a policy server. The AnyLogic
+    model requests every action through the python callback
+    (``AnyLogicModelCallback.predict``), so there is no HTTP stack involved in
+    each decision.
+
+    The ``ALPypeRLConnector`` must be set to evaluate over the gateway. It
+    sends the flattened observation(s) as raw bytes (big-endian ``float64``),
+    receives the flattened action(s) in the same format and calls
+    ``finishedEvaluation`` once the simulation is over. This function blocks
+    until then (or until it is interrupted).
+
+    :param policy_config: The policy configuration used to train the policy
+        (same as in ``launch_policy_server``)
+    :type policy_config: ray.rllib.algorithms
+    :param env: The environment the policy was trained against
+    :type env: alpyperl.BaseAnyLogicEnv
+    :param env_config: Any option that will be consumed by the environment
+    :type env_config: dict
+    :param trained_policy_loc: The location of the **rllib** trained policy
+    :type trained_policy_loc: str
+    :param exported_policy_loc: The location of a policy exported with
+        ``alpyperl.serve.rllib.export_policy``. If provided, it is evaluated
+        with the ``NumpyPolicy`` inference engine instead of the rllib stack
+    :type exported_policy_loc: str
+    :param run_exported_model: Whether to launch the exported AnyLogic model
+        or wait for it to be launched from AnyLogic. Defaults to ``True``
+    :type run_exported_model: bool
+    :param exported_model_loc: The location of the exported model folder.
+        Defaults to ``./exported_model``
+    :type exported_model_loc: str
+    :param show_terminals: Whether to show the terminal of the exported model.
+        Defaults to ``False``
+    :type show_terminals: bool
+    :param intra_op_threads: Number of torch/tensorflow intra-op threads used
+        for inference. If not provided, the framework defaults are kept
+    :type intra_op_threads: int
+    """
+    logger = logging.getLogger(__name__)
+    # Actions are computed from the py4j callback threads directly.
+    if intra_op_threads is not None:
+        set_intra_op_threads(intra_op_threads)
+
+    # Load policy and the spaces it was trained with.
+    if exported_policy_loc is not None:
+        policy = NumpyPolicy.load(exported_policy_loc)
+        observation_space = policy.observation_space
+        action_space = policy.action_space
+    else:
+        observation_space = utils.load_space(
+            f"{trained_policy_loc}/alpyperl_spaces/observation_space.pkl"
+        )
+        action_space = utils.load_space(
+            f"{trained_policy_loc}/alpyperl_spaces/action_space.pkl"
+        )
+        policy = load_policy_replicas(
+            policy_config=policy_config,
+            env=env,
+            env_config=env_config,
+            trained_policy_loc=trained_policy_loc
+        )[0]
+
+    # The callback must be able to answer requests before the model starts
+    # running, so it is configured before connecting.
+    anylogic_model_callback = AnyLogicModelCallback()
+    anylogic_model_callback.policy_pool = PolicyPool(
+        policies=[policy],
+        observation_space=observation_space,
+        action_space=action_space
+    )
+    anylogic_connector = AnyLogicModelConnector(
+        run_exported_model=run_exported_model,
+        exported_model_loc=exported_model_loc,
+        show_terminals=show_terminals,
+        anylogic_model_callback=anylogic_model_callback
+    )
+    logger.info("Trained policy is being served to the AnyLogic model over the gateway")
+    try:
+        anylogic_model_callback.evaluation_finished.wait()
+    finally:
+        # Models launched from AnyLogic are not closed, but the gateway is.
+        if anylogic_connector.al_model_launcher is not None:
+            anylogic_connector.close_connection()
+        else:
+            anylogic_connector.gateway.shutdown()
+        anylogic_model_callback.policy_pool.shutdown()
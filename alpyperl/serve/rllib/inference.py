@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from gymnasium.spaces.utils import flatdim
+from alpyperl.gym.envs import utils
+
+
+def set_intra_op_threads(num_threads):
+    """Limit the number of threads used by torch and tensorflow to parallelise
+    a single operation (intra-op parallelism). The setting is process-wide
+    (i.e. shared by all the replicas of a process), so it is meant to be
+    called once, before the policy replicas are loaded"""
+    logger = logging.getLogger(__name__)
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+    except ImportError:
+        pass
+    except RuntimeError:
+        # Tensorflow only accepts the setting before it has been initialised.
+        logger.debug("Tensorflow intra-op threads could not be set after initialisation")
+
+
+class CheckpointPolicy:
+    """Wrap an rllib ``Policy`` restored directly from a checkpoint, so it
+    exposes the same ``compute_actions`` interface as an rllib ``Algorithm``
+    without building the algorithm (nor its environment). Observations are
+    preprocessed and actions unsquashed as the ``Algorithm`` would do.
+
+    :param policy_loc: The location of the policy checkpoint (e.g.
+        ``<trained_policy_loc>/policies/default_policy``)
+    :type policy_loc: str
+    """
+
+    def __init__(self, policy_loc):
+        from ray.rllib.policy.policy import Policy
+        from ray.rllib.models.catalog import ModelCatalog
+        self.policy = Policy.from_checkpoint(policy_loc)
+        self.preprocessor = ModelCatalog.get_preprocessor_for_space(
+            getattr(
+                self.policy.observation_space,
+                'original_space',
+                self.policy.observation_space
+            )
+        )
+
+    def compute_actions(self, observations, explore=False):
+        """Compute the actions of a dictionary of observations in a single
+        forward pass"""
+        from ray.rllib.utils.spaces.space_utils import unbatch, unsquash_action, clip_action
+        obs_batch = np.stack([self.preprocessor.transform(o) for o in observations.values()])
+        actions, _, _ = self.policy.compute_actions(obs_batch, explore=explore)
+        # Post-process actions (same as `Algorithm.compute_actions`).
+        if self.policy.config.get('normalize_actions'):
+            actions = unsquash_action(actions, self.policy.action_space_struct)
+        elif self.policy.config.get('clip_actions'):
+            actions = clip_action(actions, self.policy.action_space_struct)
+        return dict(zip(observations.keys(), unbatch(actions)))
+
+    def share_memory(self):
+        """Move the model weights to shared memory, so they are not copied by
+        processes forked afterwards. Only torch policies are supported"""
+        if self.policy.framework != 'torch':
+            raise Exception(
+                "Sharing policy weights between processes is only supported "
+                f"for 'torch' policies (found '{self.policy.framework}')."
+            )
+        self.policy.model.share_memory()
+
+
+def load_policy_replicas(
+    policy_config,
+    env,
+    env_config,
+    trained_policy_loc,
+    num_policy_replicas=1
+):
+    """`[INTERNAL]` Re-create the rllib algorithm and restore its state from
+    the given checkpoint as many times as replicas requested"""
+    # Set server flag on to avoid loading the AnyLogic model
+    if env_config is None:
+        env_config = {}
+    env_config['server_mode_on'] = True
+    # Default checkpoint directory to 'trained_policy_loc' if not provided
+    if 'checkpoint_dir' not in env_config:
+        env_config['checkpoint_dir'] = trained_policy_loc
+
+    # Re-create policy configuration with no workers and avoid launching
+    # unnecessary models
+    policy_config = (
+        policy_config
+            .env_runners(num_env_runners=0)
+            .environment(env=env, env_config=env_config)
+    )
+    policies = []
+    for _ in range(num_policy_replicas):
+        policy = policy_config.build()
+        # Restore policy state from given checkpoint
+        policy.restore(trained_policy_loc)
+        policies.append(policy)
+
+    return policies
+
+
+class PolicyPool:
+    """Run policy inference on a bounded pool of threads, so the server event
+    loop is never blocked by a forward pass. Every thread borrows one of the
+    policy replicas for the duration of the forward pass, so as many batches
+    as replicas can be computed at the same time.
+
+    :param policies: Policy replicas. They must implement ``compute_actions``
+        (e.g. an rllib ``Algorithm``) or ``compute_flattened_actions`` (e.g. an
+        ``alpyperl.serve.NumpyPolicy``)
+    :type policies: list
+    :param observation_space: The observation space the policy was trained with
+    :type observation_space: gymnasium.spaces
+    :param action_space: The action space the policy was trained with
+    :type action_space: gymnasium.spaces
+    :param metrics: Metrics where the duration of the ``unflatten``,
+        ``inference`` and ``flatten`` stages are recorded (optional)
+    :type metrics: alpyperl.serve.rllib.metrics.ServerMetrics
+    """
+
+    def __init__(
+        self,
+        policies,
+        observation_space,
+        action_space,
+        metrics=None
+    ):
+        self.metrics = metrics
+        self.observation_space = observation_space
+        self.action_space = action_space
+        self.observation_dim = flatdim(observation_space)
+        self.num_replicas = len(policies)
+        # Idle replicas ready to be used.
+        self.replicas = queue.Queue()
+        for policy in policies:
+            self.replicas.put(policy)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.num_replicas,
+            thread_name_prefix='alpyperl-inference'
+        )
+
+    def compute_flattened_actions(self, flattened_observations):
+        """Compute the flattened actions of a batch of flattened observations
+        (one per row) in a single forward pass. This call blocks until a
+        replica is available"""
+        # Keep a reference to the current replicas, so the policy is given back
+        # to them even if they are swapped meanwhile.
+        replicas = self.replicas
+        policy = replicas.get()
+        try:
+            # Policies that work on flattened data directly (e.g. 'NumpyPolicy')
+            # do not need observations nor actions to be converted.
+            if hasattr(policy, 'compute_flattened_actions'):
+                start = time.perf_counter()
+                flattened_actions = policy.compute_flattened_actions(flattened_observations)
+                if self.metrics is not None:
+                    self.metrics.observe_stage('inference', time.perf_counter() - start)
+                return flattened_actions
+            # Unflatten all observations at once (one observation per row).
+            start = time.perf_counter()
+            observations = utils.unflatten_batch(self.observation_space, flattened_observations)
+            unflattened = time.perf_counter()
+            # Check documentation at https://docs.ray.io/en/latest/serve/tutorials/rllib.html
+            actions = policy.compute_actions(
+                observations=dict(enumerate(observations)),
+                explore=False
+            )
+            computed = time.perf_counter()
+        finally:
+            replicas.put(policy)
+        flattened_actions = utils.flatten_batch(
+            self.action_space,
+            [actions[i] for i in range(len(observations))]
+        )
+        if self.metrics is not None:
+            self.metrics.observe_stage('unflatten', unflattened - start)
+            self.metrics.observe_stage('inference', computed - unflattened)
+            self.metrics.observe_stage('flatten', time.perf_counter() - computed)
+        return flattened_actions
+
+    async def compute_flattened_actions_async(self, flattened_observations):
+        """Same as ``compute_flattened_actions`` but it runs in the inference
+        pool and can be awaited from the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.compute_flattened_actions, flattened_observations
+        )
+
+    def swap_policies(self, policies):
+        """Replace the policy replicas. Forward passes being computed finish
+        with the previous replicas, and any forward pass started afterwards
+        uses the new ones
+
+        :param policies: The new policy replicas (as many as the current ones)
+        :type policies: list
+        """
+        if len(policies) != self.num_replicas:
+            raise Exception(
+                f"Expected {self.num_replicas} policy replicas, but received {len(policies)}"
+            )
+        replicas = queue.Queue()
+        for policy in policies:
+            replicas.put(policy)
+        self.replicas = replicas
+
+    def shutdown(self):
+        """Stop the inference threads"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,175 @@
+import bisect
+import threading
+import time
+
+
+# Default latency buckets (in seconds), from 50 microseconds to 10 seconds.
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Stages every prediction goes through.
+STAGES = ('decode', 'unflatten', 'inference', 'flatten', 'encode')
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets (Prometheus style). Recording a
+    value only takes a binary search and a few increments, so it can be used
+    on every request
+
+    :param buckets: Upper bounds of the buckets (sorted)
+    :type buckets: tuple
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # The last count holds values above the last bucket (i.e. '+Inf').
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Record a value"""
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labels=''):
+        """Render the histogram in the Prometheus text format"""
+        separator = ',' if labels else ''
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+class ServerMetrics:
+    """Operational metrics of the policy server, exposed in the Prometheus
+    text format:
+
+    * ``alpyperl_requests_total``: Number of requests by endpoint and status.
+    * ``alpyperl_request_duration_seconds``: Request latency by endpoint.
+    * ``alpyperl_stage_duration_seconds``: Time spent on every stage
+      (``decode``, ``unflatten``, ``inference``, ``flatten`` and ``encode``).
+      Stages computed per batch are recorded once per batch.
+    * ``alpyperl_batch_size``: Number of observations per forward pass.
+    * ``alpyperl_queue_depth``: Observations waiting to be batched.
+
+    :param max_batch_size: Largest batch size expected, used to define the
+        batch size buckets
+    :type max_batch_size: int
+    """
+
+    def __init__(self, max_batch_size=32):
+        self.requests = {}
+        self.request_durations = {}
+        self.stage_durations = {stage: Histogram(LATENCY_BUCKETS) for stage in STAGES}
+        # Powers of two up to the maximum batch size.
+        batch_buckets = [1]
+        while batch_buckets[-1] < max_batch_size:
+            batch_buckets.append(batch_buckets[-1] * 2)
+        self.batch_sizes = Histogram(batch_buckets)
+        # Functions returning the value of a gauge when rendered.
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def observe_request(self, endpoint, status, duration):
+        """Record a finished request"""
+        key = (endpoint, status)
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if endpoint not in self.request_durations:
+                self.request_durations[endpoint] = Histogram(LATENCY_BUCKETS)
+        self.request_durations[endpoint].observe(duration)
+
+    def observe_stage(self, stage, duration):
+        """Record the duration (in seconds) of a stage"""
+        self.stage_durations[stage].observe(duration)
+
+    def observe_batch_size(self, batch_size):
+        """Record the number of observations of a forward pass"""
+        self.batch_sizes.observe(batch_size)
+
+    def add_gauge(self, name, value_fn, metric_type='gauge'):
+        """Add a metric whose value is computed when rendered (e.g. a gauge or
+        a counter kept by another object)"""
+        self.gauges[name] = (value_fn, metric_type)
+
+    def render(self):
+        """Render all metrics in the Prometheus text format"""
+        lines = [
+            '# HELP alpyperl_requests_total Number of requests by endpoint and status.',
+            '# TYPE alpyperl_requests_total counter'
+        ]
+        for (endpoint, status), count in sorted(self.requests.items()):
+            lines.append(f'alpyperl_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        lines += [
+            '# HELP alpyperl_request_duration_seconds Request latency by endpoint.',
+            '# TYPE alpyperl_request_duration_seconds histogram'
+        ]
+        for endpoint, histogram in sorted(self.request_durations.items()):
+            lines += histogram.render('alpyperl_request_duration_seconds', f'endpoint="{endpoint}"')
+        lines += [
+            '# HELP alpyperl_stage_duration_seconds Time spent on every stage of a prediction.',
+            '# TYPE alpyperl_stage_duration_seconds histogram'
+        ]
+        for stage, histogram in self.stage_durations.items():
+            lines += histogram.render('alpyperl_stage_duration_seconds', f'stage="{stage}"')
+        lines += [
+            '# HELP alpyperl_batch_size Number of observations per forward pass.',
+            '# TYPE alpyperl_batch_size histogram'
+        ]
+        lines += self.batch_sizes.render('alpyperl_batch_size')
+        for name, (value_fn, metric_type) in self.gauges.items():
+            lines += [f'# TYPE {name} {metric_type}', f'{name} {value_fn()}']
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records the count and latency of the requests sent
+    to the given endpoints. Requests to any other path are recorded as
+    ``'other'``, so unknown paths do not create new series
+
+    :param app: The ASGI application
+    :param metrics: The metrics where requests are recorded
+    :type metrics: ServerMetrics
+    :param endpoints: Paths recorded by name
+    :type endpoints: list
+    """
+
+    def __init__(self, app, metrics, endpoints):
+        self.app = app
+        self.metrics = metrics
+        self.endpoints = set(endpoints)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        endpoint = scope['path'] if scope['path'] in self.endpoints else 'other'
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.observe_request(endpoint, status, time.perf_counter() - start)
+
+
+def server_timing(timings):
+    """Format the ``Server-Timing`` header given the duration (in seconds) of
+    every stage"""
+    return ', '.join(f'{stage};dur={duration * 1000.0:.3f}' for stage, duration in timings)
@@ -0,0 +1,77 @@
+import os
+import signal
+import socket
+import logging
+import uvicorn
+
+
+def serve_prefork(app_factory, host="0.0.0.0", port=3000, num_workers=2, uds=None):
+    """Serve the application from several worker processes forked from the
+    current one. All workers accept connections from the same listening socket,
+    and anything loaded before calling this function (e.g. the policy weights)
+    is shared with them instead of being loaded again. Only available on
+    POSIX systems.
+
+    :param app_factory: Function that creates the server application. It is
+        called once in every worker, after forking
+    :type app_factory: callable
+    :param host: The host ID to be used
+    :type host: str
+    :param port: The port the service will connect to
+    :type port: int
+    :param num_workers: Number of worker processes
+    :type num_workers: int
+    :param uds: Path of a Unix domain socket to listen on instead of
+        ``host`` and ``port``
+    :type uds: str
+    """
+    logger = logging.getLogger(__name__)
+    if not hasattr(os, 'fork'):
+        raise Exception("Serving from multiple processes is only supported on POSIX systems.")
+
+    # Bind socket once, so it is inherited by all workers.
+    if uds is not None:
+        # Remove socket file left behind by a previous server.
+        if os.path.exists(uds):
+            os.remove(uds)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(uds)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    worker_pids = []
+    for _ in range(num_workers):
+        pid = os.fork()
+        if pid == 0:
+            # Worker process: restore default signal handling and serve.
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                server = uvicorn.Server(uvicorn.Config(app_factory()))
+                server.run(sockets=[sock])
+            finally:
+                os._exit(0)
+        worker_pids.append(pid)
+    address = uds if uds is not None else f"{host}:{port}"
+    logger.info(f"Policy server listening on {address} with {num_workers} workers")
+
+    # Forward termination to workers and wait for them to finish.
+    def terminate_workers(signum, frame):
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGINT, terminate_workers)
+    signal.signal(signal.SIGTERM, terminate_workers)
+    try:
+        for pid in worker_pids:
+            os.waitpid(pid, 0)
+    finally:
+        sock.close()
+        if uds is not None and os.path.exists(uds):
+            os.remove(uds)
@@ -0,0 +1,193 @@
+import time
+import logging
+from typing import List
+import numpy as np
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import JSONResponse, Response
+from fastapi.encoders import jsonable_encoder
+from alpyperl.gym.envs import utils
+from alpyperl.serve import encoding
+from alpyperl.serve.rllib.binder import decode_observations, request_body_schema
+from alpyperl.serve.rllib.inference import PolicyPool
+from alpyperl.serve.rllib.registry import load_policy
+
+
+def build_policy_deployment(
+    trained_policy_loc=None,
+    exported_policy_loc=None,
+    num_replicas=1,
+    autoscaling_config=None,
+    max_batch_size=32,
+    batch_wait_timeout_s=0.002,
+    max_ongoing_requests=100,
+    ray_actor_options=None
+):
+    """Build a **Ray Serve** application that exposes the same prediction API
+    as ``launch_policy_server`` (``/predict``, ``/predict_batch`` and
+    ``/get_spaces``). Every replica loads the policy once (as a plain rllib
+    policy or as a ``NumpyPolicy``), and concurrent ``/predict`` requests are
+    batched with ``ray.serve.batch``.
+
+    :param trained_policy_loc: The location of the **rllib** trained policy
+    :type trained_policy_loc: str
+    :param exported_policy_loc: The location of a policy exported with
+        ``alpyperl.serve.rllib.export_policy`` (used instead of
+        ``trained_policy_loc``)
+    :type exported_policy_loc: str
+    :param num_replicas: Number of replicas (ignored if ``autoscaling_config``
+        is provided). Defaults to ``1``
+    :type num_replicas: int
+    :param autoscaling_config: Ray Serve autoscaling settings, e.g.
+        ``{'min_replicas': 1, 'max_replicas': 8, 'target_ongoing_requests': 16}``.
+        Replicas are added or removed to keep the number of queued and ongoing
+        requests per replica close to ``target_ongoing_requests``
+    :type autoscaling_config: dict
+    :param max_batch_size: Maximum number of ``/predict`` requests that share a
+        forward pass. Defaults to ``32``
+    :type max_batch_size: int
+    :param batch_wait_timeout_s: Maximum time (in seconds) a ``/predict``
+        request waits for others to be batched with. Defaults to ``0.002``
+    :type batch_wait_timeout_s: float
+    :param max_ongoing_requests: Maximum number of requests a replica handles
+        at the same time. Defaults to ``100``
+    :type max_ongoing_requests: int
+    :param ray_actor_options: Resources of every replica (e.g.
+        ``{'num_cpus': 1}``)
+    :type ray_actor_options: dict
+    :return: The application, ready to be passed to ``ray.serve.run``
+    :rtype: ray.serve.Application
+    """
+    from ray import serve
+
+    if exported_policy_loc is None and trained_policy_loc is None:
+        raise Exception("Either 'trained_policy_loc' or 'exported_policy_loc' must be provided.")
+    policy_loc = exported_policy_loc if exported_policy_loc is not None else trained_policy_loc
+
+    app = FastAPI()
+
+    @serve.deployment(
+        num_replicas=None if autoscaling_config is not None else num_replicas,
+        autoscaling_config=autoscaling_config,
+        max_ongoing_requests=max_ongoing_requests,
+        ray_actor_options=ray_actor_options
+    )
+    @serve.ingress(app)
+    class PolicyDeployment:
+        """`[INTERNAL]` Ray Serve replica hosting the trained policy"""
+
+        def __init__(self, policy_loc):
+            policy, self.observation_space, self.action_space = load_policy(policy_loc)
+            # Forward passes run out of the replica event loop.
+            self.policy_pool = PolicyPool(
+                policies=[policy],
+                observation_space=self.observation_space,
+                action_space=self.action_space
+            )
+
+        @serve.batch(max_batch_size=max_batch_size, batch_wait_timeout_s=batch_wait_timeout_s)
+        async def compute_batch(self, observations: List[np.ndarray]) -> List[np.ndarray]:
+            return list(await self.policy_pool.compute_flattened_actions_async(np.stack(observations)))
+
+        @app.post("/predict", openapi_extra=request_body_schema(batch=False))
+        async def predict_next_action(self, request: Request):
+            body_encoding, observations = await decode_observations(
+                request, self.policy_pool.observation_dim
+            )
+            if observations.shape[0] != 1:
+                raise HTTPException(status_code=400, detail="Expected a single observation")
+            action = await self.compute_batch(observations[0])
+            if body_encoding != encoding.JSON:
+                return Response(
+                    content=encoding.encode_array(action[None], body_encoding),
+                    media_type=body_encoding
+                )
+            response = {
+                "observation": observations[0].tolist(),
+                "action": action.tolist()
+            }
+            return JSONResponse(content=jsonable_encoder(response), status_code=200)
+
+        @app.post("/predict_batch", openapi_extra=request_body_schema(batch=True))
+        async def predict_next_actions(self, request: Request):
+            body_encoding, observations = await decode_observations(
+                request, self.policy_pool.observation_dim
+            )
+            actions = await self.policy_pool.compute_flattened_actions_async(observations)
+            return Response(
+                content=encoding.encode_array(actions, body_encoding),
+                media_type=body_encoding
+            )
+
+        @app.get("/get_spaces")
+        async def get_spaces(self):
+            response = {
+                "observation_space": utils.space_to_dict(self.observation_space),
+                "action_space": utils.space_to_dict(self.action_space)
+            }
+            return JSONResponse(content=jsonable_encoder(response), status_code=200)
+
+    return PolicyDeployment.bind(policy_loc)
+
+
+def launch_ray_serve_policy_server(
+    trained_policy_loc=None,
+    exported_policy_loc=None,
+    host="0.0.0.0",
+    port=3000,
+    num_replicas=1,
+    autoscaling_config=None,
+    max_batch_size=32,
+    batch_wait_timeout_s=0.002,
+    max_ongoing_requests=100,
+    ray_actor_options=None,
+    name='alpyperl_policy',
+    blocking=True
+):
+    """Serve a trained policy as a **Ray Serve** deployment, so serving
+    capacity can scale with the Ray cluster (e.g. the one used for training).
+    It connects to the running Ray instance, or starts a local one. Check
+    ``build_policy_deployment`` for more details on the parameters
+
+    :param host: The host ID of the Ray Serve HTTP proxy. Defaults to
+        ``0.0.0.0``
+    :type host: str
+    :param port: The port of the Ray Serve HTTP proxy. Defaults to ``3000``
+    :type port: int
+    :param name: The name of the Ray Serve application. Defaults to
+        ``'alpyperl_policy'``
+    :type name: str
+    :param blocking: Whether to wait (until interrupted) and shut the
+        application down afterwards. Defaults to ``True``
+    :type blocking: bool
+    :return: A handle to the deployment
+    :rtype: ray.serve.handle.DeploymentHandle
+    """
+    from ray import serve
+    logger = logging.getLogger(__name__)
+
+    serve.start(http_options={'host': host, 'port': port})
+    handle = serve.run(
+        build_policy_deployment(
+            trained_policy_loc=trained_policy_loc,
+            exported_policy_loc=exported_policy_loc,
+            num_replicas=num_replicas,
+            autoscaling_config=autoscaling_config,
+            max_batch_size=max_batch_size,
+            batch_wait_timeout_s=batch_wait_timeout_s,
+            max_ongoing_requests=max_ongoing_requests,
+            ray_actor_options=ray_actor_options
+        ),
+        name=name,
+        route_prefix='/'
+    )
+    logger.info(f"Policy deployed with Ray Serve at http://{host}:{port}")
+    if not blocking:
+        return handle
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serve.delete(name)
+    return handle
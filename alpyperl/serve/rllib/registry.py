@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+import numpy as np
+from alpyperl.gym.envs import utils
+from alpyperl.serve.rllib.batching import MicroBatcher
+from alpyperl.serve.rllib.inference import PolicyPool, CheckpointPolicy
+from alpyperl.serve.numpy_policy import NumpyPolicy
+
+
+def find_policies(policies_loc):
+    """Find the policies stored in a folder. Every rllib checkpoint (a folder
+    that contains ``alpyperl_spaces``) and every exported policy (``.npz``
+    file) is a policy, named after its folder or file name
+
+    :param policies_loc: The folder that contains the policies
+    :type policies_loc: str
+    :return: The location of every policy by name
+    :rtype: dict
+    """
+    policies = {}
+    for entry in sorted(os.listdir(policies_loc)):
+        location = os.path.join(policies_loc, entry)
+        if os.path.isdir(location) and os.path.isdir(os.path.join(location, 'alpyperl_spaces')):
+            policies[entry] = location
+        elif entry.endswith('.npz'):
+            policies[entry[:-len('.npz')]] = location
+    return policies
+
+def load_policy(policy_loc):
+    """Load a policy given its location. Exported policies (``.npz``) are
+    loaded with the ``NumpyPolicy`` inference engine, and rllib checkpoints as
+    plain rllib policies (without building the algorithm nor the environment)
+
+    :param policy_loc: The location of the policy
+    :type policy_loc: str
+    :return: The policy, its observation space and its action space
+    :rtype: tuple
+    """
+    if policy_loc.endswith('.npz'):
+        policy = NumpyPolicy.load(policy_loc)
+        return policy, policy.observation_space, policy.action_space
+    return (
+        CheckpointPolicy(f"{policy_loc}/policies/default_policy"),
+        utils.load_space(f"{policy_loc}/alpyperl_spaces/observation_space.pkl"),
+        utils.load_space(f"{policy_loc}/alpyperl_spaces/action_space.pkl")
+    )
+
+def load_replicas(policy_loc, num_replicas=1):
+    """Load a policy (check ``load_policy``) as many times as replicas
+    requested. Exported policies are shared by all replicas, since NumPy
+    inference is read-only
+
+    :param policy_loc: The location of the policy
+    :type policy_loc: str
+    :param num_replicas: Number of replicas
+    :type num_replicas: int
+    :return: The policy replicas, the observation space and the action space
+    :rtype: tuple
+    """
+    policy, observation_space, action_space = load_policy(policy_loc)
+    if isinstance(policy, NumpyPolicy):
+        return [policy] * num_replicas, observation_space, action_space
+    policies = [policy] + [load_policy(policy_loc)[0] for _ in range(num_replicas - 1)]
+    return policies, observation_space, action_space
+
+def get_policy_signature(policy_loc):
+    """`[INTERNAL]` Summarise the files of a policy (latest modification time,
+    total size and number of files), so changes can be detected"""
+    if os.path.isfile(policy_loc):
+        stat = os.stat(policy_loc)
+        return stat.st_mtime_ns, stat.st_size, 1
+    stats = [
+        os.stat(os.path.join(root, f))
+        for root, _, files in os.walk(policy_loc)
+        for f in files
+    ]
+    return (
+        max((stat.st_mtime_ns for stat in stats), default=0),
+        sum(stat.st_size for stat in stats),
+        len(stats)
+    )
+
+def get_policy_size(policy_loc):
+    """`[INTERNAL]` Estimate the memory used by a policy given the size of its
+    files"""
+    if os.path.isfile(policy_loc):
+        return os.path.getsize(policy_loc)
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(policy_loc)
+        for f in files
+    )
+
+
+class ServedPolicy:
+    """A policy loaded by the ``PolicyRegistry``, together with the inference
+    pool and the micro-batcher used to serve it"""
+
+    def __init__(
+        self,
+        name,
+        policy,
+        observation_space,
+        action_space,
+        size,
+        max_batch_size=32,
+        max_batch_wait_ms=2.0
+    ):
+        self.name = name
+        self.size = size
+        # Number of requests being served (the policy is not evicted meanwhile).
+        self.in_flight = 0
+        self.policy_pool = PolicyPool(
+            policies=[policy],
+            observation_space=observation_space,
+            action_space=action_space
+        )
+        self.observation_dim = self.policy_pool.observation_dim
+
+        async def compute_batch(observations):
+            return list(await self.policy_pool.compute_flattened_actions_async(np.stack(observations)))
+
+        self.batcher = MicroBatcher(
+            batch_fn=compute_batch,
+            max_batch_size=max_batch_size,
+            max_batch_wait_ms=max_batch_wait_ms
+        )
+
+
+class PolicyRegistry:
+    """Host many policies in the same process. Policies are loaded the first
+    time they are requested, and the least recently used ones are evicted
+    (as long as they are idle) when either ``max_policies`` or
+    ``memory_budget_mb`` is exceeded. This way the hosting cost depends on the
+    policies in use rather than on the number of policies available.
+
+    :param policies: The location of every policy by name (check
+        ``find_policies``)
+    :type policies: dict
+    :param max_policies: Maximum number of policies loaded at the same time.
+        If not provided, there is no limit
+    :type max_policies: int
+    :param memory_budget_mb: Maximum memory (in MB) used by the loaded
+        policies, estimated from the size of their files. If not provided,
+        there is no limit
+    :type memory_budget_mb: float
+    :param max_batch_size: Maximum number of ``/predict`` requests that share
+        a forward pass (per policy)
+    :type max_batch_size: int
+    :param max_batch_wait_ms: Maximum time (in milliseconds) a ``/predict``
+        request waits for others to be batched with
+    :type max_batch_wait_ms: float
+    """
+
+    def __init__(
+        self,
+        policies,
+        max_policies=None,
+        memory_budget_mb=None,
+        max_batch_size=32,
+        max_batch_wait_ms=2.0
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.policies = dict(policies)
+        self.max_policies = max_policies
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb is not None else None
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+        # Loaded policies, from least to most recently used.
+        self.loaded = OrderedDict()
+        # One lock per policy, so a policy is only loaded once even if it is
+        # requested concurrently.
+        self.locks = {}
+
+    def names(self):
+        """Names of the policies available"""
+        return list(self.policies.keys())
+
+    def loaded_names(self):
+        """Names of the policies currently loaded (least recently used first)"""
+        return list(self.loaded.keys())
+
+    async def acquire(self, name):
+        """Get a served policy, loading it if needed, and mark it as in use.
+        It must be given back with ``release`` once the request is served
+
+        :param name: The policy name
+        :type name: str
+        :return: The served policy
+        :rtype: ServedPolicy
+        """
+        if name not in self.policies:
+            raise KeyError(name)
+        if name not in self.loaded:
+            lock = self.locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                if name not in self.loaded:
+                    # Load policy out of the event loop, since it may take a
+                    # while.
+                    policy_loc = self.policies[name]
+                    policy, observation_space, action_space = await asyncio.get_running_loop().run_in_executor(
+                        None, load_policy, policy_loc
+                    )
+                    self.loaded[name] = ServedPolicy(
+                        name=name,
+                        policy=policy,
+                        observation_space=observation_space,
+                        action_space=action_space,
+                        size=get_policy_size(policy_loc),
+                        max_batch_size=self.max_batch_size,
+                        max_batch_wait_ms=self.max_batch_wait_ms
+                    )
+                    self.logger.info(f"Policy '{name}' loaded from '{policy_loc}'")
+        served_policy = self.loaded[name]
+        served_policy.in_flight += 1
+        self.loaded.move_to_end(name)
+        self.__evict()
+        return served_policy
+
+    def release(self, served_policy):
+        """Give back a policy obtained with ``acquire``"""
+        served_policy.in_flight -= 1
+        self.__evict()
+
+    def __evict(self):
+        """`[INTERNAL]` Unload the least recently used idle policies while the
+        limits are exceeded"""
+        for name in list(self.loaded.keys()):
+            if not self.__limits_exceeded():
+                break
+            served_policy = self.loaded[name]
+            if served_policy.in_flight > 0:
+                continue
+            del self.loaded[name]
+            served_policy.batcher.close()
+            served_policy.policy_pool.shutdown()
+            self.logger.info(f"Policy '{name}' unloaded")
+
+    def __limits_exceeded(self):
+        """`[INTERNAL]` Whether the loaded policies exceed any of the limits"""
+        if self.max_policies is not None and len(self.loaded) > self.max_policies:
+            return True
+        if self.memory_budget is not None:
+            return sum(p.size for p in self.loaded.values()) > self.memory_budget
+        return False
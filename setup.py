@@ -29,6 +29,11 @@ setup(name='alpyperl',
       extras_require={
             'docs': [
                 'sphinx_rtd_theme'
+            ],
+            'serve': [
+                'httpx',
+                'msgpack',
+                'websockets'
             ]
       }
 )
\ No newline at end of file
@@ -0,0 +1,98 @@
+import pytest
+import json
+import time
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+from alpyperl.evaluation import ParallelEvaluator, scenario_grid, sample_scenarios
+from alpyperl.serve import NumpyPolicy
+
+
+class CounterEnv(gym.Env):
+    """Environment whose episode length and reward are set by `env_params`.
+    Steps are slow, as if they were simulated by a model"""
+
+    observation_space = spaces.Box(low=-1.0, high=1.0, shape=(2,))
+    action_space = spaces.Discrete(n=2)
+
+    def __init__(self, env_config):
+        self.env_params = {}
+        self.step_time = env_config['step_time']
+        # Start and end times of every episode.
+        self.episode_times = []
+
+    def reset(self, *, seed=None, options=None):
+        self.steps = 0
+        self.episode_times.append([time.perf_counter(), None])
+        return np.zeros(2, dtype=np.float32), {}
+
+    def step(self, action):
+        time.sleep(self.step_time)
+        self.steps += 1
+        # The policy below always chooses action 1.
+        reward = self.env_params['reward'] * action
+        terminated = self.steps == self.env_params['length']
+        if terminated:
+            self.episode_times[-1][1] = time.perf_counter()
+        return np.zeros(2, dtype=np.float32), reward, terminated, False, {}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exported_policy_loc(tmp_path):
+    # Action 1 is always chosen
+    policy = NumpyPolicy(
+        [(np.zeros((2, 2)), np.array([0.0, 1.0]))],
+        'linear', 'categorical', {'n': 2},
+        observation_space=CounterEnv.observation_space,
+        action_space=CounterEnv.action_space
+    )
+    policy.save(str(tmp_path / "policy.npz"))
+    return str(tmp_path / "policy.npz")
+
+def test_scenarios():
+    assert scenario_grid({'a': [1, 2], 'b': [3]}) == [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    scenarios = sample_scenarios({'a': (0.0, 1.0), 'b': [3, 4]}, num_scenarios=5, seed=0)
+    assert len(scenarios) == 5
+    assert all(0.0 <= s['a'] <= 1.0 and s['b'] in [3, 4] for s in scenarios)
+    assert scenarios == sample_scenarios({'a': (0.0, 1.0), 'b': [3, 4]}, num_scenarios=5, seed=0)
+
+def test_evaluation(exported_policy_loc, tmp_path):
+    scenarios = scenario_grid({'reward': [1.0, 2.0], 'length': [3, 5]})
+    with ParallelEvaluator(
+        CounterEnv, {'step_time': 0.0}, exported_policy_loc=exported_policy_loc, num_envs=3
+    ) as evaluator:
+        results = list(evaluator.run(
+            scenarios, episodes_per_scenario=2, results_file=str(tmp_path / "results.jsonl")
+        ))
+        # Episodes can be truncated
+        evaluator.max_episode_steps = 2
+        truncated_results = list(evaluator.run(scenarios[:1]))
+    results = sorted(results, key=lambda r: r['scenario_id'])
+    assert [r['env_params'] for r in results] == scenarios
+    assert [r['episodes'] for r in results] == [2] * 4
+    assert [r['return_mean'] for r in results] == [3.0, 5.0, 6.0, 10.0]
+    assert [r['length_mean'] for r in results] == [3.0, 5.0, 3.0, 5.0]
+    # Results are streamed to the file
+    with open(tmp_path / "results.jsonl") as f:
+        assert len([json.loads(line) for line in f]) == 4
+    assert truncated_results[0]['length_mean'] == 2.0
+
+def test_instances_run_in_parallel(exported_policy_loc):
+    scenarios = scenario_grid({'reward': [1.0], 'length': [10]}) * 8
+    with ParallelEvaluator(
+        CounterEnv, {'step_time': 0.01}, exported_policy_loc=exported_policy_loc, num_envs=4
+    ) as evaluator:
+        results = list(evaluator.run(scenarios))
+        episode_times = [env.episode_times for env in evaluator.envs]
+    assert len(results) == 8
+    # Every instance is used, and runs its episodes one after the other
+    assert sum(len(times) for times in episode_times) == 8
+    for times in episode_times:
+        assert len(times) > 0
+        assert all(end <= next_start for (_, end), (next_start, _) in zip(times[:-1], times[1:]))
+    # The first episode of every instance overlaps with the others
+    first_episodes = [times[0] for times in episode_times]
+    assert max(start for start, _ in first_episodes) < min(end for _, end in first_episodes)
@@ -0,0 +1,297 @@
+import pytest
+import os
+import threading
+from types import SimpleNamespace
+import numpy as np
+from gymnasium import spaces
+from alpyperl.gym.envs import anylogic_env, utils
+from alpyperl.gym.envs.anylogic_env import BaseAnyLogicEnv
+
+
+class FakeAnyLogicModel:
+    """Model whose state is the number of steps simulated. Every step is
+    rewarded with the index of the action, and episodes last
+    `env_params['length']` steps (3 by default)"""
+
+    def __init__(self):
+        self.t = 0
+        self.length = 3
+        self.reward = 0.0
+        self.resets = []
+        self.restores = []
+        self.restore_seeds = []
+        self.seeds = 0
+        self.snapshots = {}
+        self.entry_point = self
+
+    # Java entry point introspection (`utils.has_java_methods`).
+    def getClass(self):
+        return self
+
+    def getMethods(self):
+        return [
+            SimpleNamespace(getName=lambda name=name: name)
+            for name in ['saveSnapshot', 'restoreSnapshot', 'repeatStep']
+        ]
+
+    def init(self):
+        pass
+
+    def hasSpacesDefined(self):
+        return False
+
+    def getSeed(self):
+        # A new seed for every episode
+        self.seeds += 1
+        return self.seeds
+
+    def reset(self, anylogic_observation_space, env_params):
+        self.resets.append((dict(env_params), threading.current_thread()))
+        self.length = env_params.get('length', 3)
+        self.t = 0
+        return [float(self.t)]
+
+    def step(self, action):
+        self.t += 1
+        self.reward = float(np.argmax(action))
+
+    def getState(self, anylogic_observation_space):
+        return [float(self.t)]
+
+    def getReward(self):
+        return self.reward
+
+    def hasFinished(self):
+        return self.t >= self.length
+
+    def repeatStep(self, action, action_repeat, anylogic_observation_space):
+        reward = 0.0
+        for _ in range(action_repeat):
+            self.step(action)
+            reward += self.reward
+            if self.hasFinished():
+                break
+        return [reward, float(self.hasFinished()), float(self.t)]
+
+    def saveSnapshot(self, snapshot_file):
+        self.snapshots[snapshot_file] = (self.t, self.length)
+        if snapshot_file is not None:
+            with open(snapshot_file, 'w') as f:
+                f.write(str(self.t))
+
+    def restoreSnapshot(self, anylogic_observation_space, snapshot_file, seed):
+        self.restores.append(snapshot_file)
+        self.restore_seeds.append(seed)
+        self.t, self.length = self.snapshots[snapshot_file]
+        return [float(self.t)]
+
+
+class FakeConnector:
+
+    def __init__(self, **kwargs):
+        self.gateway = FakeAnyLogicModel()
+
+    def close_connection(self):
+        pass
+
+
+class CounterEnv(BaseAnyLogicEnv):
+
+    def __init__(self, env_config=None):
+        self.action_space = spaces.Discrete(n=2)
+        self.observation_space = spaces.Box(low=0.0, high=100.0, shape=(1,))
+        super(CounterEnv, self).__init__(env_config)
+
+
+@pytest.fixture
+def create_env(monkeypatch, tmp_path):
+    # Java objects are not needed by the fake model
+    monkeypatch.setattr(anylogic_env, 'AnyLogicModelConnector', FakeConnector)
+    monkeypatch.setattr(utils, 'parse_gym_to_anylogic_rl_space', lambda anylogic_model, **kwargs: 'space')
+    monkeypatch.setattr(
+        utils, 'get_anylogic_rl_action',
+        lambda anylogic_model, flattened_action, anylogic_action_space: flattened_action
+    )
+    monkeypatch.setattr(utils, 'get_java_map', lambda anylogic_model, python_dict: python_dict)
+    # Spaces are defined in python, so they do not need to be saved
+    os.makedirs(tmp_path / "policy" / "alpyperl_spaces")
+    envs = []
+
+    def create(**env_config):
+        env = CounterEnv({'checkpoint_dir': str(tmp_path / "policy"), **env_config})
+        envs.append(env)
+        return env
+
+    yield create
+    for env in envs:
+        env.close()
+
+def run_episode(env, action=1):
+    rewards = []
+    done = False
+    while not done:
+        _, reward, done, _, _ = env.step(action)
+        rewards.append(reward)
+    return rewards
+
+def test_reset_from_snapshot(create_env):
+    env = create_env(reset_from_snapshot=True, env_params={'length': 3})
+    model = env.anylogic_model
+    assert env.reset()[0].tolist() == [0.0]
+    # The snapshot is captured once the model waits for the first action
+    assert len(model.resets) == 1 and list(model.snapshots) == [None]
+    assert run_episode(env) == [1.0, 1.0, 1.0]
+    # Following resets restore the snapshot instead of resetting the model
+    assert env.reset()[0].tolist() == [0.0]
+    assert len(model.resets) == 1 and model.restores == [None]
+    assert run_episode(env) == [1.0, 1.0, 1.0]
+    # The snapshot is captured again if parameters change
+    env.env_params = {'length': 2}
+    env.reset()
+    assert len(model.resets) == 2 and model.restores == [None]
+    assert run_episode(env) == [1.0, 1.0]
+
+def test_reset_from_snapshot_reseeds_the_model(create_env):
+    env = create_env(reset_from_snapshot=True)
+    model = env.anylogic_model
+    for _ in range(4):
+        env.reset()
+        run_episode(env)
+    # Every restored episode gets the seed of the new episode
+    assert model.restore_seeds == [2, 3, 4]
+
+def test_reset_from_snapshot_file(create_env, tmp_path):
+    env = create_env(reset_from_snapshot=True, snapshot_loc=str(tmp_path / "snapshots"))
+    env.reset()
+    env.reset()
+    snapshot_file, = env.anylogic_model.snapshots
+    assert os.path.dirname(snapshot_file) == str(tmp_path / "snapshots")
+    assert env.anylogic_model.restores == [snapshot_file]
+    # The snapshot file is removed on close
+    env.close()
+    assert not os.path.exists(snapshot_file)
+
+@pytest.mark.parametrize("env_params", [
+    {'length': 5},
+    # Values that change in a JSON round-trip
+    {'length': np.int64(5), 'weights': (1.0, 2.0), 1: 'a'}
+])
+def test_resume_from_model_checkpoint(create_env, tmp_path, env_params):
+    env_config = {
+        'model_checkpoint_freq': 2,
+        'model_checkpoint_dir': str(tmp_path / "checkpoints"),
+        'env_params': env_params
+    }
+    env = create_env(**env_config)
+    env.reset()
+    for _ in range(3):
+        env.step(1)
+    # Checkpoint captured at step 2
+    checkpoint_dir = tmp_path / "checkpoints" / "worker_0_env_0"
+    assert sorted(os.listdir(checkpoint_dir)) == ['checkpoint.json', 'model_step_2.als']
+    # The model crashes and the environment is re-created
+    env = create_env(**env_config)
+    env.anylogic_model.snapshots = {str(checkpoint_dir / "model_step_2.als"): (2, 5)}
+    state, info = env.reset()
+    assert state.tolist() == [2.0]
+    assert info['resumed_from_checkpoint'] and info['episode_steps'] == 2
+    # The checkpoint is removed once the episode is over
+    assert run_episode(env) == [1.0, 1.0, 1.0]
+    assert os.listdir(checkpoint_dir) == []
+
+def test_model_checkpoint_with_other_params(create_env, tmp_path):
+    env_config = {'model_checkpoint_freq': 1, 'model_checkpoint_dir': str(tmp_path / "checkpoints")}
+    env = create_env(env_params={'length': 5}, **env_config)
+    env.reset()
+    env.step(1)
+    # A checkpoint captured with other parameter values is not resumed
+    env = create_env(env_params={'length': 4}, **env_config)
+    state, info = env.reset()
+    assert state.tolist() == [0.0] and info == {}
+
+def test_model_checkpoint_is_cleared_when_params_change(create_env, tmp_path):
+    env = create_env(
+        model_checkpoint_freq=1,
+        model_checkpoint_dir=str(tmp_path / "checkpoints"),
+        env_params={'length': 5}
+    )
+    checkpoint_dir = tmp_path / "checkpoints" / "worker_0_env_0"
+    env.reset()
+    env.step(1)
+    # The next scenario starts before the episode is over
+    env.env_params = {'length': 4}
+    env.reset()
+    assert os.listdir(checkpoint_dir) == []
+    env.step(1)
+    env.env_params = {'length': 3}
+    env.step(1)
+    # Only the latest snapshot is kept
+    assert sorted(os.listdir(checkpoint_dir)) == ['checkpoint.json', 'model_step_2.als']
+    run_episode(env)
+    env.close()
+    assert os.listdir(checkpoint_dir) == []
+
+def test_model_checkpoint_is_not_used_by_default(create_env):
+    env = create_env()
+
+    def clear_model_checkpoint():
+        raise AssertionError("Model checkpoints should not be used")
+
+    env._BaseAnyLogicEnv__clear_model_checkpoint = clear_model_checkpoint
+    env.reset()
+    assert run_episode(env) == [1.0, 1.0, 1.0]
+    env.reset()
+
+def test_action_repeat(create_env):
+    env = create_env(action_repeat=2, env_params={'length': 5})
+    assert env.reset()[0].tolist() == [0.0]
+    # Rewards of the repeated decisions are summed
+    state, reward, done, _, _ = env.step(1)
+    assert state.tolist() == [2.0] and reward == 2.0 and not done
+    env.step(0)
+    # The repetition stops as soon as the simulation finishes
+    state, reward, done, _, _ = env.step(1)
+    assert state.tolist() == [5.0] and reward == 1.0 and done
+
+def test_action_repeat_requires_repeat_step(create_env, monkeypatch):
+    monkeypatch.setattr(
+        FakeAnyLogicModel, 'getMethods', lambda self: [SimpleNamespace(getName=lambda: 'step')]
+    )
+    with pytest.raises(Exception, match="repeatStep"):
+        create_env(action_repeat=2)
+
+def test_prefetch_reset(create_env):
+    env = create_env(prefetch_reset=True, env_params={'length': 2})
+    model = env.anylogic_model
+    env.reset()
+    assert run_episode(env) == [1.0, 1.0]
+    # The next episode is reset in the background once the episode finishes
+    assert env.reset()[0].tolist() == [0.0]
+    assert len(model.resets) == 2
+    assert model.resets[1][1] is not threading.main_thread()
+    assert run_episode(env) == [1.0, 1.0]
+
+def test_prefetch_reset_with_new_params(create_env):
+    env = create_env(prefetch_reset=True, env_params={'length': 2})
+    model = env.anylogic_model
+    env.reset()
+    run_episode(env)
+    # The prefetched reset used the old values, so the model is reset again
+    env.env_params = {'length': 3}
+    env.reset()
+    assert len(model.resets) == 3
+    assert model.resets[2] == ({'length': 3}, threading.main_thread())
+    assert run_episode(env) == [1.0, 1.0, 1.0]
+
+def test_prefetch_reset_error(create_env):
+    env = create_env(prefetch_reset=True, env_params={'length': 1})
+    env.reset()
+
+    def reset(anylogic_observation_space, env_params):
+        raise RuntimeError("Model crashed")
+
+    env.anylogic_model.reset = reset
+    env.step(1)
+    # Errors of the background reset are raised by the next reset
+    with pytest.raises(Exception, match="reset in the background"):
+        env.reset()
@@ -0,0 +1,106 @@
+import pytest
+import logging
+import threading
+from gymnasium import spaces
+from alpyperl.gym.envs import utils
+
+pytest.importorskip("ray.rllib.env.external_env")
+from ray.rllib.env.external_env import _DUMMY_AGENT_ID
+from alpyperl.gym.envs import anylogic_external_env
+from alpyperl.gym.envs.anylogic_external_env import BaseAnyLogicExternalEnv
+
+
+class StubJavaMethod:
+
+    def __init__(self, name):
+        self.name = name
+
+    def getName(self):
+        return self.name
+
+
+class StubAnyLogicModel:
+    """Model that runs a single episode with one decision per run"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.actions = []
+        self.blocked = threading.Event()
+        self.entry_point = self
+        self.runs = 0
+
+    def getClass(self):
+        return self
+
+    def getMethods(self):
+        return [StubJavaMethod('runExternal')]
+
+    def runExternal(self, anylogic_observation_space, env_params):
+        self.runs += 1
+        if self.runs > 1:
+            # Only one run is simulated (the serving thread is a daemon)
+            self.blocked.wait()
+        env = self.callback.external_env
+        episode_id = env.start_episode()
+        self.actions.append(env.get_anylogic_action(episode_id, [0.1, 0.2]))
+        env.log_returns(episode_id, 1.0)
+        env.end_anylogic_episode(episode_id, [0.3, 0.4])
+
+
+class StubAnyLogicEnv:
+    """Stand-in for the `BaseAnyLogicEnv` built by the external environment"""
+
+    def __init__(self, env_config):
+        self.env_config = env_config
+        self.env_params = {}
+        self.logger = logging.getLogger(__name__)
+        self.action_space = spaces.Discrete(n=2)
+        self.observation_space = spaces.Box(low=-1.0, high=1.0, shape=(2,))
+        self.anylogic_action_space = 'action_space'
+        self.anylogic_observation_space = 'observation_space'
+        self.anylogic_connector = self
+        self.anylogic_model_callback = self
+        self.anylogic_model = StubAnyLogicModel(self)
+
+    def _save_spaces_if_missing(self):
+        pass
+
+
+def test_run_episode(monkeypatch):
+    monkeypatch.setattr(
+        anylogic_external_env, 'create_custom_env', lambda action_space, observation_space: StubAnyLogicEnv
+    )
+    # Java objects are not needed by the stub model
+    monkeypatch.setattr(utils, 'get_java_map', lambda anylogic_model, python_dict: python_dict)
+    monkeypatch.setattr(
+        utils, 'get_anylogic_rl_action',
+        lambda anylogic_model, flattened_action, anylogic_action_space: flattened_action.tolist()
+    )
+    env = BaseAnyLogicExternalEnv({})
+    env.start()
+    base_env = env.to_base_env()
+    # The episode is started and the first observation is sent
+    observations = base_env.poll()[0]
+    (episode_id, agent_observations), = observations.items()
+    assert agent_observations[_DUMMY_AGENT_ID].tolist() == pytest.approx([0.1, 0.2])
+    base_env.send_actions({episode_id: {_DUMMY_AGENT_ID: 1}})
+    # The episode ends with the final observation and the reward logged
+    observations, rewards, terminateds = base_env.poll()[:3]
+    assert observations[episode_id][_DUMMY_AGENT_ID].tolist() == pytest.approx([0.3, 0.4])
+    assert rewards[episode_id][_DUMMY_AGENT_ID] == 1.0
+    assert terminateds[episode_id]['__all__']
+    assert env.anylogic_model.actions == [[0.0, 1.0]]
+
+@pytest.mark.parametrize("env_config", [
+    {'reset_from_snapshot': True},
+    {'model_checkpoint_freq': 10},
+    {'action_repeat': 2},
+    {'trajectory_dir': './trajectories'},
+    {'prefetch_reset': True}
+])
+def test_step_loop_options_are_rejected(monkeypatch, env_config):
+    monkeypatch.setattr(
+        anylogic_external_env, 'create_custom_env', lambda action_space, observation_space: StubAnyLogicEnv
+    )
+    with pytest.raises(Exception, match="not supported by 'BaseAnyLogicExternalEnv'"):
+        BaseAnyLogicExternalEnv({'run_exported_model': False, **env_config})
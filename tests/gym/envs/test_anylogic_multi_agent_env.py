@@ -0,0 +1,122 @@
+import pytest
+import logging
+from types import SimpleNamespace
+import numpy as np
+from gymnasium import spaces
+from alpyperl.gym.envs import utils
+
+pytest.importorskip("ray.rllib.env.multi_agent_env")
+from alpyperl.gym.envs import anylogic_multi_agent_env
+from alpyperl.gym.envs.anylogic_multi_agent_env import BaseAnyLogicMultiAgentEnv
+
+
+def encode_result(done, truncated, blocks):
+    """Encode the agents result as the AnyLogic model does"""
+    return np.array([done, truncated] + [v for block in blocks for v in block], dtype='>f8').tobytes()
+
+
+class StubAnyLogicModel:
+    """Model with 3 agents and 2 observation values per agent"""
+
+    def __init__(self):
+        self.entry_point = self
+        self.actions = []
+        # Results returned on every call (reset first).
+        self.results = []
+
+    def getClass(self):
+        return self
+
+    def getMethods(self):
+        return [
+            SimpleNamespace(getName=lambda name=name: name)
+            for name in ['getAgentIds', 'resetAgents', 'stepAgents']
+        ]
+
+    def getAgentIds(self):
+        return ['a', 'b', 'c']
+
+    def getSeed(self):
+        return 0
+
+    def resetAgents(self, anylogic_observation_space, env_params):
+        return self.results.pop(0)
+
+    def stepAgents(self, actions, anylogic_action_space, anylogic_observation_space):
+        self.actions.append(np.frombuffer(actions, dtype='>f8').reshape(3, -1))
+        return self.results.pop(0)
+
+
+class StubAnyLogicEnv:
+    """Stand-in for the `BaseAnyLogicEnv` built by the multi-agent environment"""
+
+    def __init__(self, env_config):
+        self.env_params = {}
+        self.logger = logging.getLogger(__name__)
+        self.action_space = spaces.Discrete(n=2)
+        self.observation_space = spaces.Box(low=-1.0, high=1.0, shape=(2,))
+        self.anylogic_action_space = 'action_space'
+        self.anylogic_observation_space = 'observation_space'
+        self.anylogic_model = StubAnyLogicModel()
+
+    def _save_spaces_if_missing(self):
+        pass
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.setattr(
+        anylogic_multi_agent_env, 'create_custom_env', lambda action_space, observation_space: StubAnyLogicEnv
+    )
+    monkeypatch.setattr(utils, 'get_java_map', lambda anylogic_model, python_dict: python_dict)
+    return BaseAnyLogicMultiAgentEnv({})
+
+def test_step_agents(env):
+    model = env.anylogic_model
+    model.results = [
+        # Agents 'a' and 'c' require an action
+        encode_result(False, False, [[1, 0, 0, 0.1, 0.2], [0, 0, 0, 0, 0], [1, 0, 0, 0.5, 0.6]]),
+        # Agent 'b' requires an action and 'c' terminates
+        encode_result(False, False, [[0, 0, 0, 0, 0], [1, 1.5, 0, 0.3, 0.4], [0, -1.0, 1, 0.7, 0.8]])
+    ]
+    observations, infos = env.reset()
+    assert sorted(observations) == ['a', 'c']
+    assert observations['c'].tolist() == pytest.approx([0.5, 0.6])
+
+    observations, rewards, terminateds, truncateds, _ = env.step({'a': 1, 'c': 0})
+    # Actions are sent flattened, with NaN for agents that do not act
+    actions = model.actions[0]
+    assert actions[0].tolist() == [0.0, 1.0] and actions[2].tolist() == [1.0, 0.0]
+    assert np.isnan(actions[1]).all()
+    assert sorted(observations) == ['b', 'c']
+    assert observations['b'].tolist() == pytest.approx([0.3, 0.4])
+    assert rewards == {'b': 1.5, 'c': -1.0}
+    assert terminateds == {'b': False, 'c': True, '__all__': False}
+    assert truncateds == {'b': False, 'c': False, '__all__': False}
+
+def test_simulation_truncated(env):
+    env.anylogic_model.results = [
+        encode_result(False, False, [[1, 0, 0, 0.1, 0.2], [1, 0, 0, 0.3, 0.4], [1, 0, 0, 0.5, 0.6]]),
+        # The model stop time is reached
+        encode_result(True, True, [[0, 1.0, 0, 0.1, 0.2], [0, 2.0, 0, 0.3, 0.4], [0, 3.0, 1, 0.5, 0.6]])
+    ]
+    env.reset()
+    observations, rewards, terminateds, truncateds, _ = env.step({'a': 0, 'b': 0, 'c': 0})
+    # Every agent receives its last observation
+    assert sorted(observations) == ['a', 'b', 'c']
+    assert terminateds == {'a': False, 'b': False, 'c': True, '__all__': False}
+    assert truncateds == {'a': True, 'b': True, 'c': False, '__all__': True}
+
+@pytest.mark.parametrize("env_config", [
+    {'reset_from_snapshot': True},
+    {'model_checkpoint_freq': 10},
+    {'action_repeat': 2},
+    {'trajectory_dir': './trajectories'},
+    {'prefetch_reset': True}
+])
+def test_step_loop_options_are_rejected(monkeypatch, env_config):
+    monkeypatch.setattr(
+        anylogic_multi_agent_env, 'create_custom_env', lambda action_space, observation_space: StubAnyLogicEnv
+    )
+    with pytest.raises(Exception, match="not supported by 'BaseAnyLogicMultiAgentEnv'"):
+        BaseAnyLogicMultiAgentEnv({'run_exported_model': False, **env_config})
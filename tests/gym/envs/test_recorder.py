@@ -0,0 +1,61 @@
+import numpy as np
+from gymnasium import spaces
+from alpyperl import TrajectoryReader
+from alpyperl.gym.envs.recorder import TrajectoryRecorder
+
+
+OBSERVATION_SPACE = spaces.Box(low=-1.0, high=1.0, shape=(3,))
+ACTION_SPACE = spaces.Discrete(n=2)
+
+
+def record_episodes(shard_dir, episode_lengths, chunk_size):
+    """Record episodes with observations equal to the global step number"""
+    recorder = TrajectoryRecorder(shard_dir, OBSERVATION_SPACE, ACTION_SPACE, chunk_size=chunk_size)
+    t = 0
+    for length in episode_lengths:
+        recorder.start_episode(np.full(3, t, dtype=np.float64))
+        for i in range(length):
+            t += 1
+            recorder.record_step(
+                np.eye(2)[t % 2], float(t), i == length - 1, False, np.full(3, t, dtype=np.float64)
+            )
+    recorder.close()
+
+def test_record_and_read(tmp_path):
+    # Episodes span several chunks, and the last chunk is not full
+    record_episodes(str(tmp_path / "shard_0"), [5, 3, 6], chunk_size=4)
+    record_episodes(str(tmp_path / "shard_1"), [2], chunk_size=4)
+    reader = TrajectoryReader(str(tmp_path))
+    assert len(reader) == 16
+    assert reader.observation_space == OBSERVATION_SPACE
+    assert reader.action_space == ACTION_SPACE
+    # Chunks are read lazily
+    chunks = list(reader.iter_chunks(['reward'], ['shard_0']))
+    assert [len(c['reward']) for c in chunks] == [4, 4, 4, 2]
+    assert isinstance(chunks[0]['reward'], np.memmap)
+
+    episodes = list(reader.iter_episodes(shard_names=['shard_0']))
+    assert [len(e['step']) for e in episodes] == [5, 3, 6]
+    for episode in episodes:
+        assert episode['step'].tolist() == list(range(len(episode['step'])))
+        assert episode['terminated'].tolist() == [False] * (len(episode['step']) - 1) + [True]
+        # Observations are followed by the next observation
+        assert (episode['next_observation'][:, 0] == episode['observation'][:, 0] + 1).all()
+        assert (episode['reward'] == episode['next_observation'][:, 0]).all()
+    assert len(list(reader.iter_episodes())) == 4
+
+    transitions = reader.read(['episode_id', 'action'], ['shard_0'])
+    assert transitions['episode_id'].tolist() == [0] * 5 + [1] * 3 + [2] * 6
+    assert transitions['action'].shape == (14, 2)
+
+def test_record_many_steps(tmp_path):
+    recorder = TrajectoryRecorder(str(tmp_path / "shard"), OBSERVATION_SPACE, ACTION_SPACE)
+    observation = np.zeros(3)
+    action = np.eye(2)[0]
+    recorder.start_episode(observation)
+    num_steps = 10000
+    for _ in range(num_steps):
+        recorder.record_step(action, 1.0, False, False, observation)
+    recorder.close()
+    # Every queued step is written, including those of the last partial chunk
+    assert len(TrajectoryReader(str(tmp_path))) == num_steps
@@ -239,4 +239,45 @@ def test_get_anylogic_rl_action(anylogic_model, gym_space):
         ):
             assert action == anylogic_action.getDouble(i)
 
-    
\ No newline at end of file
+    
+@pytest.mark.parametrize("gym_space", [
+    (spaces.Box(low=-1.0, high=1.0, shape=(3,))),
+    (spaces.Box(low=0.0, high=1.0, shape=(2, 2))),
+    (spaces.Discrete(n=4, start=2)),
+    (spaces.MultiBinary(n=3)),
+    (spaces.MultiDiscrete(nvec=[2, 3, 4])),
+    (spaces.Tuple(spaces=[
+        spaces.Discrete(n=3), spaces.Box(low=0.0, high=1.0, shape=(2,))
+    ])),
+    (spaces.Dict(spaces={
+        "space-a": spaces.MultiDiscrete(nvec=[3, 2]),
+        "space-b": spaces.Discrete(n=2)
+    }))
+])
+def test_unflatten_batch(gym_space):
+    # Create a batch of flattened samples
+    samples = [gym_space.sample() for _ in range(8)]
+    flattened_batch = np.stack([flatten(gym_space, s) for s in samples])
+    # Check that vectorized unflatten matches unflattening row by row
+    unflattened_batch = utils.unflatten_batch(gym_space, flattened_batch)
+    assert len(unflattened_batch) == len(samples)
+    for row, sample in zip(flattened_batch, unflattened_batch):
+        assert flatten(gym_space, sample).tolist() == row.tolist()
+        assert gym_space.contains(sample)
+    # Check that flattening the batch returns the original matrix
+    assert utils.flatten_batch(gym_space, unflattened_batch).tolist() == flattened_batch.tolist()
+
+def test_space_to_dict():
+    import json
+    from alpyperl.gym.envs.utils import space_to_dict, space_from_dict
+    for space in [
+        spaces.Box(low=-np.inf, high=np.inf, shape=(2, 3)),
+        spaces.Discrete(n=3, start=1),
+        spaces.MultiDiscrete(nvec=[2, 3]),
+        spaces.MultiBinary(n=4),
+        spaces.Tuple([spaces.Discrete(n=2), spaces.Box(low=-1.0, high=1.0, shape=(2,))]),
+        spaces.Dict({'a': spaces.Discrete(n=2), 'b': spaces.Box(low=0, high=5, shape=(1,), dtype=np.int64)})
+    ]:
+        # Spaces are described with standard JSON
+        space_dict = json.loads(json.dumps(space_to_dict(space), allow_nan=False))
+        assert space_from_dict(space_dict) == space
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from alpyperl.serve.rllib.batching import MicroBatcher
+
+
+def create_batcher(batch_sizes, compute_time_s=0.0, **kwargs):
+    async def batch_fn(items):
+        batch_sizes.append(len(items))
+        await asyncio.sleep(compute_time_s)
+        return [2 * item for item in items]
+
+    return MicroBatcher(batch_fn, **kwargs)
+
+def test_lone_request_is_not_delayed():
+    batch_sizes = []
+    batcher = create_batcher(batch_sizes, max_batch_wait_ms=500.0)
+
+    async def submit():
+        start = time.perf_counter()
+        result = await batcher.submit(1)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(submit())
+    assert result == 2
+    assert batch_sizes == [1]
+    # Not waiting for other requests
+    assert elapsed < 0.25
+
+def test_requests_are_batched_while_computing():
+    batch_sizes = []
+    batcher = create_batcher(batch_sizes, compute_time_s=0.05, max_batch_size=8, max_batch_wait_ms=20.0)
+
+    async def submit():
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.01)
+        # Requests arriving while the first batch is computed share a batch
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(1, 6)])
+        return [await first] + results
+
+    assert asyncio.run(submit()) == [0, 2, 4, 6, 8, 10]
+    assert batch_sizes == [1, 5]
+
+def test_queued_requests_are_batched():
+    batch_sizes = []
+    batcher = create_batcher(batch_sizes, max_batch_size=4)
+
+    async def submit():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+
+    assert asyncio.run(submit()) == [0, 2, 4, 6, 8, 10]
+    assert batch_sizes == [4, 2]
+
+def test_requests_are_batched_while_waiting_for_a_slot():
+    batch_sizes = []
+    batcher = create_batcher(
+        batch_sizes, compute_time_s=0.1, max_batch_size=8, max_batch_wait_ms=0.0, max_concurrent_batches=1
+    )
+
+    async def submit():
+        futures = []
+        for i in range(5):
+            futures.append(asyncio.ensure_future(batcher.submit(i)))
+            await asyncio.sleep(0.01)
+        return await asyncio.gather(*futures)
+
+    assert asyncio.run(submit()) == [0, 2, 4, 6, 8]
+    # Requests arriving while the only slot is busy share the next batch
+    assert batch_sizes == [1, 4]
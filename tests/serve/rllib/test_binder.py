@@ -0,0 +1,338 @@
+import pytest
+import asyncio
+import threading
+import time
+import httpx
+import numpy as np
+from gymnasium import spaces
+from fastapi.testclient import TestClient
+from alpyperl.serve import NumpyPolicy
+from alpyperl.serve.rllib.binder import create_policy_app
+from alpyperl.serve.rllib.registry import load_replicas
+
+
+class DummyPolicy:
+    """Policy that pushes towards the opposite side of the first observation
+    value and records the size of every batch it is asked for"""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def compute_actions(self, observations, explore=False):
+        self.batch_sizes.append(len(observations))
+        return {k: int(obs[0] < 0) for k, obs in observations.items()}
+
+
+@pytest.fixture
+def policy():
+    return DummyPolicy()
+
+@pytest.fixture
+def app(policy):
+    return create_policy_app(
+        policy=policy,
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2),
+        trained_policy_loc='./trained_policy',
+        max_batch_size=8,
+        max_batch_wait_ms=50.0
+    )
+
+def test_predict(app):
+    with TestClient(app) as client:
+        response = client.post("/predict", json=[-0.5, 0.0, 0.1, 0.2])
+    assert response.status_code == 200
+    assert response.json()["action"] == [0.0, 1.0]
+
+def test_predict_batch(app, policy):
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", json=[
+            [-0.5, 0.0, 0.1, 0.2],
+            [0.5, 0.0, 0.1, 0.2],
+            [-0.1, 0.3, 0.1, 0.2]
+        ])
+    assert response.status_code == 200
+    assert response.json()["actions"] == [[0.0, 1.0], [1.0, 0.0], [0.0, 1.0]]
+    # All observations are computed in a single forward pass
+    assert policy.batch_sizes == [3]
+
+def test_predict_concurrent_requests_are_batched(app, policy):
+    async def send_requests():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post("/predict", json=[v, 0.0, 0.0, 0.0])
+                for v in np.linspace(-1.0, 1.0, 8)
+            ])
+
+    responses = asyncio.run(send_requests())
+    assert [r.json()["action"] for r in responses] == [[0.0, 1.0]] * 4 + [[1.0, 0.0]] * 4
+    # Requests share forward passes
+    assert sum(policy.batch_sizes) == 8
+    assert len(policy.batch_sizes) < 8
+
+def test_server_responsive_during_inference():
+    class SlowPolicy(DummyPolicy):
+        def compute_actions(self, observations, explore=False):
+            time.sleep(0.5)
+            return super().compute_actions(observations, explore)
+
+    app = create_policy_app(
+        policy=[SlowPolicy(), SlowPolicy()],
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2),
+        trained_policy_loc='./trained_policy'
+    )
+
+    async def send_requests():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            predictions = [
+                asyncio.ensure_future(client.post("/predict_batch", json=[[0.0] * 4]))
+                for _ in range(2)
+            ]
+            await asyncio.sleep(0.1)
+            # Health check is answered while the forward passes are running
+            start_time = time.perf_counter()
+            greetings = await client.get("/")
+            health_check_time = time.perf_counter() - start_time
+            await asyncio.gather(*predictions)
+            return greetings, health_check_time, time.perf_counter() - start_time
+
+    greetings, health_check_time, total_time = asyncio.run(send_requests())
+    assert greetings.status_code == 200
+    assert health_check_time < 0.2
+    # Both replicas compute at the same time
+    assert total_time < 0.9
+
+def test_predict_octet_stream(app):
+    observations = np.array([[-0.5, 0.0, 0.1, 0.2], [0.5, 0.0, 0.1, 0.2]], dtype='<f4')
+    with TestClient(app) as client:
+        single_response = client.post(
+            "/predict",
+            content=observations[0].tobytes(),
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        batch_response = client.post(
+            "/predict_batch",
+            content=observations.tobytes(),
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        invalid_response = client.post(
+            "/predict_batch",
+            content=observations.tobytes()[:-4],
+            headers={"Content-Type": "application/octet-stream"}
+        )
+    assert single_response.headers["content-type"] == "application/octet-stream"
+    assert np.frombuffer(single_response.content, dtype='<f4').tolist() == [0.0, 1.0]
+    assert np.frombuffer(batch_response.content, dtype='<f4').tolist() == [0.0, 1.0, 1.0, 0.0]
+    assert invalid_response.status_code == 400
+
+def test_predict_msgpack(app):
+    msgpack = pytest.importorskip("msgpack")
+    observations = np.array([[-0.5, 0.0, 0.1, 0.2], [0.5, 0.0, 0.1, 0.2]], dtype='<f4')
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict_batch",
+            content=msgpack.packb({"observations": observations.tobytes()}),
+            headers={"Content-Type": "application/msgpack"}
+        )
+    actions = np.frombuffer(msgpack.unpackb(response.content)["actions"], dtype='<f4')
+    assert actions.tolist() == [0.0, 1.0, 1.0, 0.0]
+
+@pytest.mark.parametrize("content, content_type", [
+    (b"[{}]", "application/json"),
+    (b'[[1, "a", null, 2]]', "application/json"),
+    # msgpack bodies that are not a map of raw bytes
+    (b"\x05", "application/msgpack"),
+    (b"\x91\x01", "application/msgpack"),
+    (b"\x81\xacobservations\x01", "application/msgpack")
+])
+def test_predict_malformed_body(app, content, content_type):
+    if content_type == "application/msgpack":
+        pytest.importorskip("msgpack")
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", content=content, headers={"Content-Type": content_type})
+    assert response.status_code == 400
+    assert response.json()["detail"]
+
+def test_predict_unsupported_content_type(app):
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict",
+            content=b"-0.5,0.0,0.1,0.2",
+            headers={"Content-Type": "text/csv"}
+        )
+    assert response.status_code == 415
+
+def test_predict_stream(app):
+    with TestClient(app) as client:
+        with client.websocket_connect("/predict_stream") as websocket:
+            # Binary messages
+            for value, action in [(-0.5, [0.0, 1.0]), (0.5, [1.0, 0.0])]:
+                websocket.send_bytes(np.array([value, 0.0, 0.1, 0.2], dtype='<f4').tobytes())
+                assert np.frombuffer(websocket.receive_bytes(), dtype='<f4').tolist() == action
+            # JSON messages
+            websocket.send_text("[[-0.5, 0.0, 0.1, 0.2], [0.5, 0.0, 0.1, 0.2]]")
+            assert websocket.receive_json() == {"actions": [[0.0, 1.0], [1.0, 0.0]]}
+
+def test_predict_stream_is_not_batched():
+    class SlowPolicy(DummyPolicy):
+        def compute_actions(self, observations, explore=False):
+            time.sleep(0.3)
+            return super().compute_actions(observations, explore)
+
+    app = create_policy_app(
+        policy=[SlowPolicy(), SlowPolicy()],
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2),
+        trained_policy_loc='./trained_policy',
+        max_batch_wait_ms=1000.0
+    )
+    with TestClient(app) as client:
+        # A single observation request keeps a batch computing meanwhile
+        prediction = threading.Thread(target=client.post, args=("/predict",), kwargs={"json": [0.0] * 4})
+        prediction.start()
+        time.sleep(0.1)
+        with client.websocket_connect("/predict_stream") as websocket:
+            start_time = time.perf_counter()
+            websocket.send_bytes(np.array([-0.5, 0.0, 0.1, 0.2], dtype='<f4').tobytes())
+            assert np.frombuffer(websocket.receive_bytes(), dtype='<f4').tolist() == [0.0, 1.0]
+            stream_time = time.perf_counter() - start_time
+        prediction.join()
+    # The step is computed by the idle replica, without waiting for the
+    # batching window
+    assert stream_time < 0.8
+
+def save_constant_policy(location, action, n=2):
+    """Save an exported policy that always chooses the given action"""
+    biases = np.zeros(n)
+    biases[action] = 1.0
+    NumpyPolicy(
+        [(np.zeros((4, n)), biases)], 'tanh', 'categorical', {'n': n},
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=n)
+    ).save(str(location))
+    return str(location)
+
+def create_reloadable_app(policy_loc, **kwargs):
+    policy = NumpyPolicy.load(policy_loc)
+    return create_policy_app(
+        policy=policy,
+        observation_space=policy.observation_space,
+        action_space=policy.action_space,
+        trained_policy_loc=policy_loc,
+        max_batch_wait_ms=0.0,
+        **kwargs
+    )
+
+def test_reload(tmp_path):
+    policy_loc = save_constant_policy(tmp_path / "a.npz", action=0)
+    app = create_reloadable_app(policy_loc, enable_reload=True)
+    with TestClient(app) as client:
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [1.0, 0.0]
+        # Swap in a new policy
+        new_policy_loc = save_constant_policy(tmp_path / "b.npz", action=1)
+        response = client.post("/admin/reload", json={"trained_policy_loc": new_policy_loc})
+        assert response.status_code == 200
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]
+        assert client.get("/get_trained_policy_loc").json()["trained_policy_loc"] == new_policy_loc
+        # Policies trained with different spaces are rejected
+        other_policy_loc = save_constant_policy(tmp_path / "c.npz", action=2, n=3)
+        response = client.post("/admin/reload", json={"trained_policy_loc": other_policy_loc})
+        assert response.status_code == 409
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]
+
+def test_reload_is_disabled_by_default(app):
+    with TestClient(app) as client:
+        assert client.post("/admin/reload").status_code == 404
+
+def test_watch_policy_loc(tmp_path):
+    policy_loc = save_constant_policy(tmp_path / "a.npz", action=0)
+    app = create_reloadable_app(policy_loc, watch_policy_loc=True, watch_interval_s=0.05)
+    with TestClient(app) as client:
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [1.0, 0.0]
+        # Overwrite policy files, which are reloaded once they stop changing
+        save_constant_policy(tmp_path / "a.npz", action=1)
+        for _ in range(100):
+            if client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]:
+                break
+            time.sleep(0.05)
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]
+
+def test_watch_reloaded_policy_loc(tmp_path):
+    loaded_locs = []
+
+    def policy_loader(policy_loc, num_replicas):
+        loaded_locs.append(policy_loc)
+        return load_replicas(policy_loc, num_replicas)
+
+    policy_loc = save_constant_policy(tmp_path / "a.npz", action=0)
+    app = create_reloadable_app(
+        policy_loc, enable_reload=True, watch_policy_loc=True, watch_interval_s=0.05,
+        policy_loader=policy_loader
+    )
+    with TestClient(app) as client:
+        new_policy_loc = save_constant_policy(tmp_path / "b.npz", action=1)
+        client.post("/admin/reload", json={"trained_policy_loc": new_policy_loc})
+        # The new location is not reloaded again, nor the old one watched
+        save_constant_policy(tmp_path / "a.npz", action=0)
+        time.sleep(0.5)
+        assert loaded_locs == [new_policy_loc]
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]
+        # Changes of the new location are reloaded
+        save_constant_policy(tmp_path / "b.npz", action=0)
+        for _ in range(100):
+            if client.post("/predict", json=[0.0] * 4).json()["action"] == [1.0, 0.0]:
+                break
+            time.sleep(0.05)
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [1.0, 0.0]
+    assert loaded_locs == [new_policy_loc, new_policy_loc]
+
+def test_metrics(app):
+    with TestClient(app) as client:
+        response = client.post("/predict", json=[-0.5, 0.0, 0.1, 0.2])
+        assert [t.split(';')[0] for t in response.headers["Server-Timing"].split(', ')] == [
+            'decode', 'predict', 'encode'
+        ]
+        client.post("/predict_batch", json=[[0.5, 0.0, 0.1, 0.2]] * 3)
+        client.post("/predict", json=[0.5])
+        metrics = client.get("/metrics").text
+    assert 'alpyperl_requests_total{endpoint="/predict",status="200"} 1' in metrics
+    assert 'alpyperl_requests_total{endpoint="/predict",status="400"} 1' in metrics
+    assert 'alpyperl_requests_total{endpoint="/predict_batch",status="200"} 1' in metrics
+    for stage in ['decode', 'unflatten', 'inference', 'flatten', 'encode']:
+        assert f'alpyperl_stage_duration_seconds_count{{stage="{stage}"}} 2' in metrics
+    # One batch of a single observation and one of three
+    assert 'alpyperl_batch_size_bucket{le="1"} 1' in metrics
+    assert 'alpyperl_batch_size_bucket{le="4"} 2' in metrics
+    assert 'alpyperl_queue_depth 0' in metrics
+
+def test_action_cache(policy):
+    app = create_policy_app(
+        policy=policy,
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2),
+        trained_policy_loc='./trained_policy',
+        max_batch_wait_ms=0.0,
+        action_cache_size=16
+    )
+    with TestClient(app) as client:
+        for _ in range(3):
+            assert client.post("/predict", json=[-0.5, 0.0, 0.1, 0.2]).json()["action"] == [0.0, 1.0]
+        # Only the observation that is not cached is computed
+        response = client.post("/predict_batch", json=[[-0.5, 0.0, 0.1, 0.2], [0.5, 0.0, 0.1, 0.2]])
+        assert response.json()["actions"] == [[0.0, 1.0], [1.0, 0.0]]
+        metrics = client.get("/metrics").text
+    assert policy.batch_sizes == [1, 1]
+    assert 'alpyperl_action_cache_hits_total 3' in metrics
+    assert 'alpyperl_action_cache_misses_total 2' in metrics
+    assert 'alpyperl_action_cache_hit_rate 0.6' in metrics
+
+def test_action_cache_is_cleared_on_reload(tmp_path):
+    policy_loc = save_constant_policy(tmp_path / "a.npz", action=0)
+    app = create_reloadable_app(policy_loc, enable_reload=True, action_cache_size=16)
+    with TestClient(app) as client:
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [1.0, 0.0]
+        save_constant_policy(tmp_path / "a.npz", action=1)
+        assert client.post("/admin/reload").status_code == 200
+        assert client.post("/predict", json=[0.0] * 4).json()["action"] == [0.0, 1.0]
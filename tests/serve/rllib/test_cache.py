@@ -0,0 +1,36 @@
+import numpy as np
+from alpyperl.serve.rllib.cache import ActionCache
+
+
+def test_lru_eviction():
+    cache = ActionCache(max_size=2)
+    keys = [cache.key(np.array([float(i), 0.0])) for i in range(3)]
+    cache.put(keys[0], 'a')
+    cache.put(keys[1], 'b')
+    assert cache.get(keys[0]) == 'a'
+    # Least recently used observation is evicted
+    cache.put(keys[2], 'c')
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 'a' and cache.get(keys[2]) == 'c'
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+    assert cache.hit_rate() == 0.75
+
+def test_key():
+    cache = ActionCache(max_size=10)
+    # Same values share the key regardless of their type
+    assert cache.key(np.array([0.5, 1.0], dtype=np.float32)) == cache.key([0.5, 1.0])
+    assert cache.key([0.5, 1.0]) != cache.key([0.5, 1.01])
+    quantized_cache = ActionCache(max_size=10, quantization=0.1)
+    assert quantized_cache.key([0.5, 1.0]) == quantized_cache.key([0.52, 0.98])
+    assert quantized_cache.key([0.5, 1.0]) != quantized_cache.key([0.58, 1.0])
+
+def test_clear():
+    cache = ActionCache(max_size=10)
+    key = cache.key([0.0])
+    generation = cache.generation
+    cache.put(key, 'a', generation)
+    cache.clear()
+    assert len(cache) == 0
+    # Actions computed before clearing the cache are not cached
+    cache.put(key, 'a', generation)
+    assert cache.get(key) is None
@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+from gymnasium import spaces
+from alpyperl.gym.envs import utils
+
+pytest.importorskip("ray.rllib")
+pytest.importorskip("torch")
+
+
+def create_trained_policy(trained_policy_loc, observation_space, action_space, model=None, **config):
+    """Save an (untrained) torch PPO policy as ALPypeRL does after training"""
+    from ray.rllib.algorithms.ppo import PPOConfig
+    from ray.rllib.algorithms.ppo.ppo_torch_policy import PPOTorchPolicy
+    ppo_config = PPOConfig().framework('torch').training(
+        model={'fcnet_hiddens': [16, 16], **(model or {})}
+    )
+    policy = PPOTorchPolicy(
+        observation_space, action_space, {**ppo_config.to_dict(), **config}
+    )
+    policy.export_checkpoint(f"{trained_policy_loc}/policies/default_policy")
+    utils.save_space(observation_space, f"{trained_policy_loc}/alpyperl_spaces/observation_space.pkl")
+    utils.save_space(action_space, f"{trained_policy_loc}/alpyperl_spaces/action_space.pkl")
+    return policy
+
+@pytest.mark.parametrize("observation_space, action_space", [
+    (spaces.Box(low=-1.0, high=1.0, shape=(4,)), spaces.Discrete(n=3)),
+    (spaces.Box(low=-1.0, high=1.0, shape=(2, 2)), spaces.MultiDiscrete([2, 3])),
+    (spaces.Box(low=-1.0, high=1.0, shape=(4,)), spaces.Box(low=-2.0, high=2.0, shape=(2,)))
+])
+def test_exported_policy_matches_rllib_policy(tmp_path, observation_space, action_space):
+    from alpyperl.serve.rllib import export_policy
+    policy = create_trained_policy(tmp_path, observation_space, action_space)
+    numpy_policy = export_policy(str(tmp_path), str(tmp_path / "policy.npz"))
+    observations = np.stack([observation_space.sample() for _ in range(32)])
+    actions, _, _ = policy.compute_actions(observations, explore=False)
+    if policy.config.get('normalize_actions'):
+        from ray.rllib.utils.spaces.space_utils import unsquash_action
+        actions = unsquash_action(actions, policy.action_space_struct)
+    expected = utils.flatten_batch(action_space, list(actions))
+    flattened_actions = numpy_policy.compute_flattened_actions(
+        utils.flatten_batch(observation_space, list(observations))
+    )
+    assert np.allclose(flattened_actions, expected, atol=1e-5)
+
+@pytest.mark.parametrize("config", [
+    {'observation_filter': 'MeanStdFilter'},
+    {'model': {'free_log_std': True}},
+    {'model': {'no_final_linear': True}}
+])
+def test_unsupported_policy_is_not_exported(tmp_path, config):
+    from alpyperl.serve.rllib import export_policy
+    create_trained_policy(
+        tmp_path,
+        spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        spaces.Box(low=-1.0, high=1.0, shape=(2,)),
+        **config
+    )
+    with pytest.raises(Exception, match="cannot be exported"):
+        export_policy(str(tmp_path), str(tmp_path / "policy.npz"))
@@ -0,0 +1,29 @@
+import numpy as np
+from gymnasium import spaces
+from alpyperl.anylogic.model.connector import AnyLogicModelCallback
+from alpyperl.serve import NumpyPolicy
+from alpyperl.serve.rllib.inference import PolicyPool
+
+
+def test_callback_predict():
+    rng = np.random.default_rng(0)
+    policy = NumpyPolicy(
+        [(rng.normal(size=(4, 8)), rng.normal(size=8)), (rng.normal(size=(8, 3)), rng.normal(size=3))],
+        'tanh', 'categorical', {'n': 3}
+    )
+    callback = AnyLogicModelCallback()
+    callback.policy_pool = PolicyPool(
+        policies=[policy],
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=3)
+    )
+    observations = rng.uniform(-1.0, 1.0, size=(3, 4))
+    expected = policy.compute_flattened_actions(observations)
+    # Observations and actions are exchanged as big-endian float64 bytes
+    # (as received from a Java 'byte[]')
+    action = callback.predict(observations[0].astype('>f8').tobytes())
+    assert np.frombuffer(action, dtype='>f8').tolist() == expected[0].tolist()
+    actions = callback.predict(bytearray(observations.astype('>f8').tobytes()))
+    assert np.frombuffer(actions, dtype='>f8').reshape((3, 3)).tolist() == expected.tolist()
+    assert callback.finishedEvaluation() and callback.evaluation_finished.is_set()
+    callback.policy_pool.shutdown()
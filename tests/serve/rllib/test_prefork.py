@@ -0,0 +1,52 @@
+import pytest
+import os
+import sys
+import time
+import signal
+import subprocess
+import textwrap
+import httpx
+from alpyperl.anylogic.model.connector import get_open_port
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="Requires POSIX fork")
+def test_serve_prefork():
+    port = get_open_port()
+    # Launch a server whose workers answer with their process id
+    server_script = textwrap.dedent(f"""
+        import os
+        from fastapi import FastAPI
+        from alpyperl.serve.rllib.prefork import serve_prefork
+
+        def app_factory():
+            app = FastAPI()
+
+            @app.get("/")
+            def get_pid():
+                return os.getpid()
+
+            return app
+
+        serve_prefork(app_factory, host="127.0.0.1", port={port}, num_workers=2)
+    """)
+    server = subprocess.Popen([sys.executable, "-c", server_script])
+    try:
+        # Wait until the server is ready
+        for _ in range(50):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        # Requests are served by the forked workers, not the main process
+        pids = {httpx.get(f"http://127.0.0.1:{port}/").json() for _ in range(20)}
+        assert server.pid not in pids
+        assert 1 <= len(pids) <= 2
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
+
+def test_workers_do_not_hold_replicas():
+    from alpyperl.serve.rllib import launch_policy_server
+    with pytest.raises(Exception, match="num_policy_replicas"):
+        launch_policy_server(exported_policy_loc='./policy.npz', num_workers=2, num_policy_replicas=2)
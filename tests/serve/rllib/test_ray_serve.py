@@ -0,0 +1,33 @@
+import pytest
+import numpy as np
+import httpx
+from alpyperl.serve.loadtest import create_synthetic_policy
+from alpyperl.anylogic.model.connector import get_open_port
+
+serve = pytest.importorskip("ray.serve")
+
+
+@pytest.fixture
+def ray_serve_url(tmp_path):
+    from alpyperl.serve.rllib import launch_ray_serve_policy_server
+    policy = create_synthetic_policy(observation_dim=4, num_actions=2)
+    policy.save(str(tmp_path / "policy.npz"))
+    port = get_open_port()
+    launch_ray_serve_policy_server(
+        exported_policy_loc=str(tmp_path / "policy.npz"),
+        host="127.0.0.1",
+        port=port,
+        num_replicas=2,
+        blocking=False
+    )
+    yield f"http://127.0.0.1:{port}", policy
+    serve.shutdown()
+
+def test_ray_serve_deployment(ray_serve_url):
+    url, policy = ray_serve_url
+    observations = np.random.default_rng(0).uniform(-1.0, 1.0, size=(3, 4))
+    expected = policy.compute_flattened_actions(observations)
+    response = httpx.post(f"{url}/predict", json=observations[0].tolist(), timeout=30.0)
+    assert response.json()["action"] == expected[0].tolist()
+    response = httpx.post(f"{url}/predict_batch", json=observations.tolist(), timeout=30.0)
+    assert response.json()["actions"] == expected.tolist()
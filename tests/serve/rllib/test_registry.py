@@ -0,0 +1,53 @@
+import numpy as np
+from gymnasium import spaces
+from fastapi.testclient import TestClient
+from alpyperl.serve import NumpyPolicy
+from alpyperl.serve.rllib.binder import create_multi_policy_app
+from alpyperl.serve.rllib.registry import PolicyRegistry, find_policies
+
+
+def save_policies(location, names):
+    """Save categorical policies that always choose the action given by their
+    position in 'names'"""
+    for i, name in enumerate(names):
+        biases = np.zeros(len(names))
+        biases[i] = 1.0
+        NumpyPolicy(
+            [(np.zeros((4, len(names))), biases)], 'tanh', 'categorical', {'n': len(names)},
+            observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+            action_space=spaces.Discrete(n=len(names))
+        ).save(str(location / f"{name}.npz"))
+
+def test_find_policies(tmp_path):
+    save_policies(tmp_path, ['a', 'b'])
+    (tmp_path / 'checkpoint' / 'alpyperl_spaces').mkdir(parents=True)
+    (tmp_path / 'other').mkdir()
+    assert sorted(find_policies(str(tmp_path))) == ['a', 'b', 'checkpoint']
+
+def test_multi_policy_server(tmp_path):
+    names = ['a', 'b', 'c']
+    save_policies(tmp_path, names)
+    registry = PolicyRegistry(find_policies(str(tmp_path)), max_policies=2, max_batch_wait_ms=0.0)
+    app = create_multi_policy_app(registry)
+    with TestClient(app) as client:
+        assert client.get("/policies").json() == {"policies": names, "loaded": []}
+        # Policies are loaded on first use and the least recently used one is
+        # unloaded when the limit is exceeded
+        for i, name in enumerate(names):
+            response = client.post(f"/policies/{name}/predict", json=[0.0, 0.1, 0.2, 0.3])
+            assert response.json()["action"] == np.eye(3)[i].tolist()
+        assert client.get("/policies").json()["loaded"] == ['b', 'c']
+        response = client.post("/policies/a/predict_batch", json=[[0.0] * 4] * 2)
+        assert response.json()["actions"] == [[1.0, 0.0, 0.0]] * 2
+        assert client.get("/policies").json()["loaded"] == ['c', 'a']
+        assert client.post("/policies/d/predict", json=[0.0] * 4).status_code == 404
+
+def test_memory_budget(tmp_path):
+    save_policies(tmp_path, ['a', 'b'])
+    # Budget only fits one policy
+    budget_mb = 1.5 * (tmp_path / 'a.npz').stat().st_size / (1024 * 1024)
+    registry = PolicyRegistry(find_policies(str(tmp_path)), memory_budget_mb=budget_mb)
+    with TestClient(create_multi_policy_app(registry)) as client:
+        for name in ['a', 'b']:
+            assert client.post(f"/policies/{name}/predict", json=[0.0] * 4).status_code == 200
+            assert registry.loaded_names() == [name]
@@ -0,0 +1,131 @@
+import pytest
+import asyncio
+import os
+import sys
+import time
+import subprocess
+import textwrap
+import httpx
+import numpy as np
+from gymnasium import spaces
+from alpyperl.serve import NumpyPolicy, PolicyClient, AsyncPolicyClient
+from alpyperl.serve.client import compare_transport_latency
+from alpyperl.anylogic.model.connector import get_open_port
+
+
+def launch_server(exported_policy_loc, **kwargs):
+    server_script = textwrap.dedent(f"""
+        from alpyperl.serve.rllib import launch_policy_server
+
+        launch_policy_server(exported_policy_loc={exported_policy_loc!r}, **{kwargs!r})
+    """)
+    return subprocess.Popen([sys.executable, "-c", server_script])
+
+def wait_until_ready(client):
+    for _ in range(100):
+        try:
+            client.client.get("/")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise TimeoutError("Server did not start")
+
+
+@pytest.fixture
+def exported_policy_loc(tmp_path):
+    rng = np.random.default_rng(0)
+    policy = NumpyPolicy(
+        [(rng.normal(size=(4, 8)), rng.normal(size=8)), (rng.normal(size=(8, 2)), rng.normal(size=2))],
+        'tanh', 'categorical', {'n': 2},
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2)
+    )
+    policy.save(str(tmp_path / "policy.npz"))
+    return str(tmp_path / "policy.npz")
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="Requires Unix domain sockets")
+def test_tcp_and_unix_domain_socket(exported_policy_loc, tmp_path):
+    port = get_open_port()
+    uds = str(tmp_path / "alpyperl.sock")
+    servers = [
+        launch_server(exported_policy_loc, host="127.0.0.1", port=port),
+        launch_server(exported_policy_loc, uds=uds)
+    ]
+    try:
+        observations = np.random.default_rng(1).uniform(-1.0, 1.0, size=(5, 4))
+        expected = NumpyPolicy.load(exported_policy_loc).compute_flattened_actions(observations)
+        for kwargs in [{'url': f"http://127.0.0.1:{port}"}, {'uds': uds}]:
+            for binary in [True, False]:
+                with PolicyClient(binary=binary, **kwargs) as client:
+                    wait_until_ready(client)
+                    assert client.predict(observations[0]).tolist() == expected[0].tolist()
+                    assert client.predict_batch(observations).tolist() == expected.tolist()
+        # Both transports are measured against the same policy
+        results = compare_transport_latency(
+            observations[0], url=f"http://127.0.0.1:{port}", uds=uds, num_requests=20
+        )
+        assert set(results) == {'tcp', 'uds'}
+        assert all(r['p50_ms'] > 0 for r in results.values())
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait(timeout=10)
+
+@pytest.fixture
+def server(tmp_path):
+    # Policy with a composite observation space (flattened into 4 values)
+    rng = np.random.default_rng(0)
+    policy = NumpyPolicy(
+        [(rng.normal(size=(4, 8)), rng.normal(size=8)), (rng.normal(size=(8, 3)), rng.normal(size=3))],
+        'tanh', 'categorical', {'n': 3},
+        observation_space=spaces.Tuple([spaces.Box(low=-1.0, high=1.0, shape=(2,)), spaces.Discrete(n=2)]),
+        action_space=spaces.Discrete(n=3)
+    )
+    policy.save(str(tmp_path / "policy.npz"))
+    port = get_open_port()
+    process = launch_server(str(tmp_path / "policy.npz"), host="127.0.0.1", port=port)
+    try:
+        with PolicyClient(url=f"http://127.0.0.1:{port}") as client:
+            wait_until_ready(client)
+        yield f"http://127.0.0.1:{port}", policy
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def sample_observations(n):
+    rng = np.random.default_rng(1)
+    return [
+        (rng.uniform(-1.0, 1.0, size=2).astype(np.float32), int(rng.integers(2)))
+        for _ in range(n)
+    ]
+
+def expected_actions(policy, observations):
+    flattened_actions = policy.compute_flattened_actions(
+        np.stack([spaces.flatten(policy.observation_space, o) for o in observations])
+    )
+    return np.argmax(flattened_actions, axis=1).tolist()
+
+def test_compute_actions(server):
+    url, policy = server
+    observations = sample_observations(10)
+    with PolicyClient(url=url, batch_size=4) as client:
+        # Spaces are retrieved from the server
+        assert client.get_spaces() == (policy.observation_space, policy.action_space)
+        # Actions are returned unflattened
+        assert client.compute_action(observations[0]) == expected_actions(policy, observations[:1])[0]
+        assert client.compute_actions(observations) == expected_actions(policy, observations)
+
+def test_async_client(server):
+    url, policy = server
+    observations = sample_observations(20)
+
+    async def compute_actions():
+        async with AsyncPolicyClient(url=url, auto_batch=True, max_batch_wait_ms=20.0) as client:
+            # Concurrent single observations are sent together
+            actions = await asyncio.gather(*[client.compute_action(o) for o in observations])
+            batched_actions = await client.compute_actions(observations)
+        return actions, batched_actions
+
+    actions, batched_actions = asyncio.run(compute_actions())
+    assert actions == expected_actions(policy, observations)
+    assert batched_actions == actions
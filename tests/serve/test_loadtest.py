@@ -0,0 +1,36 @@
+import asyncio
+import json
+from alpyperl.anylogic.model.connector import get_open_port
+from alpyperl.serve.loadtest import create_synthetic_policy, launch_synthetic_server, run_load, run_sweep, main
+
+
+def test_run_sweep():
+    with launch_synthetic_server(policy=create_synthetic_policy(observation_dim=8)) as url:
+        results = run_sweep(url, concurrencies=[1, 4], batch_sizes=[1, 8], duration_s=0.2)
+    # Batch sizes only apply to '/predict_batch'
+    assert [(r['endpoint'], r['concurrency'], r['batch_size']) for r in results] == [
+        ('predict', 1, 1), ('predict', 4, 1),
+        ('predict_batch', 1, 1), ('predict_batch', 1, 8), ('predict_batch', 4, 1), ('predict_batch', 4, 8)
+    ]
+    for result in results:
+        assert result['requests'] > 0 and result['errors'] == 0
+        assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
+    json.dumps(results)
+
+def test_main(tmp_path):
+    main([
+        '--endpoints', 'predict', '--concurrency', '2', '--duration', '0.2', '--json',
+        '--output', str(tmp_path / 'results.json')
+    ])
+    results = json.loads((tmp_path / 'results.json').read_text())
+    assert len(results) == 1 and results[0]['encoding'] == 'application/json'
+
+def test_run_load_without_successful_requests():
+    # Nothing is listening on the port, so every request fails
+    url = f"http://127.0.0.1:{get_open_port()}"
+    result = asyncio.run(run_load(url, concurrency=2, duration_s=0.2, observation_dim=4))
+    assert result['successes'] == 0 and result['errors'] == result['requests'] > 0
+    assert result['error_rate'] == 1.0
+    assert result['requests_per_s'] == 0.0 and result['observations_per_s'] == 0.0
+    assert set(result['latency_ms'].values()) == {None}
+    json.dumps(result)
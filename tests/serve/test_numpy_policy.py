@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+from gymnasium import spaces
+from fastapi.testclient import TestClient
+from alpyperl.serve import NumpyPolicy
+from alpyperl.serve.rllib.binder import create_policy_app
+
+
+def create_layers(sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        (rng.normal(size=(n_in, n_out)), rng.normal(size=n_out))
+        for n_in, n_out in zip(sizes[:-1], sizes[1:])
+    ]
+
+def forward(layers, x):
+    for w, b in layers[:-1]:
+        x = np.tanh(x @ w + b)
+    return x @ layers[-1][0] + layers[-1][1]
+
+@pytest.mark.parametrize("action_dist, action_config, num_logits", [
+    ('categorical', {'n': 3}, 3),
+    ('multi_categorical', {'nvec': [2, 3]}, 5),
+    ('diag_gaussian', {'low': [-2.0, 0.0], 'high': [2.0, 1.0], 'unsquash': True, 'clip': False}, 4)
+])
+def test_compute_flattened_actions(action_dist, action_config, num_logits):
+    layers = create_layers([4, 8, 8, num_logits])
+    policy = NumpyPolicy(layers, 'tanh', action_dist, action_config)
+    observations = np.random.default_rng(1).normal(size=(16, 4))
+    actions = policy.compute_flattened_actions(observations)
+    logits = forward(layers, observations)
+    if action_dist == 'categorical':
+        assert actions.tolist() == np.eye(3)[np.argmax(logits, axis=1)].tolist()
+    elif action_dist == 'multi_categorical':
+        expected = np.concatenate(
+            [np.eye(2)[np.argmax(logits[:, :2], axis=1)], np.eye(3)[np.argmax(logits[:, 2:], axis=1)]],
+            axis=1
+        )
+        assert actions.tolist() == expected.tolist()
+    else:
+        low, high = np.array(action_config['low']), np.array(action_config['high'])
+        expected = low + (np.clip(logits[:, :2], -1.0, 1.0) + 1.0) * (high - low) / 2.0
+        assert np.allclose(actions, expected, atol=1e-5)
+        assert np.all(actions >= low) and np.all(actions <= high)
+
+def test_save_and_load(tmp_path):
+    observation_space = spaces.Box(low=-1.0, high=1.0, shape=(4,))
+    action_space = spaces.Discrete(n=2)
+    policy = NumpyPolicy(
+        create_layers([4, 16, 2]), 'relu', 'categorical', {'n': 2},
+        observation_space=observation_space, action_space=action_space
+    )
+    policy.save(tmp_path / "policy.npz")
+    loaded_policy = NumpyPolicy.load(tmp_path / "policy.npz")
+    observations = np.random.default_rng(0).normal(size=(32, 4))
+    assert (
+        loaded_policy.compute_flattened_actions(observations).tolist()
+        == policy.compute_flattened_actions(observations).tolist()
+    )
+    assert loaded_policy.observation_space == observation_space
+    assert loaded_policy.action_space == action_space
+    # Only weights and biases are stored as arrays (spaces are JSON metadata).
+    with np.load(tmp_path / "policy.npz", allow_pickle=False) as data:
+        assert sorted(data.files) == ['biases_0', 'biases_1', 'metadata', 'weights_0', 'weights_1']
+
+def test_serve_numpy_policy():
+    policy = NumpyPolicy(create_layers([4, 8, 2]), 'tanh', 'categorical', {'n': 2})
+    app = create_policy_app(
+        policy=policy,
+        observation_space=spaces.Box(low=-1.0, high=1.0, shape=(4,)),
+        action_space=spaces.Discrete(n=2),
+        trained_policy_loc='./policy.npz'
+    )
+    observations = np.random.default_rng(0).normal(size=(5, 4))
+    with TestClient(app) as client:
+        response = client.post("/predict_batch", json=observations.tolist())
+    assert response.json()["actions"] == policy.compute_flattened_actions(observations).tolist()
@@ -0,0 +1,61 @@
+import pytest
+import json
+import subprocess
+import sys
+import textwrap
+
+
+# Maximum time (in seconds) to import every entry point. Heavy dependencies
+# are only imported when the objects using them are first accessed.
+IMPORT_BUDGETS = {
+    'alpyperl': 0.1,
+    'alpyperl.serve': 0.1,
+    'alpyperl.serve.rllib': 0.1,
+    'alpyperl.evaluation': 0.1
+}
+HEAVY_MODULES = ['gymnasium', 'py4j', 'numpy', 'fastapi', 'uvicorn', 'pydantic', 'httpx', 'ray']
+
+
+def import_in_subprocess(module_name):
+    """Import a module in a fresh interpreter and return the time it took
+    (best of 3) and the heavy modules it loaded"""
+    script = textwrap.dedent(f"""
+        import json, sys, time
+        start = time.perf_counter()
+        import {module_name}
+        elapsed = time.perf_counter() - start
+        print(json.dumps({{
+            'elapsed': elapsed,
+            'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+        }}))
+    """)
+    results = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, check=True, text=True
+        ).stdout)
+        for _ in range(3)
+    ]
+    return min(r['elapsed'] for r in results), results[0]['loaded']
+
+@pytest.mark.parametrize('module_name', list(IMPORT_BUDGETS))
+def test_import_time(module_name):
+    elapsed, loaded = import_in_subprocess(module_name)
+    assert loaded == []
+    assert elapsed < IMPORT_BUDGETS[module_name]
+
+def test_gateway_does_not_import_http_stack():
+    _, loaded = import_in_subprocess('alpyperl.serve.rllib.gateway')
+    assert not set(loaded) & {'fastapi', 'uvicorn', 'pydantic', 'httpx'}
+
+def test_lazy_attributes():
+    import alpyperl
+    import alpyperl.serve
+    import alpyperl.serve.rllib
+    from alpyperl.gym.envs.anylogic_env import BaseAnyLogicEnv
+    from alpyperl.serve.numpy_policy import NumpyPolicy
+    # Objects are loaded on first access
+    assert alpyperl.AnyLogicEnv is BaseAnyLogicEnv
+    assert alpyperl.serve.NumpyPolicy is NumpyPolicy
+    assert 'launch_policy_server' in dir(alpyperl.serve.rllib)
+    with pytest.raises(AttributeError):
+        alpyperl.UnknownEnv